@@ -11,10 +11,10 @@ import adsk.core
 import adsk.fusion
 import traceback
 import xml.etree.ElementTree as ET
-from threading import Thread
 
 from .exporter import SDFExporter
 from .helpers import *
+from .viapointsession import ViaPointSession
 
 commandId = 'SDFusionExporter'
 commandName = 'SDFusion'
@@ -23,7 +23,8 @@ commandDescription = 'cardsflow exporter'
 # Global set of event handlers to keep them referenced for the duration of the command
 handlers = []
 rootComp = adsk.fusion.Design.cast(adsk.core.Application.get().activeProduct).rootComponent
-allVP = []
+## Via-points selected in the ViaPoints tab, created when the dialog is confirmed.
+session = None
 
 
 # Event handler that reacts to any changes the user makes to any of the command inputs.
@@ -65,33 +66,30 @@ class SDFusionInputChangedHandler(adsk.core.InputChangedEventHandler):
         if linkInput:
             link = linkInput.name
 
-        # rootComp = adsk.fusion.Design.cast(self.app.activeProduct).rootComponent
-        conPoints = rootComp.constructionPoints
-        # Create construction point input
-        pointInput = conPoints.createInput()
-        # Create construction point by center
-        pointInput.setByCenter(edge)
-        point = conPoints.add(pointInput)
-        point.name = "VP_motor" + muscle + "_" + link + "_" + number
+        # the point is created when the dialog is confirmed, see ViaPointSession
+        if session.add(muscle, link, number, edge):
+            # automatically increase VP number by 1
+            numberInput.value = str(int(number) + 1)
 
-        vp = ViaPoint(motor=muscle, link=link, number=number, edge=edge)
-
-        global allVP
-        allVP.append(vp)
-
-        # automatically increase VP number by 1
-        numberInput.value = str(int(number) + 1)
+# Event handler that draws the via-points selected so far.
+class SDFusionExecutePreviewHandler(adsk.core.CommandEventHandler):
+    def __init__(self):
+        super().__init__()
+    def notify(self, args):
+        try:
+            session.preview()
+        except:
+            ui = adsk.core.Application.get().userInterface
+            ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
 class SDFusionDestroyHandler(adsk.core.CommandEventHandler):
     def __init__(self):
         super().__init__()
     def notify(self, args):
         try:
-            #TODO fix the bug when viapoints get deleted on destroy
-            self.preserveViaPoints()
-
             eventArgs = adsk.core.CommandEventArgs.cast(args)
             if (eventArgs.terminationReason == 1): # "Export to SDF" clicked
+                self.preserveViaPoints()
 
                 # Get the values from the command inputs.
                 inputs = eventArgs.command.commandInputs
@@ -102,53 +100,41 @@ class SDFusionDestroyHandler(adsk.core.CommandEventHandler):
                     if exporter.askForExportDirectory():
                         exporter.createDiectoryStructure()
 
-                        if exporter.runCleanUp:
-                            exporter.removeSmallParts()
-
-                        if exporter.exportViaPoints:
-                            exporter.traverseViaPoints()
-
-                        # build sdf root node
-                        exporter.root = ET.Element("sdf", version="1.6")
-                        exporter.model = ET.Element("model", name=exporter.modelName)
-                        exporter.root.append(exporter.model)
-
-                        allRigidGroups = exporter.getAllRigidGroups()
-
-                        # exports all rigid groups to STL and SDF
-                        names = []
-                        progressDialog0 = exporter.app.userInterface.createProgressDialog()
-                        progressDialog0.isBackgroundTranslucent = False
-                        progressDialog0.show("SDFusion", 'Processing rigid groups: %v/%m', 0, len(allRigidGroups), 1)
-
-                        #create a list of threads
-                        threads = []
-                        for rig in allRigidGroups:
-                            progressDialog0.progressValue += 1
-                            if rig is not None and rig.name[:6] == "EXPORT":
-                                name = rig.name[7:] # get rid of EXPORT_ tag
-                                if name in names: # ignoring duplicate export
-                                    exporter.logfile.write("WARNING: ignoring duplicate export of " + name + ", check your model for duplicate EXPORT Rigid Groups\n")
-                                    continue
-                                progressDialog0.message = "%v/%m " + name
-                                exporter.getAllBodiesInRigidGroup(name,rig)
-                                if not exporter.exportMeshes:
-                                    # We start one thread per url present.
-                                    process = Thread(target=exporter.copyBodiesToNewComponentAndExport, args=[name])
-                                    process.start()
-                                    threads.append(process)
-                                else:
-                                    exporter.copyBodiesToNewComponentAndExport(name)
-                            if progressDialog0.wasCancelled:
-                                exporter.logfile.close()
-                                progressDialog0.hide()
-                                return
-                        # We now pause execution on the main thread by 'joining' all of our started threads.
-                        # This ensures that each has finished processing the urls.
-                        for process in threads:
-                            process.join()
-                        adsk.doEvents()
-
+                        # the design changes of all stages are computed once per stage and grouped in the timeline
+                        with exporter.transaction("SDFusion export"):
+                            if exporter.runCleanUp:
+                                exporter.removeSmallParts()
+
+                            if exporter.exportViaPoints:
+                                exporter.traverseViaPoints()
+
+                            # build sdf root node
+                            exporter.createModel()
+
+                            # the index has one rigid group per link, duplicates are reported in the log
+                            exporter.getAllRigidGroups()
+                            rigidGroupIndex = exporter.getRigidGroupIndex()
+
+                            # exports all rigid groups to STL and SDF
+                            progress = exporter.progress
+                            progress.start("SDFusion", 'Processing rigid groups: %v/%m', len(rigidGroupIndex.links))
+
+                            for name in rigidGroupIndex.links:
+                                progress.step()
+                                progress.message = "%v/%m " + name
+                                exporter.getAllBodiesInRigidGroup(name, rigidGroupIndex.group(name))
+                                # the Fusion API is not thread safe, all of it runs on the main thread and
+                                # the exporter hands the pure Python work to its worker processes
+                                exporter.copyBodiesToNewComponentAndExport(name)
+                                if progress.cancelled:
+                                    exporter.worker.shutdown()
+                                    exporter.logfile.close()
+                                    progress.finish()
+                                    return
+                            progress.finish()
+
+                        # mass properties computed from the meshes are needed by all outputs below
+                        exporter.finishLinks()
                         exporter.exportJointsToSDF()
                         if exporter.exportViaPoints:
                             exporter.exportViaPointsToSDF()
@@ -163,8 +149,7 @@ class SDFusionDestroyHandler(adsk.core.CommandEventHandler):
                         if exporter.exportLighthouseSensors:
                             exporter.exportLighthouseSensorsToYAML()
 
-                        progressDialog0.hide()
-                        adsk.doEvents()
+                        progress.update()
 
                         exporter.finish()
 
@@ -172,26 +157,20 @@ class SDFusionDestroyHandler(adsk.core.CommandEventHandler):
                     exporter.finish()
                     if exporter.ui:
                         exporter.ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
+            else:
+                # the dialog was cancelled, drop the selected via-points and their preview
+                session.cancel()
             # adsk.terminate()
         except:
             if ui:
                 ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
+    ## Creates the construction points of the via-points selected in the dialog.
     def preserveViaPoints(self):
-        global allVP
-        for vp in allVP:
-            muscle = vp.motor
-            link = vp.link
-            number = vp.number
-            edge = vp.edge
-            conPoints = rootComp.constructionPoints
-            # Create construction point input
-            pointInput = conPoints.createInput()
-            # Create construction point by center
-            pointInput.setByCenter(edge)
-            point = conPoints.add(pointInput)
-            point.name = "VP_motor" + muscle + "_" + link + "_" + number
-            adsk.doEvents()
+        (created, skipped) = session.commit()
+        if skipped:
+            ui = adsk.core.Application.get().userInterface
+            ui.messageBox(str(created) + " via-points created, skipped existing ones:\n" + "\n".join(skipped))
 
 class SDFusionCreatedHandler(adsk.core.CommandCreatedEventHandler):
     ui = None
@@ -211,6 +190,12 @@ class SDFusionCreatedHandler(adsk.core.CommandCreatedEventHandler):
             cmd.inputChanged.add(onInputChanged)
             handlers.append(onInputChanged)
 
+            global session
+            session = ViaPointSession(rootComp)
+            onExecutePreview = SDFusionExecutePreviewHandler()
+            cmd.executePreview.add(onExecutePreview)
+            handlers.append(onExecutePreview)
+
             onDestroy = SDFusionDestroyHandler()
             cmd.destroy.add(onDestroy)
 
@@ -231,17 +216,38 @@ class SDFusionCreatedHandler(adsk.core.CommandCreatedEventHandler):
         tab1ChildInputs = tabCmdInput1.children
 
         tab1ChildInputs.addStringValueInput(commandId + '_model_name', 'Model Name:', '')  # self.rootComp.name)
-        tab1ChildInputs.addBoolValueInput(commandId + '_updateRigidGroups', 'updateRigidGroups', True, '', False)
+        tab1ChildInputs.addBoolValueInput(commandId + '_incremental', 'incremental', True, '', True)
+        tab1ChildInputs.addStringValueInput(commandId + '_subtree', 're-export subtree of', '')
         tab1ChildInputs.addBoolValueInput(commandId + '_meshes', 'exportMeshes', True, '', True)
+        tab1ChildInputs.addBoolValueInput(commandId + '_postprocess_meshes', 'postprocess meshes', True, '', False)
+        for (inputId, label) in (('_visual_mesh', 'visual mesh'), ('_collision_mesh', 'collision mesh')):
+            levelInput = tab1ChildInputs.addDropDownCommandInput(commandId + inputId, label, adsk.core.DropDownStyles.TextListDropDownStyle)
+            levelInput.listItems.add('low', True, '')
+            levelInput.listItems.add('medium', False, '')
+            levelInput.listItems.add('high', False, '')
+        tab1ChildInputs.addStringValueInput(commandId + '_mesh_store', 'mesh store', '')
+        tab1ChildInputs.addBoolValueInput(commandId + '_simplify_collisions', 'simplify collisions', True, '', False)
         tab1ChildInputs.addBoolValueInput(commandId + '_sdf', 'sdf', True, '', True)
         tab1ChildInputs.addBoolValueInput(commandId + '_viapoints', 'viapoints', True, '', True)
         tab1ChildInputs.addBoolValueInput(commandId + '_caspr', 'caspr', True, '', False)
         tab1ChildInputs.addBoolValueInput(commandId + '_cardsflow', 'CARDSflow', True, '', True)
         tab1ChildInputs.addBoolValueInput(commandId + '_opensim', 'opensim', True, '', False)
         tab1ChildInputs.addBoolValueInput(commandId + '_darkroom', 'darkroom', True, '', False)
-        tab1ChildInputs.addBoolValueInput(commandId + '_remove_small_parts', 'remove parts smaller 1g', True, '', False)
+        tab1ChildInputs.addBoolValueInput(commandId + '_remove_small_parts', 'remove small parts', True, '', False)
+        tab1ChildInputs.addValueInput(commandId + '_small_part_threshold', 'small part threshold', 'g', adsk.core.ValueInput.createByString('1 g'))
+        tab1ChildInputs.addBoolValueInput(commandId + '_small_parts_dry_run', 'small parts dry run', True, '', False)
+        tab1ChildInputs.addBoolValueInput(commandId + '_pretty_xml', 'pretty xml', True, '', True)
+        tab1ChildInputs.addBoolValueInput(commandId + '_trace', 'trace', True, '', False)
         tab1ChildInputs.addBoolValueInput(commandId + '_self_collide', 'self_collide', True, '', False)
         tab1ChildInputs.addBoolValueInput(commandId + '_dummy_inertia', 'dummy_inertia', True, '', False)
+        massInput = tab1ChildInputs.addDropDownCommandInput(commandId + '_mass_properties', 'mass properties', adsk.core.DropDownStyles.TextListDropDownStyle)
+        massInput.listItems.add('fusion', True, '')
+        massInput.listItems.add('check', False, '')
+        massInput.listItems.add('mesh', False, '')
+        packageInput = tab1ChildInputs.addDropDownCommandInput(commandId + '_package', 'package', adsk.core.DropDownStyles.TextListDropDownStyle)
+        packageInput.listItems.add('none', True, '')
+        packageInput.listItems.add('zip', False, '')
+        packageInput.listItems.add('tar.zst', False, '')
         # tab1ChildInputs.addBoolValueInput(commandId + '_cache', 'cache', True, '', True)
 
     def createViaPointsTab(self, inputs):
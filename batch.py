@@ -0,0 +1,161 @@
+## @package batch
+# Regenerates the outputs of many exported designs without Fusion.
+#
+# Every input is a snapshot.json or an export directory containing one, see
+# snapshot.py. The snapshots are emitted in parallel by a pool of processes,
+# each into its own directory below the output directory, e.g.
+#
+#     python -m SDFusion.batch exports/* --output models --set exportCASPR=true
+#
+# The timings and failures of all designs are printed and written to
+# batch.json in the output directory.
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+import traceback
+
+from .snapshot import DesignSnapshot, snapshotName
+from .engine import ModelEmitter
+
+## Name of the summary file in the output directory.
+summaryName = "batch.json"
+
+## Parses a "name=value" setting, the value is read as JSON if possible.
+#
+# @param text the setting, e.g. "exportCASPR=true" or "densities={\"link0\": 0.0027}"
+# @return (name, value)
+def parseSetting(text):
+    (name, separator, value) = text.partition('=')
+    if not separator or not name:
+        raise argparse.ArgumentTypeError("expected name=value, got " + text)
+    try:
+        return (name, json.loads(value))
+    except ValueError:
+        return (name, value)
+
+## Returns the export directory of a snapshot file or directory.
+def sourceDirectory(source):
+    if os.path.isdir(source):
+        return os.path.abspath(source)
+    return os.path.dirname(os.path.abspath(source))
+
+## Chooses one output directory per input, named after the export directories.
+#
+# @param sources the snapshot files or export directories
+# @param outputDir the directory receiving all models
+# @return list of output directories in the order of sources
+def outputDirectories(sources, outputDir):
+    directories = []
+    used = set()
+    for source in sources:
+        name = os.path.basename(sourceDirectory(source)) or "model"
+        unique = name
+        counter = 1
+        while unique in used:
+            counter += 1
+            unique = name + "_" + str(counter)
+        used.add(unique)
+        directories.append(os.path.join(outputDir, unique))
+    return directories
+
+## Emits all outputs of one snapshot, runs in a process of the pool.
+#
+# The emitter writes its outputs on the calling process, the pool already
+# keeps every CPU busy.
+#
+# @param source the snapshot file or export directory
+# @param fileDir the output directory
+# @param settings settings overriding the ones of the snapshot
+# @return dict with source, fileDir, model, links, seconds, errors, failed and the changed output files
+def emitSnapshot(source, fileDir, settings):
+    result = {"source": source, "fileDir": fileDir, "model": "", "links": 0,
+              "seconds": 0.0, "errors": [], "failed": False, "changed": []}
+    start = time.perf_counter()
+    try:
+        snapshot = DesignSnapshot.load(source)
+        result["model"] = snapshot.modelName
+        result["links"] = len(snapshot.links)
+        emitter = ModelEmitter(snapshot)
+        emitter.workerProcesses = 0
+        result["errors"] = emitter.run(fileDir, **settings)
+        result["changed"] = emitter.changedOutputs
+    except Exception:
+        result["errors"] = [traceback.format_exc()]
+        result["failed"] = True
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+## Emits many snapshots in parallel.
+#
+# @param sources the snapshot files or export directories
+# @param outputDir the directory receiving one directory per snapshot
+# @param settings settings overriding the ones of every snapshot
+# @param jobs the number of processes, None for the number of CPUs, 1 runs in this process
+# @return the summary, see summaryName
+def runBatch(sources, outputDir, settings=None, jobs=None):
+    settings = dict(settings or {})
+    os.makedirs(outputDir, exist_ok=True)
+    directories = outputDirectories(sources, outputDir)
+    start = time.perf_counter()
+    if jobs == 1:
+        results = [emitSnapshot(source, fileDir, settings) for (source, fileDir) in zip(sources, directories)]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(emitSnapshot, source, fileDir, settings) for (source, fileDir) in zip(sources, directories)]
+            results = []
+            for (source, fileDir, future) in zip(sources, directories, futures):
+                try:
+                    results.append(future.result())
+                except Exception:
+                    # the process running the design died
+                    results.append({"source": source, "fileDir": fileDir, "model": "", "links": 0, "seconds": 0.0,
+                                    "errors": [traceback.format_exc()], "failed": True, "changed": []})
+    summary = {"seconds": time.perf_counter() - start, "jobs": jobs or os.cpu_count(), "settings": settings,
+               "designs": results}
+    with open(os.path.join(outputDir, summaryName), 'w') as file:
+        json.dump(summary, file, indent=1)
+    return summary
+
+## Formats a summary as a table with one row per design.
+def formatSummary(summary):
+    designs = summary["designs"]
+    width = max([len(os.path.basename(design["fileDir"])) for design in designs] + [6])
+    lines = ["design".ljust(width) + "  links  seconds  changed  result"]
+    for design in designs:
+        if design["failed"]:
+            status = "FAILED"
+        elif design["errors"]:
+            status = str(len(design["errors"])) + " errors"
+        else:
+            status = "ok"
+        lines.append(os.path.basename(design["fileDir"]).ljust(width) + ("%7d" % design["links"]) +
+                     ("%9.3f" % design["seconds"]) + ("%9d" % len(design["changed"])) + "  " + status)
+    failed = sum(1 for design in designs if design["failed"])
+    cpu = sum(design["seconds"] for design in designs)
+    lines.append("%d designs, %d failed, %.3f s wall time, %.3f s in the emitters" % (len(designs), failed, summary["seconds"], cpu))
+    for design in designs:
+        for error in design["errors"]:
+            lines.append("")
+            lines.append(design["source"] + ":")
+            lines.append(error.rstrip())
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerates the outputs of exported SDFusion designs without Fusion 360.")
+    parser.add_argument("sources", nargs="+", help="export directories or " + snapshotName + " files")
+    parser.add_argument("--output", required=True, help="directory receiving one directory per design")
+    parser.add_argument("--jobs", type=int, default=None, help="number of processes, defaults to the number of CPUs")
+    parser.add_argument("--set", type=parseSetting, action="append", default=[], metavar="NAME=VALUE",
+                        help="overrides a setting of every snapshot, e.g. exportCASPR=true")
+    args = parser.parse_args(argv)
+
+    summary = runBatch(args.sources, args.output, dict(args.set), args.jobs)
+    print(formatSummary(summary))
+    return 1 if any(design["failed"] for design in summary["designs"]) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
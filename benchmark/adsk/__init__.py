@@ -0,0 +1,13 @@
+## @package adsk
+# Stand-in for the parts of the Fusion 360 API used by the exporter.
+#
+# It only exists to run and time the exporter outside of Fusion, see
+# benchmark/design.py for the synthetic designs. The package is picked up
+# instead of the real adsk module when benchmark/ is first on sys.path.
+
+## Gives Fusion a chance to process its events, nothing to do here.
+def doEvents():
+    return True
+
+def autoTerminate(value):
+    pass
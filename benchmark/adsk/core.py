@@ -0,0 +1,220 @@
+## @package adsk.core
+# Stand-in for adsk.core: geometry, the application and its user interface.
+
+import math
+
+class Base:
+    ## Returns the object if it is of this type, else None.
+    @classmethod
+    def cast(cls, obj):
+        return obj if isinstance(obj, cls) else None
+
+class Point3D(Base):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Point3D(x, y, z)
+
+    def asArray(self):
+        return (self.x, self.y, self.z)
+
+    def asVector(self):
+        return Vector3D(self.x, self.y, self.z)
+
+    def copy(self):
+        return Point3D(self.x, self.y, self.z)
+
+    def vectorTo(self, point):
+        return Vector3D(point.x - self.x, point.y - self.y, point.z - self.z)
+
+    def distanceTo(self, point):
+        return self.vectorTo(point).length
+
+class Vector3D(Base):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Vector3D(x, y, z)
+
+    def asArray(self):
+        return (self.x, self.y, self.z)
+
+    def asPoint(self):
+        return Point3D(self.x, self.y, self.z)
+
+    def copy(self):
+        return Vector3D(self.x, self.y, self.z)
+
+    @property
+    def length(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+## 4x4 transformation matrix, stored row-major like Matrix3D.asArray().
+class Matrix3D(Base):
+    def __init__(self, cells=None):
+        if cells is None:
+            cells = [1.0, 0.0, 0.0, 0.0,
+                     0.0, 1.0, 0.0, 0.0,
+                     0.0, 0.0, 1.0, 0.0,
+                     0.0, 0.0, 0.0, 1.0]
+        self.cells = list(cells)
+
+    @staticmethod
+    def create():
+        return Matrix3D()
+
+    def asArray(self):
+        return tuple(self.cells)
+
+    def copy(self):
+        return Matrix3D(self.cells)
+
+    def getCell(self, row, column):
+        return self.cells[4 * row + column]
+
+    def setCell(self, row, column, value):
+        self.cells[4 * row + column] = value
+        return True
+
+    @property
+    def translation(self):
+        return Vector3D(self.cells[3], self.cells[7], self.cells[11])
+
+    @translation.setter
+    def translation(self, vector):
+        self.cells[3] = vector.x
+        self.cells[7] = vector.y
+        self.cells[11] = vector.z
+
+class ObjectCollection(Base):
+    def __init__(self):
+        self.items = []
+
+    @staticmethod
+    def create():
+        return ObjectCollection()
+
+    def add(self, item):
+        self.items.append(item)
+        return True
+
+    def item(self, index):
+        return self.items[index]
+
+    @property
+    def count(self):
+        return len(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+class Attribute(Base):
+    def __init__(self, groupName, name, value):
+        self.groupName = groupName
+        self.name = name
+        self.value = value
+
+## Named string values attached to an entity.
+class Attributes(Base):
+    def __init__(self):
+        self.items = {}
+
+    def add(self, groupName, name, value):
+        attribute = Attribute(groupName, name, value)
+        self.items[(groupName, name)] = attribute
+        return attribute
+
+    def itemByName(self, groupName, name):
+        return self.items.get((groupName, name))
+
+    @property
+    def count(self):
+        return len(self.items)
+
+class DialogResults:
+    DialogOK = 0
+    DialogCancel = 1
+
+class ProgressDialog(Base):
+    isBackgroundTranslucent = False
+    isShowing = False
+    message = ""
+    title = ""
+    progressValue = 0
+    minimumValue = 0
+    maximumValue = 0
+    ## set to True to simulate the user pressing cancel
+    wasCancelled = False
+
+    def show(self, title, message, minimumValue, maximumValue, delay=0):
+        self.title = title
+        self.message = message
+        self.minimumValue = minimumValue
+        self.maximumValue = maximumValue
+        self.progressValue = minimumValue
+        self.isShowing = True
+        return True
+
+    def hide(self):
+        self.isShowing = False
+        return True
+
+class FileDialog(Base):
+    isMultiSelectEnabled = False
+    title = ""
+    filter = ""
+    filterIndex = 0
+    initialDirectory = ""
+    initialFilename = ""
+    ## the directory returned by showSave
+    filename = ""
+
+    def showSave(self):
+        return DialogResults.DialogOK if self.filename else DialogResults.DialogCancel
+
+    def showOpen(self):
+        return self.showSave()
+
+class UserInterface(Base):
+    def __init__(self):
+        ## all texts passed to messageBox
+        self.messages = []
+        ## the directory every file dialog returns
+        self.fileDialogResult = ""
+
+    def messageBox(self, text, title="", buttons=0, icon=0):
+        self.messages.append(text)
+        return DialogResults.DialogOK
+
+    def createProgressDialog(self):
+        return ProgressDialog()
+
+    def createFileDialog(self):
+        dialog = FileDialog()
+        dialog.filename = self.fileDialogResult
+        return dialog
+
+class Application(Base):
+    _instance = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        ## the design, set by benchmark.design.generateDesign
+        self.activeProduct = None
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+        return Application._instance
@@ -0,0 +1,640 @@
+## @package adsk.fusion
+# Stand-in for adsk.fusion: designs, components, occurrences and bodies.
+#
+# Bodies are axis-aligned boxes with a density, which is enough to give every
+# link real mass properties and meshes. Occurrence transforms only translate,
+# every component has exactly one occurrence. Lengths are in cm, masses in kg.
+
+import itertools
+import struct
+from .core import Attributes, Base, Matrix3D, ObjectCollection, Point3D, Vector3D
+
+_tokens = itertools.count()
+
+class MeshRefinementSettings:
+    MeshRefinementHigh = 0
+    MeshRefinementMedium = 1
+    MeshRefinementLow = 2
+    MeshRefinementCustom = 3
+
+## Subdivisions of the box faces relative to the low refinement.
+refinementFactors = {MeshRefinementSettings.MeshRefinementLow: 1,
+                     MeshRefinementSettings.MeshRefinementMedium: 2,
+                     MeshRefinementSettings.MeshRefinementHigh: 4}
+
+class DesignTypes:
+    DirectDesignType = 0
+    ParametricDesignType = 1
+
+class JointTypes:
+    RigidJointType = 0
+    RevoluteJointType = 1
+    SliderJointType = 2
+    CylindricalJointType = 3
+    PinSlotJointType = 4
+    PlanarJointType = 5
+    BallJointType = 6
+
+## A list with the count/item interface of the API collections.
+class Collection(Base):
+    def __init__(self, items=None):
+        self.items = list(items) if items is not None else []
+
+    @property
+    def count(self):
+        return len(self.items)
+
+    def item(self, index):
+        return self.items[index]
+
+    def itemByName(self, name):
+        for item in self.items:
+            if item.name == name:
+                return item
+        return None
+
+    def itemById(self, id):
+        for item in self.items:
+            if getattr(item, 'id', None) == id:
+                return item
+        return None
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(list(self.items))
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+## Mass properties of a set of boxes, see BRepBody.
+class PhysicalProperties(Base):
+    def __init__(self, bodies):
+        self.mass = 0.0
+        self.volume = 0.0
+        self.area = 0.0
+        first = [0.0, 0.0, 0.0]
+        # (xx, yy, zz, xy, yz, xz) about the origin of the design
+        self.moments = [0.0] * 6
+        for body in bodies:
+            (x, y, z) = body.worldCenter()
+            (a, b, c) = body.size
+            volume = a * b * c
+            mass = volume * body.density
+            self.volume += volume
+            self.area += 2 * (a * b + b * c + a * c)
+            self.mass += mass
+            first[0] += mass * x
+            first[1] += mass * y
+            first[2] += mass * z
+            moments = (mass * (b * b + c * c) / 12 + mass * (y * y + z * z),
+                       mass * (a * a + c * c) / 12 + mass * (x * x + z * z),
+                       mass * (a * a + b * b) / 12 + mass * (x * x + y * y),
+                       -mass * x * y, -mass * y * z, -mass * x * z)
+            self.moments = [m + n for (m, n) in zip(self.moments, moments)]
+        if self.mass > 0:
+            self.centerOfMass = Point3D(first[0] / self.mass, first[1] / self.mass, first[2] / self.mass)
+        else:
+            self.centerOfMass = Point3D()
+        self.density = self.mass / self.volume if self.volume > 0 else 0.0
+
+    def getXYZMomentsOfInertia(self):
+        return (True,) + tuple(self.moments)
+
+## Material names of the densities in kg / cm^3.
+materialNames = {0.0027: "Aluminum", 0.00785: "Steel", 0.00124: "PLA"}
+
+class MaterialProperty(Base):
+    def __init__(self, id, value):
+        self.id = id
+        self.value = value
+
+class Material(Base):
+    def __init__(self, name, density):
+        self.name = name
+        ## density in kg / cm^3 as structural_Density
+        self.materialProperties = Collection([MaterialProperty('structural_Density', density)])
+
+class BRepBody(Base):
+    def __init__(self, component, name, center, size, density, assemblyContext=None, nativeObject=None):
+        self.parentComponent = component
+        self.name = name
+        ## center of the box in the coordinates of its component
+        self.center = tuple(center)
+        self.size = tuple(size)
+        ## kg / cm^3
+        self.density = density
+        self.assemblyContext = assemblyContext
+        self.nativeObject = nativeObject
+        self.entityToken = nativeObject.entityToken if nativeObject is not None else "body" + str(next(_tokens))
+
+    @property
+    def volume(self):
+        return self.size[0] * self.size[1] * self.size[2]
+
+    @property
+    def area(self):
+        (x, y, z) = self.size
+        return 2.0 * (x * y + y * z + z * x)
+
+    ## Changes whenever the geometry of the body changes, the same for all proxies.
+    @property
+    def revisionId(self):
+        native = self.nativeObject if self.nativeObject is not None else self
+        return repr((native.center, native.size))
+
+    @property
+    def physicalProperties(self):
+        return PhysicalProperties([self])
+
+    @property
+    def material(self):
+        return Material(materialNames.get(self.density, "Custom"), self.density)
+
+    def worldCenter(self):
+        offset = self.assemblyContext.worldOffset() if self.assemblyContext is not None else (0.0, 0.0, 0.0)
+        return tuple(c + o for (c, o) in zip(self.center, offset))
+
+    def createForAssemblyContext(self, occurrence):
+        native = self.nativeObject if self.nativeObject is not None else self
+        return BRepBody(self.parentComponent, self.name, self.center, self.size, self.density, occurrence, native)
+
+    ## Copies the body into another component, keeping its place in the design.
+    def copyToComponent(self, target):
+        offset = (0.0, 0.0, 0.0)
+        component = target
+        if isinstance(target, Occurrence):
+            offset = target.worldOffset()
+            component = target.component
+        center = tuple(c - o for (c, o) in zip(self.worldCenter(), offset))
+        body = component.addBody(self.name, center, self.size, self.density)
+        component.timelineObjects.append(component.design.changed("copy " + self.name))
+        if isinstance(target, Occurrence):
+            return body.createForAssemblyContext(target)
+        return body
+
+    def deleteMe(self):
+        native = self.nativeObject if self.nativeObject is not None else self
+        native.parentComponent.bRepBodies.items.remove(native)
+        return True
+
+    ## The 12 * subdivisions^2 triangles of the box in the given frame.
+    def triangles(self, subdivisions, offset=(0.0, 0.0, 0.0)):
+        center = tuple(c - o for (c, o) in zip(self.worldCenter(), offset))
+        half = [s / 2.0 for s in self.size]
+        n = max(1, subdivisions)
+        for axis in range(3):
+            (u, v) = ((axis + 1) % 3, (axis + 2) % 3)
+            for sign in (-1.0, 1.0):
+                # keep the faces counter-clockwise seen from outside
+                if sign < 0:
+                    (u, v) = (v, u)
+                for i in range(n):
+                    for j in range(n):
+                        corners = []
+                        for (di, dj) in ((0, 0), (1, 0), (1, 1), (0, 1)):
+                            point = [0.0, 0.0, 0.0]
+                            point[axis] = center[axis] + sign * half[axis]
+                            point[u] = center[u] - half[u] + 2 * half[u] * (i + di) / n
+                            point[v] = center[v] - half[v] + 2 * half[v] * (j + dj) / n
+                            corners.append(point)
+                        yield (corners[0], corners[1], corners[2])
+                        yield (corners[0], corners[2], corners[3])
+                if sign < 0:
+                    (u, v) = (v, u)
+
+class ConstructionPoint(Base):
+    def __init__(self, component, name, geometry):
+        self.parentComponent = component
+        self.name = name
+        self.geometry = geometry
+
+    def deleteMe(self):
+        self.parentComponent.constructionPoints.items.remove(self)
+        return True
+
+class ConstructionPointInput(Base):
+    def __init__(self):
+        self.geometry = None
+
+    def setByCenter(self, edge):
+        self.geometry = edge.geometry.center.copy()
+        return True
+
+class ConstructionPoints(Collection):
+    def __init__(self, component):
+        super().__init__()
+        self.component = component
+
+    def createInput(self):
+        return ConstructionPointInput()
+
+    ## Adds a point from a ConstructionPointInput, the generated designs pass a name and a position.
+    def add(self, name, geometry=None):
+        if isinstance(name, ConstructionPointInput):
+            (name, geometry) = ("Point" + str(len(self.items) + 1), name.geometry)
+            self.component.design.changed("construction point")
+        point = ConstructionPoint(self.component, name, geometry)
+        self.items.append(point)
+        return point
+
+class JointLimits(Base):
+    def __init__(self, minimumValue=0.0, maximumValue=0.0):
+        self.isMinimumValueEnabled = minimumValue != 0.0
+        self.isMaximumValueEnabled = maximumValue != 0.0
+        self.minimumValue = minimumValue
+        self.maximumValue = maximumValue
+
+class JointMotion(Base):
+    def __init__(self, jointType, axis=(0.0, 0.0, 1.0), limits=(0.0, 0.0)):
+        self.jointType = jointType
+        vector = Vector3D(*axis)
+        self.rotationAxisVector = vector
+        self.slideDirectionVector = vector
+        self.rotationLimits = JointLimits(*limits)
+        self.slideLimits = JointLimits(*limits)
+
+class JointGeometry(Base):
+    def __init__(self, origin):
+        self.origin = origin
+
+class Joint(Base):
+    def __init__(self, component, name, occurrenceOne, occurrenceTwo, jointMotion, origin):
+        self.parentComponent = component
+        self.name = name
+        self.occurrenceOne = occurrenceOne
+        self.occurrenceTwo = occurrenceTwo
+        self.jointMotion = jointMotion
+        self.geometryOrOriginOne = JointGeometry(origin.copy())
+        self.geometryOrOriginTwo = JointGeometry(origin.copy())
+        self.isSuppressed = False
+
+    def deleteMe(self):
+        self.parentComponent.joints.items.remove(self)
+        return True
+
+class RigidGroup(Base):
+    def __init__(self, component, name, occurrences):
+        self.parentComponent = component
+        self.name = name
+        self.occurrences = Collection(occurrences)
+
+class SketchFittedSplines(Collection):
+    def add(self, points):
+        spline = list(points)
+        self.items.append(spline)
+        return spline
+
+class SketchCurves(Base):
+    def __init__(self):
+        self.sketchFittedSplines = SketchFittedSplines()
+
+class Sketch(Base):
+    def __init__(self, sketches, plane):
+        self.sketches = sketches
+        self.referencePlane = plane
+        self.name = "Sketch" + str(len(sketches.items) + 1)
+        self.sketchCurves = SketchCurves()
+        self.attributes = Attributes()
+        self.timelineObject = None
+
+    def deleteMe(self):
+        self.sketches.items.remove(self)
+        self.sketches.component.design.changed("delete " + self.name, False, [self.timelineObject])
+        return True
+
+class Sketches(Collection):
+    def __init__(self, component):
+        super().__init__()
+        self.component = component
+
+    def add(self, plane):
+        sketch = Sketch(self, plane)
+        self.items.append(sketch)
+        sketch.timelineObject = self.component.design.changed("sketch")
+        return sketch
+
+class ConstructionPlane(Base):
+    def __init__(self, name):
+        self.name = name
+
+class Occurrences(Collection):
+    def __init__(self, component):
+        super().__init__()
+        self.component = component
+
+    ## Creates a new component with one occurrence in this component.
+    def addNewComponent(self, transform):
+        design = self.component.design
+        component = Component(design, "Component" + str(len(design.allComponents.items)))
+        design.allComponents.items.append(component)
+        parent = self.component.occurrence
+        occurrence = Occurrence(component, transform.copy(), parent)
+        component.occurrence = occurrence
+        self.items.append(occurrence)
+        component.timelineObjects.append(design.changed("new component"))
+        return occurrence
+
+    def asList(self):
+        return list(self.items)
+
+class Occurrence(Base):
+    def __init__(self, component, transform, parentOccurrence=None):
+        self.component = component
+        self.transform = transform
+        self.parentOccurrence = parentOccurrence
+        self.isLightBulbOn = True
+
+    @property
+    def name(self):
+        return self.component.name + ":1"
+
+    @property
+    def fullPathName(self):
+        if self.parentOccurrence is None:
+            return self.name
+        return self.parentOccurrence.fullPathName + "+" + self.name
+
+    def worldOffset(self):
+        translation = self.transform.translation
+        offset = (translation.x, translation.y, translation.z)
+        if self.parentOccurrence is not None:
+            parent = self.parentOccurrence.worldOffset()
+            offset = tuple(o + p for (o, p) in zip(offset, parent))
+        return offset
+
+    @property
+    def bRepBodies(self):
+        return Collection(body.createForAssemblyContext(self) for body in self.component.bRepBodies)
+
+    @property
+    def childOccurrences(self):
+        return self.component.occurrences
+
+    def allBodies(self):
+        bodies = list(self.bRepBodies)
+        for child in self.childOccurrences:
+            bodies.extend(child.allBodies())
+        return bodies
+
+    @property
+    def physicalProperties(self):
+        return PhysicalProperties(self.allBodies())
+
+    def getPhysicalProperties(self, accuracy=None):
+        return self.physicalProperties
+
+    def deleteMe(self):
+        if self.parentOccurrence is None:
+            self.component.design.rootComponent.occurrences.items.remove(self)
+        else:
+            self.parentOccurrence.component.occurrences.items.remove(self)
+        entries = self.component.allTimelineObjects()
+        self.component.remove()
+        self.component.design.changed("delete " + self.name, False, entries)
+        return True
+
+class Component(Base):
+    def __init__(self, design, name):
+        self.design = design
+        self.name = name
+        ## persistent id, unlike the entity token the same in every session
+        self.id = name
+        self.entityToken = "component" + str(next(_tokens))
+        ## changes whenever a body is added
+        self.revisionId = "0"
+        ## the single occurrence of the component, None for the root component
+        self.occurrence = None
+        self.bRepBodies = Collection()
+        self.occurrences = Occurrences(self)
+        self.constructionPoints = ConstructionPoints(self)
+        self.joints = Collection()
+        self.rigidGroups = Collection()
+        self.sketches = Sketches(self)
+        self.xYConstructionPlane = ConstructionPlane("XY")
+        self.customGraphicsGroups = CustomGraphicsGroups()
+        ## timeline entries of the component, they leave the timeline with its occurrence
+        self.timelineObjects = []
+
+    @property
+    def parentDesign(self):
+        return self.design
+
+    def addBody(self, name, center, size, density):
+        body = BRepBody(self, name, center, size, density)
+        self.bRepBodies.items.append(body)
+        self.revisionId = str(int(self.revisionId) + 1)
+        return body
+
+    @property
+    def allRigidGroups(self):
+        return self.rigidGroups
+
+    @property
+    def allOccurrences(self):
+        occurrences = []
+        for occurrence in self.occurrences:
+            occurrences.append(occurrence)
+            occurrences.extend(occurrence.component.allOccurrences)
+        return Collection(occurrences)
+
+    def allOccurrencesByComponent(self, component):
+        return Collection(occurrence for occurrence in self.allOccurrences if occurrence.component is component)
+
+    def allBodies(self):
+        bodies = list(self.bRepBodies)
+        for occurrence in self.occurrences:
+            bodies.extend(occurrence.allBodies())
+        return bodies
+
+    @property
+    def physicalProperties(self):
+        return PhysicalProperties(self.allBodies())
+
+    def getPhysicalProperties(self, accuracy=None):
+        return self.physicalProperties
+
+    ## Removes the component and everything below it from the design.
+    ## The timeline entries of the component and of its child components.
+    def allTimelineObjects(self):
+        entries = list(self.timelineObjects)
+        for occurrence in self.occurrences:
+            entries.extend(occurrence.component.allTimelineObjects())
+        return entries
+
+    def remove(self):
+        for occurrence in self.occurrences:
+            occurrence.component.remove()
+        if self in self.design.allComponents.items:
+            self.design.allComponents.items.remove(self)
+
+class STLExportOptions(Base):
+    def __init__(self, geometry, filename):
+        self.geometry = geometry
+        self.filename = filename
+        self.meshRefinement = MeshRefinementSettings.MeshRefinementMedium
+        self.isBinaryFormat = True
+
+class STEPExportOptions(Base):
+    def __init__(self, filename, geometry):
+        self.geometry = geometry
+        self.filename = filename
+
+class ExportManager(Base):
+    def __init__(self, design):
+        self.design = design
+
+    def createSTLExportOptions(self, geometry, filename=''):
+        return STLExportOptions(geometry, filename)
+
+    def createSTEPExportOptions(self, filename, geometry=None):
+        return STEPExportOptions(filename, geometry)
+
+    ## Writes binary STL files in mm in the frame of the occurrence.
+    def execute(self, options):
+        if isinstance(options, STEPExportOptions):
+            with open(options.filename, 'w') as file:
+                file.write("ISO-10303-21;\nEND-ISO-10303-21;\n")
+            return True
+        occurrence = options.geometry
+        offset = occurrence.worldOffset() if isinstance(occurrence, Occurrence) else (0.0, 0.0, 0.0)
+        bodies = occurrence.allBodies()
+        # finer refinements split every face further
+        subdivisions = self.design.subdivisions * refinementFactors.get(options.meshRefinement, 1)
+        triangles = [triangle for body in bodies for triangle in body.triangles(subdivisions, offset)]
+        with open(options.filename, 'wb') as file:
+            file.write(b'stand-in'.ljust(80, b' '))
+            file.write(struct.pack('<I', len(triangles)))
+            for triangle in triangles:
+                values = [0.0, 0.0, 0.0] + [10.0 * c for point in triangle for c in point]
+                file.write(struct.pack('<12fH', *values, 0))
+        return True
+
+class Design(Base):
+    def __init__(self, name="design"):
+        ## faces of the exported boxes are split into subdivisions^2 quads
+        self.subdivisions = 1
+        self.rootComponent = Component(self, name)
+        self.allComponents = Collection([self.rootComponent])
+        self.exportManager = ExportManager(self)
+        self.designType = DesignTypes.ParametricDesignType
+        self.timeline = Timeline()
+        self._isComputeDeferred = False
+        ## number of changes since the last compute
+        self.pendingChanges = 0
+        ## number of changes handled by every compute, in order
+        self.computes = []
+
+    ## Records a change made through the API, computes unless deferred.
+    #
+    # @param description the timeline entry of the change
+    # @param feature False for changes without a timeline entry, e.g. deletions
+    # @param removes the timeline entries of deleted entities, they leave the timeline
+    # @return the new timeline entry or None
+    def changed(self, description, feature=True, removes=()):
+        entry = None
+        if feature:
+            entry = TimelineObject(description)
+            self.timeline.items.append(entry)
+        for removed in removes:
+            if removed in self.timeline.items:
+                self.timeline.items.remove(removed)
+        self.pendingChanges += 1
+        if not self._isComputeDeferred:
+            self.compute()
+        return entry
+
+    def compute(self):
+        if self.pendingChanges:
+            self.computes.append(self.pendingChanges)
+            self.pendingChanges = 0
+
+    @property
+    def isComputeDeferred(self):
+        return self._isComputeDeferred
+
+    @isComputeDeferred.setter
+    def isComputeDeferred(self, value):
+        self._isComputeDeferred = value
+        if not value:
+            self.compute()
+
+    ## Deletes all entities with one compute.
+    def deleteEntities(self, entities):
+        deferred = self._isComputeDeferred
+        self._isComputeDeferred = True
+        for entity in entities:
+            entity.deleteMe()
+        self.isComputeDeferred = deferred
+        return True
+
+class TimelineObject(Base):
+    def __init__(self, name):
+        self.name = name
+
+class TimelineGroup(Base):
+    def __init__(self, items):
+        self.name = "Group"
+        self.items = items
+
+class TimelineGroups(Collection):
+    def __init__(self, timeline):
+        super().__init__()
+        self.timeline = timeline
+
+    def add(self, startIndex, endIndex):
+        group = TimelineGroup(self.timeline.items[startIndex:endIndex + 1])
+        self.items.append(group)
+        return group
+
+## The timeline as a flat list of the recorded changes.
+class Timeline(Collection):
+    def __init__(self):
+        super().__init__()
+        self.timelineGroups = TimelineGroups(self)
+
+## A circular edge, only its center is known.
+class Circle3D(Base):
+    def __init__(self, center):
+        self.center = center
+
+class BRepEdge(Base):
+    def __init__(self, center=None):
+        self.geometry = Circle3D(center if center is not None else Point3D())
+        self.entityToken = "edge" + str(next(_tokens))
+
+class CustomGraphicsPointTypes:
+    UserDefinedCustomGraphicsPointType = 0
+    PointCloudCustomGraphicsPointType = 1
+
+class CustomGraphicsCoordinates(Base):
+    def __init__(self, coordinates):
+        self.coordinates = list(coordinates)
+
+    @staticmethod
+    def create(coordinates):
+        return CustomGraphicsCoordinates(coordinates)
+
+## Custom graphics drawn in the viewport, they are not part of the design.
+class CustomGraphicsGroup(Base):
+    def __init__(self, groups):
+        self.groups = groups
+        self.isValid = True
+        ## (coordinates, indices, point type) of every point set
+        self.pointSets = []
+
+    def addPointSet(self, coordinates, indexList, pointType, pointImage):
+        self.pointSets.append((coordinates, list(indexList), pointType))
+        return self.pointSets[-1]
+
+    def deleteMe(self):
+        self.groups.items.remove(self)
+        self.isValid = False
+        return True
+
+class CustomGraphicsGroups(Collection):
+    def add(self):
+        group = CustomGraphicsGroup(self)
+        self.items.append(group)
+        return group
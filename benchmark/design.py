@@ -0,0 +1,93 @@
+## @package design
+# Synthetic designs for the stand-in adsk module.
+#
+# A design is a tree of links. Every link is a rigid group `EXPORT_link<i>`
+# holding one occurrence with a number of box bodies, links are connected by
+# `EXPORT_` joints and decorated with via-points and lighthouse sensors.
+
+import random
+import adsk.core
+import adsk.fusion
+
+## Densities of aluminium, steel and PLA in kg / cm^3.
+densities = (0.0027, 0.00785, 0.00124)
+
+## Joint types in the mix of a generated design.
+jointTypes = (adsk.fusion.JointTypes.RevoluteJointType,) * 6 + (
+    adsk.fusion.JointTypes.RigidJointType,
+    adsk.fusion.JointTypes.SliderJointType,
+    adsk.fusion.JointTypes.BallJointType)
+
+## Creates a synthetic design and makes it the active product.
+#
+# @param links the number of links, i.e. EXPORT rigid groups
+# @param bodiesPerLink the number of bodies of every link
+# @param joints the number of EXPORT joints, at most links - 1, default links - 1
+# @param viaPoints the total number of via-points, about six per motor
+# @param sensors the total number of lighthouse sensors
+# @param smallParts the number of parts lighter than 1 g outside of all links
+# @param subdivisions faces of the exported boxes are split into subdivisions^2 quads
+# @param nestedParts whether every link keeps half of its bodies in a child occurrence
+# @param seed the seed of the random generator
+# @return the design
+def generateDesign(links=10, bodiesPerLink=3, joints=None, viaPoints=0, sensors=0, smallParts=0,
+                   subdivisions=1, nestedParts=False, seed=0):
+    rng = random.Random(seed)
+    if joints is None:
+        joints = links - 1
+    joints = min(joints, links - 1)
+    design = adsk.fusion.Design("robot")
+    design.subdivisions = subdivisions
+    root = design.rootComponent
+
+    occurrences = []
+    for i in range(links):
+        name = "link" + str(i)
+        transform = adsk.core.Matrix3D.create()
+        transform.translation = adsk.core.Vector3D.create(10.0 * i, rng.uniform(-5, 5), rng.uniform(0, 5))
+        occurrence = root.occurrences.addNewComponent(transform)
+        occurrence.component.name = name
+        holder = occurrence
+        for k in range(bodiesPerLink):
+            if nestedParts and k == bodiesPerLink // 2:
+                holder = occurrence.component.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+                holder.component.name = name + "_part"
+            size = (rng.uniform(0.5, 4), rng.uniform(0.5, 4), rng.uniform(0.5, 4))
+            center = (rng.uniform(-3, 3), rng.uniform(-3, 3), rng.uniform(-3, 3))
+            holder.component.addBody("Body" + str(k), center, size, rng.choice(densities))
+        occurrences.append(occurrence)
+        root.rigidGroups.items.append(adsk.fusion.RigidGroup(root, "EXPORT_" + name, [occurrence]))
+
+    # the first links form a tree, every link hangs off an earlier one
+    for i in range(1, joints + 1):
+        parent = rng.randrange(i)
+        jointType = rng.choice(jointTypes)
+        axis = rng.choice(((1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0)))
+        limits = (-1.5, 1.5) if jointType != adsk.fusion.JointTypes.SliderJointType else (0.0, 5.0)
+        (x, y, z) = occurrences[i].worldOffset()
+        joint = adsk.fusion.Joint(root, "EXPORT_joint" + str(i), occurrences[i], occurrences[parent],
+                                  adsk.fusion.JointMotion(jointType, axis, limits), adsk.core.Point3D.create(x - 5.0, y, z))
+        root.joints.items.append(joint)
+
+    motors = max(1, viaPoints // 6)
+    counters = [0] * motors
+    for k in range(viaPoints):
+        motor = k % motors
+        link = rng.randrange(links)
+        (x, y, z) = occurrences[link].worldOffset()
+        name = "VP_motor" + str(motor) + "_EXPORT_link" + str(link) + "_" + str(counters[motor])
+        counters[motor] += 1
+        root.constructionPoints.add(name, adsk.core.Point3D.create(x + rng.uniform(-2, 2), y + rng.uniform(-2, 2), z + rng.uniform(-2, 2)))
+
+    for k in range(sensors):
+        link = rng.randrange(links)
+        (x, y, z) = occurrences[link].worldOffset()
+        root.constructionPoints.add("LS_link" + str(link) + "_" + str(k), adsk.core.Point3D.create(x + rng.uniform(-3, 3), y + rng.uniform(-3, 3), z + rng.uniform(-3, 3)))
+
+    for k in range(smallParts):
+        occurrence = root.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+        occurrence.component.name = "screw" + str(k)
+        occurrence.component.addBody("Body0", (rng.uniform(0, 10 * links), 0.0, 0.0), (0.2, 0.2, 0.5), densities[1])
+
+    adsk.core.Application.get().activeProduct = design
+    return design
@@ -0,0 +1,177 @@
+## @package run
+# Times every phase of the exporter on synthetic designs of growing size.
+#
+# Run it from the directory containing the add-in, e.g.
+#
+#     python -m SDFusion.benchmark.run --links 10 30 100 300 1000
+#
+# The stand-in adsk module in benchmark/adsk replaces the Fusion API, so the
+# numbers cover the exporter itself and not the time Fusion spends in its API.
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# the stand-in must be found before the exporter imports adsk
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import adsk.core
+from .design import generateDesign
+from ..exporter import SDFExporter
+
+## Runs one export of the active design and times its phases.
+#
+# The sequence of calls is the one of the export command in SDFusion.py.
+#
+# @param fileDir the export directory
+# @param settings attributes set on the exporter before the export
+# @return list of (phase, seconds) in call order
+def exportDesign(fileDir, settings):
+    timings = []
+    def timed(phase, function, *args):
+        start = time.perf_counter()
+        # keep the debug prints of the exporter out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = function(*args)
+        timings.append((phase, time.perf_counter() - start))
+        return result
+
+    exporter = SDFExporter()
+    exporter.modelName = "robot"
+    exporter.fileDir = fileDir
+    for (name, value) in settings.items():
+        setattr(exporter, name, value)
+    timed("createDiectoryStructure", exporter.createDiectoryStructure)
+    with exporter.transaction("SDFusion export"):
+        if exporter.runCleanUp:
+            timed("removeSmallParts", exporter.removeSmallParts)
+        if exporter.exportViaPoints:
+            timed("traverseViaPoints", exporter.traverseViaPoints)
+        exporter.createModel()
+        timed("getAllRigidGroups", exporter.getAllRigidGroups)
+        rigidGroupIndex = exporter.getRigidGroupIndex()
+        start = time.perf_counter()
+        exporter.progress.start("SDFusion", 'Processing rigid groups: %v/%m', len(rigidGroupIndex.links))
+        for name in rigidGroupIndex.links:
+            exporter.progress.step()
+            exporter.progress.message = "%v/%m " + name
+            exporter.getAllBodiesInRigidGroup(name, rigidGroupIndex.group(name))
+            exporter.copyBodiesToNewComponentAndExport(name)
+        exporter.progress.finish()
+    timings.append(("copyBodiesToNewComponentAndExport", time.perf_counter() - start))
+    timed("finishLinks", exporter.finishLinks)
+    timed("exportJointsToSDF", exporter.exportJointsToSDF)
+    if exporter.exportViaPoints:
+        timed("exportViaPointsToSDF", exporter.exportViaPointsToSDF)
+        if exporter.exportCASPR:
+            timed("exportCASPRcables", exporter.exportCASPRcables)
+            timed("exportCASPRbodies", exporter.exportCASPRbodies)
+        if exporter.exportCardsflow:
+            timed("exportToCardsflow", exporter.exportToCardsflow)
+    if exporter.exportLighthouseSensors:
+        timed("exportLighthouseSensorsToYAML", exporter.exportLighthouseSensorsToYAML)
+    timed("finish", exporter.finish)
+    timings.append(("total", sum(seconds for (_, seconds) in timings)))
+    return timings
+
+## Fits t = c * n^k through the measurements and returns k.
+def scalingExponent(sizes, seconds):
+    points = [(math.log(n), math.log(t)) for (n, t) in zip(sizes, seconds) if t > 0]
+    if len(points) < 2:
+        return float('nan')
+    meanX = sum(x for (x, _) in points) / len(points)
+    meanY = sum(y for (_, y) in points) / len(points)
+    variance = sum((x - meanX) ** 2 for (x, _) in points)
+    if variance == 0:
+        return float('nan')
+    return sum((x - meanX) * (y - meanY) for (x, y) in points) / variance
+
+## Benchmarks the exporter for every design size.
+#
+# @param sizes the numbers of links
+# @param repeat the best of this many runs is reported
+# @param rerun also time a second, incremental export into the same directory
+# @param design keyword arguments of generateDesign besides the counts
+# @param settings attributes set on the exporter
+# @param viaPointsPerLink via-points of the design per link
+# @param sensorsPerLink lighthouse sensors of the design per link
+# @param smallPartsPerLink parts lighter than 1 g of the design per link
+# @param subtree link whose subtree the rerun exports again, "" reruns everything
+# @return {"sizes": [...], "phases": {phase: [seconds per size]}}
+def benchmark(sizes, repeat=1, rerun=False, design=None, settings=None, viaPointsPerLink=0, sensorsPerLink=0, smallPartsPerLink=0, subtree=""):
+    design = dict(design or {})
+    settings = dict(settings or {})
+    phases = {}
+    for (index, links) in enumerate(sizes):
+        best = {}
+        for _ in range(repeat):
+            fileDir = tempfile.mkdtemp(prefix="sdfusion_benchmark_")
+            try:
+                generateDesign(links, viaPoints=links * viaPointsPerLink, sensors=links * sensorsPerLink,
+                               smallParts=links * smallPartsPerLink, **design)
+                runs = [("", exportDesign(fileDir, settings))]
+                if rerun:
+                    runs.append((" (cached)", exportDesign(fileDir, dict(settings, subtreeRoot=subtree))))
+                for (suffix, timings) in runs:
+                    for (phase, seconds) in timings:
+                        key = phase + suffix
+                        best[key] = min(best.get(key, seconds), seconds)
+            finally:
+                shutil.rmtree(fileDir, ignore_errors=True)
+        for (phase, seconds) in best.items():
+            phases.setdefault(phase, [float('nan')] * len(sizes))[index] = seconds
+    return {"sizes": list(sizes), "phases": phases}
+
+## Formats the result of benchmark as a table with one row per phase.
+def formatTable(result):
+    sizes = result["sizes"]
+    width = max([len(phase) for phase in result["phases"]] + [5])
+    lines = ["phase".ljust(width) + "".join(("%d links" % n).rjust(12) for n in sizes) + "  scaling"]
+    for (phase, seconds) in result["phases"].items():
+        exponent = scalingExponent(sizes, seconds)
+        lines.append(phase.ljust(width) + "".join(("%.4f" % t).rjust(12) for t in seconds) + ("  n^%.2f" % exponent))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Times the SDFusion exporter on synthetic designs.")
+    parser.add_argument("--links", type=int, nargs="+", default=[10, 30, 100, 300, 1000])
+    parser.add_argument("--bodies", type=int, default=3, help="bodies per link")
+    parser.add_argument("--via-points", type=int, default=4, help="via-points per link")
+    parser.add_argument("--sensors", type=int, default=0, help="lighthouse sensors per link")
+    parser.add_argument("--small-parts", type=int, default=0, help="parts lighter than 1 g per link, removed by the clean up")
+    parser.add_argument("--subdivisions", type=int, default=1, help="the exported boxes have 12 * subdivisions^2 triangles")
+    parser.add_argument("--repeat", type=int, default=1, help="report the best of this many runs")
+    parser.add_argument("--rerun", action="store_true", help="also time an incremental export into the same directory")
+    parser.add_argument("--subtree", default="", help="with --rerun, only export the subtree of this link again")
+    parser.add_argument("--postprocess", action="store_true", help="post-process the exported meshes")
+    parser.add_argument("--simplify", action="store_true", help="simplify the collision geometry")
+    parser.add_argument("--visual-mesh", default="low", choices=("low", "medium", "high"), help="mesh refinement of the visuals")
+    parser.add_argument("--collision-mesh", default="low", choices=("low", "medium", "high"), help="mesh refinement of the collisions")
+    parser.add_argument("--package", default="", choices=("", "zip", "tar.zst"), help="also pack every export into an archive")
+    parser.add_argument("--mesh-store", default="", help="directory of a mesh store shared by the exports")
+    parser.add_argument("--trace", action="store_true", help="trace the exports, this adds the tracing overhead to the timings")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    result = benchmark(args.links, args.repeat, args.rerun,
+                       design={"bodiesPerLink": args.bodies, "subdivisions": args.subdivisions},
+                       settings={"exportViaPoints": args.via_points > 0, "exportCASPR": args.via_points > 0,
+                                 "exportLighthouseSensors": args.sensors > 0,
+                                 "postProcessMeshes": args.postprocess, "simplifyCollisions": args.simplify,
+                                 "runCleanUp": args.small_parts > 0, "meshStore": args.mesh_store, "packageFormat": args.package,
+                                 "visualMesh": args.visual_mesh, "collisionMesh": args.collision_mesh, "trace": args.trace},
+                       viaPointsPerLink=args.via_points, sensorsPerLink=args.sensors, smallPartsPerLink=args.small_parts, subtree=args.subtree)
+    print(formatTable(result))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(result, file, indent=1)
+
+if __name__ == "__main__":
+    main()
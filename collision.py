@@ -0,0 +1,240 @@
+## @package collision
+# Simplified collision geometry for the links.
+#
+# Contact checks against the full resolution CAD mesh dominate the simulation
+# step time. This module replaces the collision geometry of a link by its
+# convex hull, or by a box, cylinder or sphere if such a primitive encloses
+# the hull with a relative volume error below a threshold. The detailed mesh
+# stays the visual geometry. It needs NumPy.
+#
+# The shape of every link can be overridden with a construction point called
+# `COL_<shape>_<link>`, where shape is one of the modes below.
+
+import math
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import meshes
+
+## Keep the full mesh as collision geometry.
+MESH = "mesh"
+## Use the convex hull.
+HULL = "hull"
+## Use a box, cylinder or sphere if one fits well enough, else the convex hull.
+AUTO = "auto"
+BOX = "box"
+CYLINDER = "cylinder"
+SPHERE = "sphere"
+modes = (MESH, HULL, AUTO, BOX, CYLINDER, SPHERE)
+
+## Computes the convex hull of a point cloud with quickhull.
+#
+# @param points float array of shape (n, 3)
+# @return (vertices, faces) with outward facing, counter-clockwise faces
+def convexHull(points):
+    points = np.unique(np.asarray(points, dtype=np.float64), axis=0)
+    if len(points) < 4:
+        raise ValueError("a convex hull needs at least 4 distinct points")
+    extent = np.ptp(points, axis=0).max()
+    eps = 1e-7 * extent
+
+    # initial tetrahedron from extreme points
+    i0 = int(np.argmin(points[:, 0]))
+    i1 = int(np.argmax(np.linalg.norm(points - points[i0], axis=1)))
+    line = points[i1] - points[i0]
+    i2 = int(np.argmax(np.linalg.norm(np.cross(points - points[i0], line), axis=1)))
+    normal = np.cross(line, points[i2] - points[i0])
+    if np.linalg.norm(normal) <= eps * extent:
+        raise ValueError("the points are collinear")
+    distances = (points - points[i0]) @ normal / np.linalg.norm(normal)
+    i3 = int(np.argmax(np.abs(distances)))
+    if abs(distances[i3]) <= eps:
+        raise ValueError("the points are coplanar")
+    if distances[i3] > 0:
+        (i1, i2) = (i2, i1)
+
+    faces = {}
+    normals = {}
+    offsets = {}
+    outside = {}
+    edges = {}
+    nextId = [0]
+
+    def addFace(a, b, c):
+        fid = nextId[0]
+        nextId[0] += 1
+        n = np.cross(points[b] - points[a], points[c] - points[a])
+        length = np.linalg.norm(n)
+        if length > 0:
+            n = n / length
+        faces[fid] = (a, b, c)
+        normals[fid] = n
+        offsets[fid] = n @ points[a]
+        for edge in ((a, b), (b, c), (c, a)):
+            edges[edge] = fid
+        return fid
+
+    def assign(candidates, fids):
+        if len(candidates) == 0 or len(fids) == 0:
+            return
+        n = np.array([normals[f] for f in fids])
+        o = np.array([offsets[f] for f in fids])
+        d = points[candidates] @ n.T - o
+        best = np.argmax(d, axis=1)
+        outsideMask = d[np.arange(len(candidates)), best] > eps
+        for (k, fid) in enumerate(fids):
+            members = candidates[outsideMask & (best == k)]
+            if len(members):
+                outside[fid] = members
+
+    initial = [addFace(i0, i1, i2), addFace(i0, i3, i1), addFace(i1, i3, i2), addFace(i2, i3, i0)]
+    assign(np.setdiff1d(np.arange(len(points)), [i0, i1, i2, i3]), initial)
+
+    while outside:
+        fid = next(iter(outside))
+        members = outside[fid]
+        apex = int(members[np.argmax(points[members] @ normals[fid] - offsets[fid])])
+        p = points[apex]
+        # collect all faces visible from the apex
+        visible = {fid}
+        stack = [fid]
+        horizon = []
+        while stack:
+            current = stack.pop()
+            (a, b, c) = faces[current]
+            for (u, v) in ((a, b), (b, c), (c, a)):
+                neighbour = edges.get((v, u))
+                if neighbour is None or neighbour in visible:
+                    continue
+                if normals[neighbour] @ p - offsets[neighbour] > eps:
+                    visible.add(neighbour)
+                    stack.append(neighbour)
+        for current in visible:
+            (a, b, c) = faces[current]
+            for (u, v) in ((a, b), (b, c), (c, a)):
+                if edges.get((v, u)) not in visible:
+                    horizon.append((u, v))
+        orphans = [outside.pop(current) for current in visible if current in outside]
+        for current in visible:
+            (a, b, c) = faces.pop(current)
+            for edge in ((a, b), (b, c), (c, a)):
+                if edges.get(edge) == current:
+                    del edges[edge]
+            del normals[current]
+            del offsets[current]
+        newFaces = [addFace(u, v, apex) for (u, v) in horizon]
+        if orphans:
+            orphans = np.concatenate(orphans)
+            assign(orphans[orphans != apex], newFaces)
+
+    triangles = np.array(list(faces.values()), dtype=np.int64)
+    (used, inverse) = np.unique(triangles, return_inverse=True)
+    return (points[used], inverse.reshape(-1, 3))
+
+## Volume of a closed, outward oriented triangle mesh.
+def meshVolume(vertices, faces):
+    triangles = vertices[faces]
+    return np.einsum('ij,ij->i', triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2])).sum() / 6.0
+
+## Converts a rotation matrix to SDF roll, pitch and yaw.
+def rotationToRPY(rotation):
+    r11 = rotation[0, 0]
+    r21 = rotation[1, 0]
+    r31 = rotation[2, 0]
+    r32 = rotation[2, 1]
+    r33 = rotation[2, 2]
+    pitch = math.atan2(-r31, math.sqrt(r11 * r11 + r21 * r21))
+    if abs(math.cos(pitch)) < 1e-9:
+        # gimbal lock, put all rotation about z into yaw
+        return (0.0, pitch, math.atan2(-rotation[0, 1], rotation[1, 1]))
+    return (math.atan2(r32, r33), pitch, math.atan2(r21, r11))
+
+## Principal axes of a point cloud as a right-handed rotation matrix.
+def principalAxes(vertices):
+    centered = vertices - vertices.mean(axis=0)
+    (_, axes) = np.linalg.eigh(centered.T @ centered)
+    if np.linalg.det(axes) < 0:
+        axes[:, 0] = -axes[:, 0]
+    return axes
+
+def _pose(center, rotation):
+    return tuple(float(v) for v in center) + rotationToRPY(rotation)
+
+## Fits an oriented box around the hull along its principal axes.
+#
+# @return (error, result) where error is the relative excess volume
+def fitBox(vertices, axes, volume):
+    local = vertices @ axes
+    (low, high) = (local.min(axis=0), local.max(axis=0))
+    size = high - low
+    boxVolume = float(np.prod(size))
+    center = axes @ ((low + high) / 2)
+    result = {"shape": BOX, "size": tuple(float(v) for v in size), "pose": _pose(center, axes)}
+    return (1 - volume / boxVolume if boxVolume > 0 else 1.0, result)
+
+## Fits the smallest cylinder along one of the principal axes of the hull.
+def fitCylinder(vertices, axes, volume):
+    local = vertices @ axes
+    (low, high) = (local.min(axis=0), local.max(axis=0))
+    middle = (low + high) / 2
+    best = None
+    for k in range(3):
+        others = [i for i in range(3) if i != k]
+        radius = float(np.linalg.norm(local[:, others] - middle[others], axis=1).max())
+        length = float(high[k] - low[k])
+        cylinderVolume = math.pi * radius * radius * length
+        if best is None or cylinderVolume < best[0]:
+            best = (cylinderVolume, k, others, radius, length)
+    (cylinderVolume, k, others, radius, length) = best
+    # the cylinder axis is the z axis of its frame
+    rotation = axes[:, others + [k]]
+    if np.linalg.det(rotation) < 0:
+        rotation[:, 0] = -rotation[:, 0]
+    result = {"shape": CYLINDER, "radius": radius, "length": length, "pose": _pose(axes @ middle, rotation)}
+    return (1 - volume / cylinderVolume if cylinderVolume > 0 else 1.0, result)
+
+## Fits a sphere around the center of the oriented bounding box of the hull.
+def fitSphere(vertices, axes, volume):
+    local = vertices @ axes
+    middle = (local.min(axis=0) + local.max(axis=0)) / 2
+    radius = float(np.linalg.norm(local - middle, axis=1).max())
+    sphereVolume = 4.0 / 3.0 * math.pi * radius ** 3
+    result = {"shape": SPHERE, "radius": radius, "pose": _pose(axes @ middle, np.identity(3))}
+    return (1 - volume / sphereVolume if sphereVolume > 0 else 1.0, result)
+
+## Computes the collision geometry of one exported link.
+#
+# @param filename the STL file of the link
+# @param mode one of modes
+# @param scale factor converting the STL units to metres
+# @param threshold the largest relative volume error of a fitted primitive
+# @param hullFilename where the convex hull is written as binary STL in metres
+# @return a dict describing the shape, poses and sizes are in metres
+def simplifyStl(filename, mode, scale, threshold, hullFilename):
+    if mode == MESH:
+        return {"shape": MESH}
+    points = meshes.readStl(filename).reshape(-1, 3) * scale
+    try:
+        (vertices, faces) = convexHull(points)
+    except ValueError as e:
+        return {"shape": MESH, "reason": str(e)}
+    volume = meshVolume(vertices, faces)
+    axes = principalAxes(vertices)
+    fits = {BOX: fitBox, CYLINDER: fitCylinder, SPHERE: fitSphere}
+    if mode in fits:
+        (error, result) = fits[mode](vertices, axes, volume)
+        result["error"] = float(error)
+        return result
+    if mode == AUTO:
+        candidates = [fit(vertices, axes, volume) for fit in fits.values()]
+        (error, result) = min(candidates, key=lambda candidate: candidate[0])
+        if error <= threshold:
+            result["error"] = float(error)
+            return result
+    os.makedirs(os.path.dirname(hullFilename), exist_ok=True)
+    meshes.writeBinaryStl(hullFilename, vertices, faces)
+    return {"shape": HULL, "file": hullFilename, "vertices": len(vertices), "faces": len(faces)}
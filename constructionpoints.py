@@ -0,0 +1,122 @@
+## @package constructionpoints
+# Index of all annotated construction points of a design.
+#
+# SDFusion encodes link annotations in the names of construction points:
+#
+# - `COM_<link>` overrides the center of mass of a link
+# - `VP_motor<N>_EXPORT_<link>_<k>` is the k-th via-point of motor N
+# - `EE_<link>` is an end effector
+# - `VM_<link>` is a visual marker
+# - `LS_<link>_<k>` is the k-th lighthouse sensor of a link
+# - `COL_<shape>_<link>` overrides the collision shape of a link
+#
+# The index parses every name exactly once per export and groups the points
+# by prefix and link name, so each exporter stage is a dictionary lookup.
+
+from collections import defaultdict
+
+## A parsed construction point.
+class ConstructionPointEntry:
+    name = ""
+    prefix = ""
+    link = ""
+    motor = ""
+    number = ""
+    option = ""
+    position = (0.0, 0.0, 0.0)
+    point = None
+    def __init__(self, name, prefix, link, position, motor='', number='', point=None, option=''):
+        self.name = name
+        self.prefix = prefix
+        self.link = link
+        self.position = position
+        self.motor = motor
+        self.number = number
+        self.point = point
+        self.option = option
+
+## Splits a construction point name into its annotation fields.
+#
+# @param name the name of the construction point
+# @return (prefix, link, motor, number, option) or None if the name is not an annotation
+def parseConstructionPointName(name):
+    info = name.split("_")
+    prefix = info[0]
+    if prefix == "COM" and len(info) > 1:
+        return (prefix, name[4:], '', '', '')
+    if prefix == "VP" and len(info) > 3 and info[1][:5] == "motor":
+        return (prefix, '_'.join(info[3:-1]), info[1][5:], info[-1], '')
+    if prefix in ("EE", "VM") and len(info) > 1:
+        return (prefix, '_'.join(info[1:]), '', '', '')
+    if prefix == "LS" and len(info) > 2:
+        return (prefix, '_'.join(info[1:-1]), '', info[-1], '')
+    if prefix == "COL" and len(info) > 2:
+        return (prefix, '_'.join(info[2:]), '', '', info[1])
+    return None
+
+class ConstructionPointIndex:
+    prefixes = ("COM", "VP", "EE", "VM", "LS", "COL")
+
+    def __init__(self):
+        self.byLink = defaultdict(lambda: defaultdict(list))
+        self.byPrefix = defaultdict(list)
+        ## all entries, in design order
+        self.entries = []
+        ## names starting with a known prefix that could not be parsed
+        self.malformed = []
+
+    ## Adds one construction point to the index.
+    #
+    # @param name the name of the construction point
+    # @param position the (x, y, z) position in design coordinates (cm)
+    # @param point the originating construction point, if any
+    # @return the new entry or None if the name carries no annotation
+    def add(self, name, position, point=None):
+        parsed = parseConstructionPointName(name)
+        if parsed is None:
+            if name.split("_")[0] in self.prefixes:
+                self.malformed.append(name)
+            return None
+        (prefix, link, motor, number, option) = parsed
+        entry = ConstructionPointEntry(name, prefix, link, position, motor, number, point, option)
+        self.byLink[prefix][link].append(entry)
+        self.byPrefix[prefix].append(entry)
+        self.entries.append(entry)
+        return entry
+
+    ## Scans the construction points of all components once.
+    #
+    # @param components an iterable of components, e.g. design.allComponents
+    # @param known positions of points by name that do not have to be read again
+    def build(self, components, known=None):
+        known = known or {}
+        for com in components:
+            if com is None:
+                continue
+            for point in com.constructionPoints:
+                if point is None:
+                    continue
+                name = point.name
+                if name in known:
+                    self.add(name, known[name], point)
+                    continue
+                geometry = point.geometry
+                self.add(name, (geometry.x, geometry.y, geometry.z), point)
+        return self
+
+    ## All entries of a prefix for one link, in design order.
+    def get(self, prefix, link):
+        if link not in self.byLink[prefix]:
+            return []
+        return self.byLink[prefix][link]
+
+    ## All entries of a prefix, in design order.
+    def all(self, prefix):
+        return self.byPrefix[prefix]
+
+    ## All entries of a prefix grouped by motor number, in design order.
+    def byMotor(self, prefix="VP"):
+        motors = defaultdict(list)
+        for entry in self.byPrefix[prefix]:
+            motors[entry.motor].append(entry)
+        return motors
@@ -0,0 +1,1013 @@
+## @package engine
+# Fusion-free export engine.
+#
+# ModelEmitter builds the SDF, CASPR, CARDSflow, OpenSim and lighthouse sensor
+# outputs from a DesignSnapshot (see snapshot.py). The Fusion 360 exporter
+# subclasses it and only fills the snapshot from the live design, so the same
+# emitters can regenerate the outputs of a previous export without Fusion:
+#
+#     emitter = ModelEmitter(DesignSnapshot.load("path/to/export"))
+#     emitter.run("path/to/output")
+
+import os
+import shutil
+import traceback
+import xml.etree.ElementTree as ET
+import math
+from collections import defaultdict
+from .helpers import *
+from .constructionpoints import ConstructionPointIndex
+from .kinematics import KinematicTree
+from .viapoints import ViaPointTable, TendonGeometry
+from .exportcache import ExportCache
+from .snapshot import DesignSnapshot, snapshotName, translation
+from .tracing import Tracer, traced
+from .worker import ExportWorker
+from .meshstore import storeMesh
+from . import meshes
+from . import collision
+from . import massproperties
+from . import modelpackage
+from . import writers
+
+class ModelEmitter():
+    root = None
+    model = None
+
+    osimroot = None
+    cardsflowroot = None
+
+    logfile = "log.txt"
+    fileDir = ""
+    modelName = ""
+
+    exportMeshes = True
+    ## Refinement of the meshes of the <visual> and <collision> elements, see meshes.levels.
+    visualMesh = meshes.LOW
+    collisionMesh = meshes.LOW
+    ## Rewrite the STL files as welded binary meshes in metres.
+    postProcessMeshes = False
+    ## Replace the collision meshes by convex hulls or fitted primitives.
+    simplifyCollisions = False
+    ## Largest relative volume error of a box, cylinder or sphere replacing a link.
+    collisionFitThreshold = 0.15
+    exportViaPoints = False
+    exportLighthouseSensors = False
+    exportCASPR = False
+    exportCardsflow = True
+    exportOpenSimMuscles = False
+    self_collide = False
+    ## Indent the XML outputs, otherwise they are written on a single line.
+    prettyXml = True
+    dummy_inertia = False
+    ## Where the mass properties come from, one of massproperties.modes.
+    massProperties = massproperties.FUSION
+    ## Densities in kg / cm^3 by link or material name for the mesh based mass properties.
+    densities = {}
+    ## Density of links without any known material in kg / cm^3.
+    defaultDensity = massproperties.steel
+    ## Directory of a mesh store shared by exports, see meshstore.py, empty
+    # to keep plain mesh files in the export directory.
+    meshStore = ""
+    ## Number of worker processes, None for one less than the number of CPUs
+    # and 0 to write all outputs on the main thread.
+    workerProcesses = None
+    ## Record timings, API calls and memory of every phase in trace.json and trace.txt.
+    trace = False
+    ## Also pack the model into <modelName>.zip or .tar.zst next to fileDir, see modelpackage.formats.
+    packageFormat = modelpackage.NONE
+
+    ## Settings stored in the snapshot, they are applied again by run().
+    settingNames = ("exportMeshes", "postProcessMeshes", "simplifyCollisions", "collisionFitThreshold",
+                    "exportViaPoints", "exportLighthouseSensors", "exportCASPR", "exportCardsflow",
+                    "exportOpenSimMuscles", "self_collide", "prettyXml", "dummy_inertia", "trace",
+                    "massProperties", "densities", "defaultDensity", "meshStore", "visualMesh", "collisionMesh",
+                    "packageFormat")
+
+    ## Global variable to specify the file name of the plugin loaded by the SDF.
+    # Only necessary if **exportViaPoints** is **True**.
+    pluginFileName = "libcardsflow_gazebo_plugin.so"
+
+    ## Global variable to specify the name of the plugin loaded by the SDF-
+    # Only necessary if **exportViaPoints** id **True**.
+    pluginName = "cardsflow_gazebo_plugin"
+
+    def __init__(self, snapshot=None):
+        if snapshot is None:
+            snapshot = DesignSnapshot()
+        self.snapshot = snapshot
+        ## Index of all annotated construction points, built once per export.
+        self.pointIndex = None
+        self.tree = None
+        ## Via-points of all muscles, filled by exportViaPointsToSDF.
+        self.viaPointTable = ViaPointTable()
+        self.tendonGeometry = None
+        ## Fingerprints and mass properties of the previous export.
+        self.exportCache = None
+        ## Worker processes for everything that does not need the Fusion API.
+        self.worker = None
+        self.meshJobs = {}
+        self.meshScales = {}
+        self.linksFinished = False
+        self.collisions = {}
+        ## names of the links whose collision is a convex hull in meshes/collision
+        self.hulls = set()
+        self.inertials = {}
+        ## futures of the output files written by the workers
+        self.outputJobs = []
+        ## archive the outputs are packed into, see openPackage
+        self.package = None
+        self.packageErrors = []
+        ## output files whose content changed, relative to fileDir
+        self.changedOutputs = []
+        self.tracer = Tracer()
+
+    ## Returns the current settings as a dict, see settingNames.
+    def getSettings(self):
+        return {name: getattr(self, name) for name in self.settingNames}
+
+    ## Applies settings, unknown names are ignored.
+    def applySettings(self, settings):
+        for name in self.settingNames:
+            if name in settings:
+                setattr(self, name, settings[name])
+
+    ## Reports an error that does not stop the export.
+    def reportError(self, message):
+        self.logfile.write("ERROR " + message + "\n")
+
+    def createDiectoryStructure(self):
+        if self.trace:
+            self.tracer.start()
+        # the directory of a previous export is reused for incremental exports
+        os.makedirs(self.fileDir+'/meshes/CAD', exist_ok=True)
+        for level in self.meshLevels():
+            os.makedirs(os.path.dirname(os.path.join(self.fileDir, meshes.meshFile('', level))), exist_ok=True)
+        if self.exportLighthouseSensors:
+            os.makedirs(self.fileDir+'/lighthouseSensors', exist_ok=True)
+        if self.exportCASPR:
+            os.makedirs(self.fileDir+'/caspr', exist_ok=True)
+        self.logfile = open(self.fileDir+'/logfile.txt', 'w')
+        self.worker = ExportWorker(self.workerProcesses)
+        if not self.worker.start() and self.worker.numberOfProcesses > 0:
+            self.logfile.write("WARNING: could not start worker processes, writing outputs on the main thread\n")
+        self.meshJobs = {}
+        self.meshScales = {}
+        self.linksFinished = False
+        self.collisions = {}
+        self.inertials = {}
+        self.package = None
+        self.packageErrors = []
+        if self.postProcessMeshes and not meshes.available():
+            self.logfile.write("WARNING: NumPy is not installed, meshes are not post-processed\n")
+            self.postProcessMeshes = False
+
+    ## Builds the sdf root and model nodes.
+    def createModel(self):
+        self.snapshot.modelName = self.modelName
+        self.root = ET.Element("sdf", version="1.6")
+        self.model = ET.Element("model", name=self.modelName)
+        self.root.append(self.model)
+
+    ## Returns the construction point index of the snapshot.
+    def getConstructionPointIndex(self):
+        if self.pointIndex is None:
+            self.pointIndex = ConstructionPointIndex()
+            for (name, position) in self.snapshot.points:
+                self.pointIndex.add(name, position)
+        return self.pointIndex
+
+    ## Regenerates all outputs of a snapshot without Fusion.
+    #
+    # The settings stored in the snapshot are used unless they are overridden.
+    # Meshes are copied if the output directory differs from the directory the
+    # snapshot was loaded from.
+    #
+    # @param fileDir the output directory
+    # @param settings settings overriding the ones of the snapshot
+    # @return list of error messages of the output files that failed
+    def run(self, fileDir, **settings):
+        self.applySettings(self.snapshot.settings)
+        self.applySettings(settings)
+        self.modelName = self.snapshot.modelName
+        self.fileDir = fileDir
+        self.createDiectoryStructure()
+        sourceDir = self.snapshot.sourceDir
+        if sourceDir and os.path.abspath(sourceDir) == os.path.abspath(fileDir):
+            self.exportCache = ExportCache(self.fileDir).load()
+        for link in self.snapshot.links.values():
+            if self.exportMeshes:
+                for level in self.meshLevels():
+                    if level not in link.meshes:
+                        self.logfile.write("WARNING: the snapshot has no " + level + " mesh of " + link.name + "\n")
+            for mesh in link.meshes.values():
+                if not sourceDir or os.path.abspath(sourceDir) == os.path.abspath(fileDir):
+                    continue
+                source = os.path.join(sourceDir, mesh)
+                os.makedirs(os.path.dirname(os.path.join(fileDir, mesh)), exist_ok=True)
+                if os.path.isfile(source) and self.meshStore:
+                    storeMesh(self.meshStore, source, os.path.join(fileDir, mesh))
+                elif os.path.isfile(source):
+                    shutil.copyfile(source, os.path.join(fileDir, mesh))
+                else:
+                    self.logfile.write("WARNING: mesh " + mesh + " of " + link.name + " is missing\n")
+        self.createModel()
+        for name in self.snapshot.links:
+            self.model.append(self.linkSDF(name))
+        self.finishLinks()
+        self.exportJointsToSDF()
+        if self.exportViaPoints:
+            self.exportViaPointsToSDF()
+            if self.exportCASPR:
+                self.exportCASPRcables()
+                self.exportCASPRbodies()
+            if self.exportCardsflow:
+                self.exportToCardsflow()
+        if self.exportLighthouseSensors:
+            self.exportLighthouseSensorsToYAML()
+        return self.finish()
+
+    @traced()
+    def exportJointsToSDF(self):
+        for joint in self.getKinematicTree().jointOrder():
+            self.model.append(self.jointSDF(joint))
+
+    ## Returns the kinematic tree of the snapshot, built once all joints are known.
+    def getKinematicTree(self):
+        if self.tree is None:
+            self.tree = KinematicTree.fromSnapshot(self.snapshot)
+            for problem in self.tree.problems():
+                self.logfile.write("ERROR in the kinematic tree: " + problem + "\n")
+        return self.tree
+
+    @traced()
+    def exportViaPointsToSDF(self):
+        pointIndex = self.getConstructionPointIndex()
+        EEs = []
+        VMs = []
+        for entry in pointIndex.all("VP"):
+            try:
+                origin = translation(self.snapshot.links[entry.link].transform)
+                self.viaPointTable.add(entry.name, entry.motor, entry.link, entry.number, entry.position, origin)
+            except:
+                self.reportError("Exception in " + entry.name + '\n' +traceback.format_exc())
+        for (prefix, markers) in (("EE", EEs), ("VM", VMs)):
+            for entry in pointIndex.all(prefix):
+                try:
+                    origin = translation(self.snapshot.links[entry.link].transform)
+                    dist = [p - o for (p, o) in zip(entry.position, origin)]
+                    marker = VisualMarker()
+                    marker.coordinates = str(dist[0]*0.01) + " " + str(dist[1]*0.01) + " " + str(dist[2]*0.01)
+                    marker.link = entry.link
+                    markers.append(marker)
+                except:
+                    self.reportError("Exception in " + entry.name + '\n' +traceback.format_exc())
+
+        plugin = ET.Element("plugin", filename=self.pluginFileName, name=self.pluginName)
+        if (not self.exportOpenSimMuscles):
+            self.model.append(plugin)
+        #allMyoMuscles.sort(key=lambda x: x.number)
+        # create myoMuscle nodes
+        # self.contructViapointTree(plugin)
+
+        i = 0
+        for ee in EEs:
+            endeffector = ET.Element("endEffector", name="endeffector"+str(i), link=ee.link)
+            i = i+1
+            endeffector.text = ee.coordinates
+            plugin.append(endeffector)
+        for vm in VMs:
+            marker = ET.Element("marker", link=vm.link)
+            marker.text = vm.coordinates
+            plugin.append(marker)
+
+        if (self.exportOpenSimMuscles):
+            self.exportOpenSimMusclesToOsim()
+
+    ## Returns the segments and path lengths of all tendons, computed once all via-points are known.
+    def getTendonGeometry(self):
+        if self.tendonGeometry is None:
+            with self.tracer.phase("computeTendonGeometry"):
+                self.tendonGeometry = TendonGeometry(self.viaPointTable)
+        return self.tendonGeometry
+
+    def contructViapointTree(self, rootElement):
+        table = self.viaPointTable
+        geometry = self.getTendonGeometry()
+        for (motor, rows) in table.tendons():
+            # path length and segments at the reference pose, in m
+            myoMuscle = ET.Element("myoMuscle", name="motor"+motor, length=str(geometry.length(motor)))
+            rootElement.append(myoMuscle)
+            link = ET.Element("link", name="default")
+            # create viaPoint nodes as children of links
+            for row in rows:
+                linkName = table.linkName(row)
+                if link.get("name") != linkName:
+                    link = ET.Element("link", name=linkName)
+                    myoMuscle.append(link)
+                # TODO: export more types of viaPoints
+                viaPoint = ET.Element("viaPoint", type="FIXPOINT")
+                # TODO: rotate global coordinates into link frame coordinates
+                viaPoint.text = table.coordinates(row)
+                if row != rows[-1]:
+                    viaPoint.set("segment", geometry.segment(row))
+                    viaPoint.set("segment_length", str(geometry.segmentLengths[row]))
+                link.append(viaPoint)
+
+    @traced()
+    def exportLighthouseSensorsToYAML(self):
+        DarkRoomSensors = defaultdict(list)
+        for entry in self.getConstructionPointIndex().all("LS"):
+            if entry.link not in self.snapshot.links:
+                self.logfile.write("WARNING: lighthouse sensor " + entry.name + " belongs to no exported link\n")
+                continue
+            # the lighthouse sensors shall be relative to COM, such that the pose estimation returns a pose for the COM
+            com = self.snapshot.links[entry.link].com
+            DarkRoomSensors[entry.link].append(tuple(p - c for (p, c) in zip(entry.position, com)))
+        objectID = 0
+        for name,sensors in DarkRoomSensors.items():
+            self.writeOutput('writers.writeLighthouseSensorsYAML', self.fileDir+'/lighthouseSensors/' + name+'.yaml', name, objectID, sensors)
+            objectID = objectID + 1
+
+    ## Export settings that change the content of the STL files.
+    def meshSettings(self):
+        return "postProcessMeshes=" + str(self.postProcessMeshes)
+
+    ## Returns the mesh refinement levels needed by the SDF, coarse to fine.
+    def meshLevels(self):
+        return [level for level in meshes.levels if level in (self.visualMesh, self.collisionMesh)]
+
+    ## Waits for the post-processing of all exported meshes and hashes them.
+    #
+    # Links whose mesh could not be post-processed fall back to the millimetre
+    # scale in the SDF and are rebuilt on the next export. With a mesh store
+    # the meshes are moved into the store and linked back.
+    @traced()
+    def finishMeshes(self):
+        meshHashes = {}
+        for ((name, level), future) in self.meshJobs.items():
+            if future is not None:
+                if future.exception() is not None:
+                    self.logfile.write("ERROR post-processing " + level + " mesh of " + name + ": " + str(future.exception()) + "\n")
+                    if level in self.meshScales.get(name, {}):
+                        self.meshScales[name][level].text = "0.001 0.001 0.001"
+                    if self.exportCache is not None:
+                        self.exportCache.forget(name)
+                    continue
+                (_, before, after, vertices) = future.result()
+                self.logfile.write(level + " mesh " + name + ": " + str(before) + " -> " + str(after) + " triangles, " + str(vertices) + " vertices\n")
+            filename = os.path.join(self.fileDir, meshes.meshFile(name, level))
+            if self.meshStore:
+                meshHashes[(name, level)] = self.worker.submit('meshstore.storeMesh', self.meshStore, filename)
+            else:
+                meshHashes[(name, level)] = self.worker.submit('writers.hashFile', filename)
+        added = 0
+        for ((name, level), future) in meshHashes.items():
+            if future.exception() is not None:
+                if self.meshStore:
+                    self.logfile.write("ERROR storing " + level + " mesh of " + name + ": " + str(future.exception()) + "\n")
+                continue
+            result = future.result()
+            if self.meshStore:
+                added += result[2]
+                if not result[3]:
+                    self.logfile.write("WARNING: could not link " + level + " mesh of " + name + " to the mesh store, keeping a copy\n")
+            if self.exportCache is not None:
+                self.exportCache.setMeshHash(name, level, result[1])
+        if self.meshStore:
+            self.logfile.write("mesh store: " + str(added) + " of " + str(len(meshHashes)) + " meshes are new\n")
+
+    ## Waits for the meshes of all links and applies their mass properties.
+    #
+    # Runs once all links are exported and before the joints, so the SDF, the
+    # CASPR bodies and the lighthouse sensors are written with the same mass
+    # properties when they come from the meshes.
+    @traced()
+    def finishLinks(self):
+        if self.linksFinished:
+            return
+        self.linksFinished = True
+        self.finishMeshes()
+        self.finishMassProperties()
+
+    ## Computes the mass properties of all links from their meshes in the workers.
+    #
+    # Depending on massProperties the results are compared with the ones
+    # measured by Fusion or replace them.
+    @traced()
+    def finishMassProperties(self):
+        if self.massProperties not in (massproperties.CHECK, massproperties.MESH):
+            return
+        if not massproperties.available():
+            self.logfile.write("WARNING: NumPy is not installed, mass properties are not computed from the meshes\n")
+            return
+        jobs = {}
+        # the finest mesh in use is closest to the solid
+        level = self.meshLevels()[-1]
+        for (name, link) in self.snapshot.links.items():
+            filename = os.path.join(self.fileDir, meshes.meshFile(name, level))
+            if level not in self.meshScales.get(name, {}) or not os.path.isfile(filename):
+                self.logfile.write("WARNING: no mesh of " + name + ", keeping its mass properties\n")
+                continue
+            # post-processed meshes are in m, the ones of Fusion in mm
+            scale = 100.0 if self.meshScales[name][level].text == "1 1 1" else 0.1
+            density = massproperties.linkDensity(link, self.densities, self.defaultDensity)
+            jobs[name] = self.worker.submit('massproperties.stlMassProperties', filename, density, scale)
+        for (name, future) in jobs.items():
+            if future.exception() is not None:
+                self.logfile.write("ERROR computing mass properties of " + name + " from its mesh: " + str(future.exception()) + "\n")
+                continue
+            (_, mass, volume, com, inertia) = future.result()
+            link = self.snapshot.links[name]
+            # the meshes are in the link frame
+            com = tuple(c + o for (c, o) in zip(com, translation(link.transform)))
+            if link.mass > 0:
+                (massError, distance, inertiaError) = massproperties.compareMassProperties((link.mass, link.com, link.inertia), (mass, com, inertia))
+                self.logfile.write("mass properties " + name + ": mesh mass " + str(mass) + " kg, off by " + str(round(100 * massError, 3)) +
+                                   "%, COM off by " + str(distance) + " cm, inertia off by " + str(round(100 * inertiaError, 3)) + "%\n")
+            if self.massProperties == massproperties.MESH:
+                link.mass = mass
+                link.com = com
+                link.inertia = inertia
+                element = self.inertials[name]
+                for child in list(element):
+                    element.remove(child)
+                element.extend(list(self.sdfInertial(name)))
+
+    ## Returns the collision shape of a link.
+    #
+    # A construction point COL_<shape>_<link> overrides the global setting.
+    def collisionMode(self, name):
+        overrides = self.getConstructionPointIndex().get("COL", name)
+        if overrides:
+            mode = overrides[-1].option
+            if mode in collision.modes:
+                return mode
+            self.logfile.write("WARNING: unknown collision shape " + mode + " of " + name + ", use one of " + ", ".join(collision.modes) + "\n")
+        if self.simplifyCollisions:
+            return collision.AUTO
+        return collision.MESH
+
+    ## Replaces the collision geometry of a link by a simplified shape.
+    #
+    # @param name the name of the link
+    # @param result the shape computed by collision.simplifyStl
+    def setCollisionGeometry(self, name, result):
+        shape = result["shape"]
+        if shape == collision.MESH:
+            return
+        geometry = ET.Element("geometry")
+        if shape == collision.HULL:
+            self.hulls.add(name)
+            mesh = ET.SubElement(geometry, "mesh")
+            uri = ET.SubElement(mesh, "uri")
+            uri.text = "model://" + self.modelName + "/meshes/collision/" + name + ".stl"
+            scale = ET.SubElement(mesh, "scale")
+            scale.text = "1 1 1"
+        elif shape == collision.BOX:
+            size = ET.SubElement(ET.SubElement(geometry, "box"), "size")
+            size.text = vectorToString(*result["size"])
+        elif shape == collision.CYLINDER:
+            cylinder = ET.SubElement(geometry, "cylinder")
+            ET.SubElement(cylinder, "radius").text = str(result["radius"])
+            ET.SubElement(cylinder, "length").text = str(result["length"])
+        elif shape == collision.SPHERE:
+            ET.SubElement(ET.SubElement(geometry, "sphere"), "radius").text = str(result["radius"])
+        element = self.collisions[name]
+        for child in list(element):
+            element.remove(child)
+        if "pose" in result:
+            pose = ET.SubElement(element, "pose")
+            pose.text = vectorToString(*result["pose"][:3]) + " " + vectorToString(*result["pose"][3:])
+        element.append(geometry)
+        self.logfile.write("collision " + name + ": " + shape + "\n")
+
+    ## Computes the simplified collision geometry of all links in the workers.
+    #
+    # Results of links that were not rebuilt are taken from the export cache.
+    @traced()
+    def finishCollisions(self):
+        jobs = {}
+        for name in self.collisions:
+            mode = self.collisionMode(name)
+            if mode == collision.MESH:
+                continue
+            if not meshes.available():
+                self.logfile.write("WARNING: NumPy is not installed, collision geometry is not simplified\n")
+                return
+            key = mode + " " + str(self.collisionFitThreshold) + " " + self.meshSettings() + " " + self.collisionMesh
+            hullFilename = self.fileDir + '/meshes/collision/' + name + '.stl'
+            cached = None
+            if self.exportCache is not None:
+                cached = self.exportCache.getCollision(name, key)
+            if cached is not None and (cached["shape"] != collision.HULL or os.path.isfile(hullFilename)):
+                self.setCollisionGeometry(name, cached)
+                continue
+            filename = os.path.join(self.fileDir, meshes.meshFile(name, self.collisionMesh))
+            if self.collisionMesh not in self.meshScales.get(name, {}) or not os.path.isfile(filename):
+                self.logfile.write("WARNING: no mesh of " + name + ", keeping its collision geometry\n")
+                continue
+            # post-processed meshes are in m, the ones of Fusion in mm
+            scale = 1.0 if self.meshScales[name][self.collisionMesh].text == "1 1 1" else 0.001
+            jobs[name] = (key, self.worker.submit('collision.simplifyStl', filename, mode, scale, self.collisionFitThreshold, hullFilename))
+        for (name, (key, future)) in jobs.items():
+            if future.exception() is not None:
+                self.logfile.write("ERROR simplifying collision geometry of " + name + ": " + str(future.exception()) + "\n")
+                continue
+            result = future.result()
+            self.setCollisionGeometry(name, result)
+            if self.exportCache is not None:
+                self.exportCache.setCollision(name, key, result)
+
+    ## Writes all outputs and the snapshot.
+    #
+    # The trace is written once all outputs are done.
+    #
+    # @return list of error messages of the output files that failed
+    def finish(self):
+        errors = self.writeOutputs()
+        if self.tracer.enabled:
+            self.tracer.save(self.fileDir)
+        self.logfile.close()
+        return errors
+
+    @traced("finish")
+    def writeOutputs(self):
+        self.finishLinks()
+        self.finishCollisions()
+        self.snapshot.modelName = self.modelName
+        self.snapshot.settings = self.getSettings()
+        # write config
+        self.writeOutput('writers.writeModelConfig', self.fileDir + '/model.config', self.modelName)
+        self.writeOutput('snapshot.writeSnapshot', self.fileDir + '/' + snapshotName, self.snapshot.toDict())
+
+        # the XML trees are streamed to their files here, pickling them for a worker costs as much
+        # write sdf
+        self.writeOutput('writers.writeXml', self.fileDir + "/model.sdf", self.root, '', self.prettyXml, inline=True)
+
+        if (self.osimroot != None):
+            self.writeOutput('writers.writeXml', self.fileDir + '/muscles.osim', self.osimroot, '', self.prettyXml, inline=True)
+
+        if (self.cardsflowroot != None):
+            self.writeOutput('writers.writeXml', self.fileDir + '/cardsflow.xml', self.cardsflowroot, '', self.prettyXml, inline=True)
+
+        errors = self.worker.wait()
+        for error in errors:
+            self.logfile.write("ERROR writing output: " + error + "\n")
+        results = [future.result() for future in self.outputJobs if future.exception() is None]
+        if self.packageFormat:
+            errors = errors + self.writePackage(errors)
+        self.worker.shutdown()
+
+        if self.exportCache is not None:
+            results.append(self.exportCache.save())
+            self.logfile.write("rebuilt links: " + ", ".join(self.exportCache.rebuilt) + "\n")
+        self.changedOutputs = sorted(os.path.relpath(filename, self.fileDir) for (filename, changed) in results if changed)
+        self.logfile.write("changed outputs: " + ", ".join(self.changedOutputs) + "\n")
+        self.logfile.write("unchanged outputs: " + str(len(results) - len(self.changedOutputs)) + "\n")
+        return errors
+
+    ## Returns the archive the outputs are packed into, it is opened with the first output.
+    #
+    # @return a modelpackage.PackageWriter, None if the archive cannot be written
+    def openPackage(self):
+        if self.package is None and not self.packageErrors:
+            format = self.packageFormat
+            if not modelpackage.available(format):
+                self.logfile.write("WARNING: the zstandard package is not installed, writing a zip package instead of " + format + "\n")
+                format = modelpackage.ZIP
+            filename = modelpackage.packageFilename(self.fileDir, self.modelName, format)
+            try:
+                self.package = modelpackage.PackageWriter(filename, self.fileDir, self.modelName, format)
+            except OSError as e:
+                self.packageErrors.append(str(e))
+                self.logfile.write("ERROR writing the package: " + str(e) + "\n")
+        return self.package
+
+    ## Adds the meshes to the archive and closes it, see modelpackage.
+    #
+    # The text outputs are in the archive already, they were packed while
+    # they were written. The meshes are copied in chunks.
+    #
+    # @param errors errors of the outputs, the archive is dropped if there are any
+    # @return list of error messages
+    @traced()
+    def writePackage(self, errors):
+        if errors:
+            if self.package is not None:
+                self.package.abort()
+                self.package = None
+            return []
+        package = self.openPackage()
+        if package is None:
+            return self.packageErrors
+        paths = []
+        for link in self.snapshot.links.values():
+            if self.exportMeshes:
+                paths.extend(link.meshes[level] for level in self.meshLevels() if level in link.meshes)
+            if link.name in self.hulls:
+                paths.append('meshes/collision/' + link.name + '.stl')
+        try:
+            for path in sorted(set(paths)):
+                package.add(*package.copy(os.path.join(self.fileDir, path)))
+            (filename, count, size) = package.close()
+        except Exception as e:
+            package.abort()
+            self.logfile.write("ERROR writing the package: " + str(e) + "\n")
+            return [str(e)]
+        finally:
+            self.package = None
+        self.logfile.write("package " + os.path.basename(filename) + ": " + str(count) + " files, " + str(size) + " bytes before compression\n")
+        return []
+
+    ## Writes an output file in the workers.
+    #
+    # With a package format the output is written on the calling thread and
+    # packed into the archive on the way, see writers.packing. The snapshot
+    # belongs to the export directory, not to the model.
+    #
+    # @param task a writer returning (filename, changed), see writers.writeFile
+    # @param filename the output file
+    # @param args the other arguments of the writer
+    # @param inline write it on the calling thread, see ExportWorker.run
+    def writeOutput(self, task, filename, *args, inline=False):
+        package = None
+        if self.packageFormat and os.path.basename(filename) != snapshotName:
+            package = self.openPackage()
+        if package is not None:
+            with writers.packing(package):
+                self.outputJobs.append(self.worker.run(task, filename, *args))
+        elif inline:
+            self.outputJobs.append(self.worker.run(task, filename, *args))
+        else:
+            self.outputJobs.append(self.worker.submit(task, filename, *args))
+
+    ## Builds SDF pose node from vector.
+    #
+    # This function builds the SDF pose node for every joint.
+    #
+    # @param vector the (x, y, z) vector pointing to the origin of the joint.
+    # @return the SDF pose node
+    def sdfPoseVector(self, vector):
+        pose = ET.Element("pose") #, frame="")
+        # convert from cm (Fusion 360) to m (SI)
+        x = 0.01 * vector[0]
+        y = 0.01 * vector[1]
+        z = 0.01 * vector[2]
+        pos = vectorToString(x, y, z)
+        rot = vectorToString(0, 0, 0)
+        pose.text = pos + " " + rot
+        return pose
+
+    ## Builds SDF pose node from matrix.
+    #
+    # This function builds the SDF pose node for every link.
+    #
+    # @param matrix the row-major transformation matrix of the link
+    # @return the SDF pose node
+    def sdfPoseMatrix(self, matrix):
+        pose = ET.Element("pose") #, frame="")
+        # convert from cm (Fusion 360) to m (SI)
+        (x, y, z) = translation(matrix)
+        pos = vectorToString(0.01 * x, 0.01 * y, 0.01 * z)
+        # calculate roll pitch yaw from transformation matrix
+        r11 = matrix[0]
+        r21 = matrix[4]
+        r31 = matrix[8]
+        r32 = matrix[9]
+        r33 = matrix[10]
+        pitch = math.atan2(-r31, math.sqrt(math.pow(r11, 2) + math.pow(r21, 2)))
+        cp = math.cos(pitch)
+        yaw = math.atan2(r21 / cp, r11 / cp)
+        roll = math.atan2(r32 / cp, r33 / cp)
+        rot = vectorToString(roll, pitch, yaw)
+        pose.text = pos + " " + rot
+        return pose
+
+    ## Builds SDF inertial node from the mass properties of a link.
+    #
+    # This function builds the SDF inertial node for every link.
+    #
+    # @param name the name of the link
+    # @return the SDF inertial node
+    def sdfInertial(self, name):
+        inertial = ET.Element("inertial")
+        # the link frame is located at the COM measured by Fusion, mesh based
+        # mass properties may move the COM away from it
+        link = self.snapshot.links[name]
+        pose = self.sdfPoseVector([c - o for (c, o) in zip(link.com, translation(link.transform))])
+        inertial.append(pose)
+        # build mass node
+        mass = ET.Element("mass")
+        if self.dummy_inertia:
+            mass.text = "0.1"
+        else:
+            mass.text = str(link.mass) # * 0.1)
+        inertial.append(mass)
+        # build inertia node
+        inertia = self.sdfInertia(name)
+        inertial.append(inertia)
+        return inertial
+
+    ## Builds SDF node for one moment of inertia.
+    #
+    # This helper function builds the SDF node for one moment of inertia.
+    #
+    # @param tag the tag of the XML node
+    # @param value the text of the XML node
+    # @return the SDF moment of inertia node
+    def sdfMom(self, tag, value):
+        node = ET.Element(tag)
+        # convert from kg/cm^2 (Fusion 360) to kg/m^2 (SI)
+        node.text = str(0.0001 * value) # * 0.1)
+        return node
+
+    ## Builds SDF inertia node from the mass properties of a link.
+    #
+    # This function builds the SDF inertia node for every link.
+    #
+    # @param name the name of the link
+    # @return the SDF inertia node
+    def sdfInertia(self, name):
+        inertia = ET.Element("inertia")
+        xx = 1000
+        yy = 1000
+        zz = 1000
+        xy = 0
+        xz = 0
+        yz = 0
+        if not self.dummy_inertia:
+            (xx, yy, zz, xy, yz, xz) = self.snapshot.links[name].inertia
+
+        inertia.append(self.sdfMom("ixx", xx))
+        inertia.append(self.sdfMom("ixy", xy))
+        inertia.append(self.sdfMom("ixz", xz))
+        inertia.append(self.sdfMom("iyy", yy))
+        inertia.append(self.sdfMom("iyz", yz))
+        inertia.append(self.sdfMom("izz", zz))
+        return inertia
+
+    ## Builds SDF link node.
+    #
+    # This function builds the SDF link node for every link.
+    #
+    # @param name of the link to be exported
+    # @return the SDF link node
+    @traced()
+    def linkSDF(self, name):
+        link = ET.Element("link", name=name)
+        self_collide = ET.Element("self_collide")
+        if self.self_collide:
+            self_collide.text = "true"
+        else:
+            self_collide.text = "false"
+        link.append(self_collide)
+
+        # build pose node
+        pose = self.sdfPoseMatrix(self.snapshot.links[name].transform)
+        link.append(pose)
+        # build inertial node
+        inertial = self.sdfInertial(name)
+        link.append(inertial)
+        self.inertials[name] = inertial
+        # build collision node
+        collisionNode = ET.Element("collision", name = name + "_collision")
+        if (not self.exportOpenSimMuscles):
+            link.append(collisionNode)
+        self.collisions[name] = collisionNode
+        # build geometry nodes, the collision geometry may be simplified later
+        self.meshScales[name] = {}
+        geometries = {}
+        for level in (self.collisionMesh, self.visualMesh):
+            if level not in geometries:
+                geometries[level] = self.sdfMeshGeometry(name, level)
+        collisionNode.append(geometries[self.collisionMesh])
+        # build visual node (equal to collision node if both use the same level)
+        visual = ET.Element("visual", name = name + "_visual")
+        visual.append(geometries[self.visualMesh])
+        link.append(visual)
+        return link
+
+    ## Builds SDF geometry node of the mesh of a link.
+    #
+    # @param name the name of the link
+    # @param level the mesh refinement level
+    # @return the SDF geometry node
+    def sdfMeshGeometry(self, name, level):
+        geometry = ET.Element("geometry")
+        # build mesh node
+        mesh = ET.Element("mesh")
+        geometry.append(mesh)
+        # build uri node
+        uri = ET.Element("uri")
+        uri.text = "model://" + self.modelName + "/" + meshes.meshFile(name, level)
+        mesh.append(uri)
+        # scale the mesh from mm to m, post-processed meshes are in m already
+        scale = ET.Element("scale")
+        if self.postProcessMeshes:
+            scale.text = "1 1 1"
+        else:
+            scale.text = "0.001 0.001 0.001"
+        mesh.append(scale)
+        self.meshScales[name][level] = scale
+        return geometry
+
+    ## Builds SDF joint node.
+    #
+    # This function builds the SDF joint node for every joint type.
+    #
+    # @param joi the JointSnapshot of the joint
+    # @return the SDF joint node
+    def jointSDF(self, joi):
+        jointInfo = []
+        if joi.type in ("revolute", "prismatic"):
+            # build axis node
+            axis = ET.Element("axis")
+            xyz = ET.Element("xyz")
+            xyz.text = vectorToString(*joi.axis)
+            axis.append(xyz)
+            # build limit node, convert slider limits from cm to meter
+            mini = joi.lower
+            maxi = joi.upper
+            if joi.type == "prismatic":
+                mini = mini/100.0
+                maxi = maxi/100.0
+            limit = ET.Element("limit")
+            axis.append(limit)
+            lower = ET.Element("lower")
+            lower.text = str(mini)
+            limit.append(lower)
+            upper = ET.Element("upper")
+            upper.text = str(maxi)
+            limit.append(upper)
+            # build frame node
+            frame = ET.Element("use_parent_model_frame")
+            frame.text = "0"
+            axis.append(frame)
+            jointInfo.append(axis)
+        # SDFormat does not implement ball joint limits
+        joint = ET.Element("joint", name=joi.name, type=joi.type)
+        # build parent node
+        parent = ET.Element("parent")
+        parent.text = joi.parent
+        joint.append(parent)
+        # build child node
+        child = ET.Element("child")
+        child.text = joi.child
+        joint.append(child)
+        # build pose node relative to the child link
+        origin = translation(self.snapshot.links[joi.child].transform)
+        dist = [p - o for (p, o) in zip(joi.originTwo, origin)]
+        pose = self.sdfPoseVector(dist)
+        self.logfile.write("\tpos: "+ str(dist[0]) + "\t" + str(dist[1]) + "\t" + str(dist[2]) + "\n")
+
+        joint.append(pose)
+        joint.extend(jointInfo)
+        return joint
+
+    @traced()
+    def exportCASPRcables(self):
+        self.writeOutput('writers.writeCASPRcables', self.fileDir + '/caspr/'+ self.modelName+'_cables.xml', self.viaPointTable)
+
+    @traced()
+    def exportCASPRbodies(self):
+        # one body per child link, parents before their children, the joint of the tree wins
+        bodies = []
+        children = set()
+        for joint in self.getKinematicTree().jointOrder():
+            if joint.child in children:
+                continue
+            children.add(joint.child)
+            parent_name = joint.child
+            link = self.snapshot.links[parent_name]
+            bodies.append({
+                'parent': parent_name,
+                'child': joint.parent,
+                'axis': joint.axis,
+                'q_min': joint.lower,
+                'q_max': joint.upper,
+                'mass': link.mass,
+                'com': link.com,
+                'inertia': link.inertia,
+                'origin': joint.originOne,
+            })
+        self.writeOutput('writers.writeCASPRbodies', self.fileDir + '/caspr/'+ self.modelName+'_bodies.xml', bodies)
+
+    @traced()
+    def exportToCardsflow(self):
+        self.cardsflowroot = ET.Element("cardsflow")
+        self.contructViapointTree(self.cardsflowroot)
+
+    @traced()
+    def exportOpenSimMusclesToOsim(self):
+        osimPlugin = ET.Element("plugin", filename="libgazebo_ros_muscle_interface.so", name="muscle_interface_plugin")
+        self.model.append(osimPlugin)
+        osimMuscles = ET.Element("muscles")
+        osimMuscles.text = "model://" + self.model.get("name") + "/muscles.osim"
+        self.model.append(osimMuscles)
+        self.osimroot = ET.Element("OpenSimDocument", Version="30000")
+        model = ET.Element("Model")
+        forceSet = ET.Element("ForceSet")
+        objects = ET.Element("objects")
+        forceSet.append(objects)
+        model.append(forceSet)
+        self.osimroot.append(model)
+
+        table = self.viaPointTable
+        geometry = self.getTendonGeometry()
+        for (motor, rows) in table.tendons():
+            # TODO add bodies
+            muscle = ET.Element("Thelen2003Muscle", name="muscle" + motor)
+            objects.append(muscle)
+            gPath = ET.Element("GeometryPath")
+            ppSet = ET.Element("PathPointSet")
+            ppSetObjects = ET.Element("objects")
+            ppSet.append(ppSetObjects)
+            muscle.append(gPath)
+            gPath.append(ppSet)
+            pwSet = ET.Element("PathWrapSet")
+            pwObjects = ET.Element("objects")
+            pwSet.append(pwObjects)
+            # pWrap = ET.Element("PathWrap",name="PathWrap_"+myo.number)
+            # wrap_object = ET.Element("wrap_object") # TODO fix objects in pWrap
+            # wrap_object.text = "WrapJoint"
+            # pWrap.append(wrap_object)
+            # method = ET.Element("method")
+            # method.text = "midpoint"
+            # pWrap.append(method)
+            # pwObjects.append(pWrap)
+            gPath.append(pwSet)
+            max_isometric_force = ET.Element("max_isometric_force")
+            optimal_fiber_length = ET.Element("optimal_fiber_length")
+            tendon_slack_length = ET.Element("tendon_slack_length")
+            pennation_angle = ET.Element("pennation_angle")
+            activation_time_constant = ET.Element("activation_time_constant")
+            deactivation_time_constant = ET.Element("deactivation_time_constant")
+            Vmax = ET.Element("Vmax")
+            Vmax0 = ET.Element("Vmax0")
+            FmaxTendonStrain = ET.Element("FmaxTendonStrain")
+            FmaxMuscleStrain = ET.Element("FmaxMuscleStrain")
+            KshapeActive = ET.Element("KshapeActive")
+            KshapePassive = ET.Element("KshapePassive")
+            damping = ET.Element("damping")
+            Af = ET.Element("Af")
+            Flen = ET.Element("Flen")
+
+            max_isometric_force.text = str(546.00000000)
+            optimal_fiber_length.text = str(0.05350000)
+            tendon_slack_length.text = str(0.07800000)
+            pennation_angle.text = str(0.00000000)
+            activation_time_constant.text = str(0.01000000)
+            deactivation_time_constant.text = str(0.04000000)
+            Vmax.text = str(10.00000000)
+            Vmax0.text = str(5.00000000)
+            FmaxTendonStrain.text = str(0.03300000)
+            FmaxMuscleStrain.text = str(0.60000000)
+            KshapeActive.text = str(0.50000000)
+            KshapePassive.text = str(4.00000000)
+            damping.text = str(0.05000000)
+            Af.text = str(0.30000000)
+            Flen.text = str(1.80000000)
+
+            # max_isometric_force.text=str(546.0)
+            # stiffness.text = str(100000)
+            # dissipation.text = str(1)
+
+            muscle.append(max_isometric_force)
+            muscle.append(optimal_fiber_length)
+            muscle.append(tendon_slack_length)
+            muscle.append(pennation_angle)
+            muscle.append(activation_time_constant)
+            muscle.append(deactivation_time_constant)
+            muscle.append(Vmax)
+            muscle.append(Vmax0)
+            muscle.append(FmaxTendonStrain)
+            muscle.append(FmaxMuscleStrain)
+            muscle.append(KshapeActive)
+            muscle.append(KshapePassive)
+            muscle.append(damping)
+            muscle.append(Af)
+            muscle.append(Flen)
+
+            # muscle.append(stiffness)
+            # muscle.append(dissipation)
+
+            # split the path length at the reference pose into fiber and tendon
+            dist = geometry.length(motor)
+            if dist > 0:
+                tendon_slack_length.text = str(0.02*dist)
+                optimal_fiber_length.text = str(dist*0.98)
+
+            for row in rows:
+                pathPoint = ET.Element("PathPoint", name=muscle.get("name") + "_node" + str(table.number[row]))
+                location = ET.Element("location")
+                location.text = table.coordinates(row)
+                body = ET.Element("body")
+                body.text = table.linkName(row)
+                pathPoint.append(location)
+                pathPoint.append(body)
+                ppSetObjects.append(pathPoint)
+        bodySet = ET.Element("BodySet", name="")
+        bodySetObjects = ET.Element("objects")
+        bodySet.append(bodySetObjects)
+        model.append(bodySet)
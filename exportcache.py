@@ -0,0 +1,190 @@
+## @package exportcache
+# Content fingerprints of the exported links.
+#
+# Each rigid group is fingerprinted from its member occurrences, the names,
+# revisions, volumes, areas and materials of their bodies, their transforms
+# and the COM points of the link, i.e. everything its meshes, its mass and its
+# inertia depend on. Entity tokens are not used, Fusion hands out a different
+# token for the same body in another session. The fingerprints are kept
+# together with the link snapshot of every link in a manifest in
+# the export directory. On the next export only links whose fingerprint
+# changed have to be copied, meshed and measured again. The fingerprints of
+# the joints are kept as well, changed links and joints select the subtrees
+# that are read from Fusion again.
+
+import hashlib
+import json
+import os
+
+from .writers import writeFile
+
+## Name of the manifest file in the export directory.
+manifestName = "sdfusion_cache.json"
+
+## Version of the manifest layout, older manifests are ignored.
+manifestVersion = 4
+
+## Name and density of the material of a body.
+def _material(body):
+    material = body.material
+    if material is None:
+        return ('', None)
+    density = material.materialProperties.itemById('structural_Density')
+    return (material.name, density.value if density is not None else None)
+
+def _fingerprintOccurrences(digest, occurrences):
+    for occurrence in sorted(occurrences, key=lambda o: o.fullPathName):
+        digest.update(occurrence.fullPathName.encode('utf-8'))
+        digest.update(repr([round(v, 9) for v in occurrence.transform.asArray()]).encode('utf-8'))
+        for body in occurrence.bRepBodies:
+            digest.update(body.name.encode('utf-8'))
+            digest.update(body.revisionId.encode('utf-8'))
+            digest.update(repr((round(body.volume, 9), round(body.area, 9))).encode('utf-8'))
+            digest.update(repr(_material(body)).encode('utf-8'))
+        if occurrence.childOccurrences:
+            _fingerprintOccurrences(digest, occurrence.childOccurrences)
+
+## Computes the fingerprint of a rigid group.
+#
+# @param occurrences the member occurrences of the rigid group
+# @param settings a string of export settings that change the exported files
+# @param comPoints the (x, y, z) positions of the COM points of the link
+# @return the hex digest of the fingerprint
+def fingerprintRigidGroup(occurrences, settings='', comPoints=()):
+    digest = hashlib.sha1()
+    digest.update(settings.encode('utf-8'))
+    for position in comPoints:
+        digest.update(repr(tuple(round(c, 9) for c in position)).encode('utf-8'))
+    digest.update(b'|')
+    _fingerprintOccurrences(digest, occurrences)
+    return digest.hexdigest()
+
+## Computes the fingerprint of a joint.
+#
+# @param joint the joint as dict, see JointSnapshot.toDict
+# @return the hex digest of the fingerprint
+def fingerprintJoint(joint):
+    return hashlib.sha1(json.dumps(joint, sort_keys=True).encode('utf-8')).hexdigest()
+
+## Computes the fingerprint of the ordered via-points of a tendon.
+#
+# @param positions the (x, y, z) positions of the via-points in tendon order
+# @return the hex digest of the fingerprint
+def fingerprintTendon(positions):
+    digest = hashlib.sha1()
+    for position in positions:
+        digest.update(repr(tuple(position)).encode('utf-8'))
+    return digest.hexdigest()
+
+class ExportCache:
+    def __init__(self, fileDir):
+        self.fileDir = fileDir
+        self.path = os.path.join(fileDir, manifestName)
+        self.links = {}
+        ## fingerprint of every exported joint by name
+        self.joints = {}
+        ## mass of every measured component by its persistent id
+        self.masses = {}
+        ## names of the links that were rebuilt during this export
+        self.rebuilt = []
+
+    ## Reads the manifest of a previous export, if there is one.
+    def load(self):
+        try:
+            with open(self.path, 'r') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return self
+        if manifest.get("version") == manifestVersion:
+            self.links = manifest.get("links", {})
+            self.joints = manifest.get("joints", {})
+            self.masses = manifest.get("masses", {})
+        return self
+
+    ## Returns the cached entry of a link if its fingerprint did not change.
+    #
+    # Mesh levels missing in the export directory have to be exported again,
+    # see missingMeshes.
+    #
+    # @param name the link name
+    # @param fingerprint the current fingerprint of the link
+    # @return the cached entry or None
+    def lookup(self, name, fingerprint):
+        entry = self.links.get(name)
+        if entry is None or entry.get("fingerprint") != fingerprint:
+            return None
+        return entry
+
+    ## Returns the fingerprint a link had in the previous export or None.
+    def fingerprint(self, name):
+        return self.links.get(name, {}).get("fingerprint")
+
+    ## Returns the levels of the mesh files that do not exist.
+    #
+    # @param meshes the STL files relative to the export directory by level
+    def missingMeshes(self, meshes):
+        return [level for (level, mesh) in meshes.items() if not os.path.isfile(os.path.join(self.fileDir, mesh))]
+
+    ## Stores the fingerprint and the snapshot of a rebuilt link.
+    #
+    # @param name the link name
+    # @param fingerprint the fingerprint of the link
+    # @param link the link as dict, see LinkSnapshot.toDict
+    def store(self, name, fingerprint, link):
+        self.links[name] = {
+            "fingerprint": fingerprint,
+            "link": link,
+        }
+        self.rebuilt.append(name)
+
+    ## Drops a link from the cache, so it is rebuilt on the next export.
+    def forget(self, name):
+        self.links.pop(name, None)
+
+    ## Records the content hash of the STL file of a link at a refinement level.
+    def setMeshHash(self, name, level, digest):
+        if name in self.links:
+            self.links[name].setdefault("meshHashes", {})[level] = digest
+
+    ## Returns the fingerprint a joint had in the previous export or None.
+    def jointFingerprint(self, name):
+        return self.joints.get(name)
+
+    ## Records the fingerprint of an exported joint.
+    def setJointFingerprint(self, name, fingerprint):
+        self.joints[name] = fingerprint
+
+    ## Returns the cached collision shape of a link or None.
+    #
+    # @param name the link name
+    # @param key the collision settings the shape was computed with
+    def getCollision(self, name, key):
+        entry = self.links.get(name, {}).get("collision")
+        if entry is None or entry.get("key") != key:
+            return None
+        return entry["result"]
+
+    ## Stores the collision shape of a link.
+    def setCollision(self, name, key, result):
+        if name in self.links:
+            self.links[name]["collision"] = {"key": key, "result": result}
+
+    ## Returns the cached mass of a component or None.
+    #
+    # @param id the persistent id of the component
+    # @param revision the revision id of the component, the mass is measured again when it changed
+    def getMass(self, id, revision):
+        entry = self.masses.get(id)
+        if entry is None or entry.get("revision") != revision:
+            return None
+        return entry["mass"]
+
+    ## Stores the mass of a component.
+    def setMass(self, id, revision, mass):
+        self.masses[id] = {"revision": revision, "mass": mass}
+
+    ## Writes the manifest to the export directory.
+    #
+    # @return (path, True if the manifest changed), see writers.writeFile
+    def save(self):
+        return writeFile(self.path, json.dumps({"version": manifestVersion, "links": self.links, "joints": self.joints, "masses": self.masses}, indent=1, sort_keys=True))
@@ -1,16 +1,27 @@
 import adsk.core
 import adsk.fusion
 import traceback
-import xml.etree.ElementTree as ET
-import math
-import xml.dom.minidom as DOM
-import os, errno, sys
+import json
+import os
 from collections import defaultdict
 from .helpers import *
-
-#import numpy as np
-
-class SDFExporter():
+from .constructionpoints import ConstructionPointIndex, parseConstructionPointName
+from .rigidgroups import RigidGroupIndex
+from .exportcache import ExportCache, fingerprintRigidGroup, fingerprintJoint, fingerprintTendon
+from .snapshot import BodySnapshot, LinkSnapshot, JointSnapshot, DesignSnapshot
+from .kinematics import KinematicTree
+from .engine import ModelEmitter
+from .tracing import traced
+from .progress import Progress
+from .transaction import DesignTransaction
+from . import meshes
+
+## Fusion 360 front end of the export.
+#
+# It extracts rigid groups, physical properties, transforms, joints and
+# construction points from the active design into the snapshot of the
+# ModelEmitter, which builds all outputs from it.
+class SDFExporter(ModelEmitter):
     ui = None
     app = None
     product = None
@@ -19,51 +30,41 @@ class SDFExporter():
     rootOcc = None
     rootComp = None
 
-    root = None
-    model = None
-
-    osimroot = None
-    cardsflowroot = None
-
-    logfile = "log.txt"
-
     numberOfRigidGroupsToExport = 0
 
-    progressDialog = None
+    ## Progress dialog and event pump of the export.
+    progress = None
+
+    ## Membership map of occurrences and links, built once per export.
+    rigidGroupIndex = None
 
     numberOfBodies = defaultdict()
     bodies = defaultdict(list)
-    joints = defaultdict(list)
-    COM = defaultdict(adsk.core.Point3D)
-    totalMass = defaultdict()
-    inertias = defaultdict(list)
-    number_of_coms = defaultdict()
-    calculateCOMFlag = True
-
-    transformMatrices = defaultdict(adsk.core.Matrix3D)
 
     runCleanUp = False
-    exportMeshes = True
-    exportViaPoints = False
-    exportLighthouseSensors = False
-    exportCASPR = False
-    exportCardsflow = True
-    exportOpenSimMuscles = False
-    self_collide = False
-    dummy_inertia = False
+    ## Components lighter than this are removed by the clean up, in kg.
+    smallPartThreshold = 0.001
+    ## Only report what the clean up would remove.
+    smallPartsDryRun = False
     #cache = False
-    updateRigidGroups = False
-
-    ## Global variable to specify the file name of the plugin loaded by the SDF.
-    # Only necessary if **exportViaPoints** is **True**.
-    pluginFileName = "libcardsflow_gazebo_plugin.so"
-
-    ## Global variable to specify the name of the plugin loaded by the SDF-
-    # Only necessary if **exportViaPoints** id **True**.
-    pluginName = "cardsflow_gazebo_plugin"
-    myoMuscles = []
+    incremental = True
+    ## Link whose subtree is exported again, the rest is kept from the previous export.
+    # Left empty, the subtrees of the links and joints that changed since the
+    # previous export are exported again, see detectChangedLinks.
+    subtreeRoot = ""
+    ## Group of the attributes SDFusion stores on design entities.
+    attributeGroup = "SDFusion"
+
+    ## Fusion mesh refinements of the mesh levels.
+    meshRefinements = {meshes.LOW: adsk.fusion.MeshRefinementSettings.MeshRefinementLow,
+                       meshes.MEDIUM: adsk.fusion.MeshRefinementSettings.MeshRefinementMedium,
+                       meshes.HIGH: adsk.fusion.MeshRefinementSettings.MeshRefinementHigh}
+
+    ## Fusion joint types supported by SDFormat.
+    jointTypes = {0: "fixed", 1: "revolute", 2: "prismatic", 6: "ball"}
 
     def __init__(self):
+        super().__init__()
         self.app = adsk.core.Application.get()
         self.ui  = self.app.userInterface
         # get active design
@@ -74,6 +75,13 @@ class SDFExporter():
         self.rootComp = self.design.rootComponent
         # get all occurrences within the root component
         self.rootOcc = self.rootComp.occurrences
+        self.progress = Progress(self.ui)
+        ## snapshot of the previous export in subtree mode, otherwise None
+        self.previous = None
+        ## names of the links exported again in subtree mode
+        self.subtree = set()
+        ## fingerprints of the links computed during this export
+        self.fingerprints = {}
 
     def askForExportDirectory(self):
         fileDialog = self.ui.createFileDialog()
@@ -92,8 +100,22 @@ class SDFExporter():
 
     def updateFlags(self, inputs, commandId):
         self.runCleanUp = inputs.itemById(commandId + '_remove_small_parts').value
-        self.updateRigidGroups = inputs.itemById(commandId + '_updateRigidGroups').value
+        self.smallPartThreshold = inputs.itemById(commandId + '_small_part_threshold').value
+        self.smallPartsDryRun = inputs.itemById(commandId + '_small_parts_dry_run').value
+        self.incremental = inputs.itemById(commandId + '_incremental').value
+        self.subtreeRoot = inputs.itemById(commandId + '_subtree').value.strip()
         self.exportMeshes = inputs.itemById(commandId + '_meshes').value
+        self.postProcessMeshes = inputs.itemById(commandId + '_postprocess_meshes').value
+        self.simplifyCollisions = inputs.itemById(commandId + '_simplify_collisions').value
+        self.prettyXml = inputs.itemById(commandId + '_pretty_xml').value
+        self.trace = inputs.itemById(commandId + '_trace').value
+        self.meshStore = inputs.itemById(commandId + '_mesh_store').value
+        self.visualMesh = inputs.itemById(commandId + '_visual_mesh').selectedItem.name
+        self.collisionMesh = inputs.itemById(commandId + '_collision_mesh').selectedItem.name
+        self.massProperties = inputs.itemById(commandId + '_mass_properties').selectedItem.name
+        self.packageFormat = inputs.itemById(commandId + '_package').selectedItem.name
+        if self.packageFormat == 'none':
+            self.packageFormat = ""
         self.exportViaPoints = inputs.itemById(commandId + '_viapoints').value
         self.exportCASPR = inputs.itemById(commandId + '_caspr').value
         self.exportCardsflow = inputs.itemById(commandId + '_cardsflow').value
@@ -102,45 +124,182 @@ class SDFExporter():
         self.modelName = inputs.itemById(commandId + '_model_name').value
 
     def createDiectoryStructure(self):
+        super().createDiectoryStructure()
+        self.exportCache = ExportCache(self.fileDir)
+        if self.incremental:
+            self.exportCache.load()
+        if self.subtreeRoot:
+            self.loadPreviousExport()
+
+    ## Prepares the export of the subtree of subtreeRoot.
+    #
+    # Links outside of the subtree, the joints to them and their construction
+    # points are taken from the snapshot of the previous export into the same
+    # directory instead of being read from Fusion again.
+    def loadPreviousExport(self):
         try:
-            os.makedirs(self.fileDir)
-            os.makedirs(self.fileDir+'/meshes')
-            os.makedirs(self.fileDir+'/meshes/CAD')
-            if self.exportLighthouseSensors:
-                os.makedirs(self.fileDir+'/lighthouseSensors')
-            if self.exportCASPR:
-                os.makedirs(self.fileDir+'/caspr')
-            self.logfile = open(self.fileDir+'/logfile.txt', 'w')
-        except OSError as e:
-            if e.errno != errno.EEXIST:
-                raise
-
-    def removeSmallParts(self):
+            previous = DesignSnapshot.load(self.fileDir)
+        except (OSError, ValueError, KeyError) as e:
+            self.logfile.write("WARNING: no previous export to update, exporting everything: " + str(e) + "\n")
+            return
+        tree = KinematicTree.fromSnapshot(previous)
+        if self.subtreeRoot not in tree.index:
+            self.logfile.write("WARNING: " + self.subtreeRoot + " is not a link of the previous export, exporting everything\n")
+            return
+        self.previous = previous
+        self.subtree = set(tree.subtree(self.subtreeRoot))
+        self.logfile.write("exporting the subtree of " + self.subtreeRoot + ": " + ", ".join(sorted(self.subtree)) + "\n")
+
+    ## Selects the subtrees to export again from the fingerprints of the previous export.
+    #
+    # Used when no subtree is given. A link changed if its fingerprint differs
+    # from the one in the export cache, a joint if the fingerprint of its
+    # snapshot does. The subtrees of the changed links and of the children of
+    # the changed joints in the kinematic tree of the previous export are read
+    # from Fusion again, the other links are kept like in subtree mode.
+    # Everything is exported if the settings changed since the previous export.
+    @traced()
+    def detectChangedLinks(self):
+        if not self.exportCache.links:
+            return
+        try:
+            previous = DesignSnapshot.load(self.fileDir)
+        except (OSError, ValueError, KeyError):
+            return
+        # compare the settings as they are stored in the snapshot
+        if json.loads(json.dumps(self.getSettings())) != previous.settings:
+            self.logfile.write("settings changed since the previous export, exporting everything\n")
+            return
+        rigidGroupIndex = self.getRigidGroupIndex()
+        changed = [name for name in rigidGroupIndex.links if self.linkFingerprint(name) != self.exportCache.fingerprint(name)]
+        changedJoints = []
+        for joi in self.getExportJoints():
+            if joi.occurrenceOne is None or joi.occurrenceTwo is None:
+                continue
+            name_child = rigidGroupIndex.linkOf(joi.occurrenceOne)
+            name_parent = rigidGroupIndex.linkOf(joi.occurrenceTwo)
+            if name_child is None or name_parent is None:
+                continue
+            joint = self.extractJoint(joi, name_parent, name_child)
+            if fingerprintJoint(joint.toDict()) != self.exportCache.jointFingerprint(joint.name):
+                changedJoints.append(joint.name)
+                changed.append(name_child)
+        tree = KinematicTree.fromSnapshot(previous)
+        subtree = set()
+        for name in changed:
+            subtree.update(tree.subtree(name) if name in tree.index else [name])
+        self.previous = previous
+        self.subtree = subtree
+        self.logfile.write("changed links: " + (", ".join(sorted(set(changed))) or "none") + ", changed joints: " + (", ".join(changedJoints) or "none") +
+                           ", exporting again: " + (", ".join(sorted(subtree)) or "none") + "\n")
+
+    ## Returns the fingerprint of a link, computed once per export.
+    def linkFingerprint(self, name):
+        if name not in self.fingerprints:
+            group = self.getRigidGroupIndex().group(name)
+            comPoints = [entry.position for entry in self.getConstructionPointIndex().get("COM", name)]
+            self.fingerprints[name] = fingerprintRigidGroup(group.occurrences, self.meshSettings(), comPoints)
+        return self.fingerprints[name]
+
+    ## Whether a link is kept from the previous export in subtree mode.
+    def keepsPreviousLink(self, name):
+        return self.previous is not None and name not in self.subtree and name in self.previous.links
+
+    ## Opens a transaction for a stage that changes the design, see DesignTransaction.
+    def transaction(self, name):
+        return DesignTransaction(self.design, name)
+
+    def reportError(self, message):
+        super().reportError(message)
+        self.ui.messageBox(message)
+
+    ## Finds the components lighter than smallPartThreshold.
+    #
+    # The masses are kept in the export cache by the persistent id and the
+    # revision of the components, only new or changed components are measured
+    # by Fusion. Entity tokens change between sessions and are not used.
+    #
+    # @return list of (component, mass)
+    @traced()
+    def findSmallParts(self):
         allComponents = self.design.allComponents
-        progressDialog = self.app.userInterface.createProgressDialog()
-        progressDialog.isBackgroundTranslucent = False
-        progressDialog.show("Clean up", 'Looking for small components', 0, len(allComponents), 0)
+        self.progress.start("Clean up", 'Looking for small components: %v/%m', len(allComponents))
+        smallParts = []
+        measured = 0
         for component in allComponents:
-            progressDialog.progressValue += 1
-            if component.physicalProperties.mass < 0.001:
-                for o in component.occurrences:
-                    progressDialog.message = "Removing " + component.name
-                    o.deleteMe()
-        progressDialog.hide()
-
+            self.progress.step()
+            if component == self.rootComp:
+                continue
+            revision = component.revisionId
+            mass = self.exportCache.getMass(component.id, revision)
+            if mass is None:
+                mass = component.physicalProperties.mass
+                self.exportCache.setMass(component.id, revision, mass)
+                measured += 1
+            if mass < self.smallPartThreshold:
+                smallParts.append((component, mass))
+        self.progress.finish()
+        self.logfile.write("measured " + str(measured) + " of " + str(len(allComponents)) + " components\n")
+        return smallParts
+
+    ## Removes all components lighter than smallPartThreshold.
+    #
+    # All occurrences of the small components are deleted in one batch,
+    # occurrences inside of deleted ones are skipped. With smallPartsDryRun
+    # the design is left untouched and only the report is shown.
+    #
+    # @return list of (occurrence path, mass) of the removed occurrences
+    @traced()
+    def removeSmallParts(self):
+        paths = {}
+        for (component, mass) in self.findSmallParts():
+            for occurrence in self.rootComp.allOccurrencesByComponent(component):
+                paths[occurrence.fullPathName] = (occurrence, mass)
+        removed = []
+        occurrences = adsk.core.ObjectCollection.create()
+        for path in sorted(paths):
+            parts = path.split('+')
+            if any('+'.join(parts[:i]) in paths for i in range(1, len(parts))):
+                continue
+            (occurrence, mass) = paths[path]
+            occurrences.add(occurrence)
+            removed.append((path, mass))
+        verb = "would remove " if self.smallPartsDryRun else "removing "
+        for (path, mass) in removed:
+            self.logfile.write(verb + path + " " + str(1000 * mass) + " g\n")
+        total = sum(mass for (_, mass) in removed)
+        report = ("Clean up " + ("would remove " if self.smallPartsDryRun else "removed ") + str(len(removed)) +
+                  " occurrences lighter than " + str(1000 * self.smallPartThreshold) + " g, " + str(round(1000 * total, 3)) + " g in total")
+        self.logfile.write(report + "\n")
+        if self.smallPartsDryRun:
+            self.ui.messageBox(report + ":\n" + "\n".join(path for (path, _) in removed))
+        elif removed:
+            with self.transaction("remove small parts") as transaction:
+                transaction.delete(occurrences)
+        return removed
+
+    @traced()
     def getAllRigidGroups(self):
         allRigidGroups = self.rootComp.allRigidGroups
-        self.numberOfRigidGroupsToExport = 0
-        for rig in allRigidGroups:
-            if rig is not None and rig.name[:6] == "EXPORT":
-                self.numberOfRigidGroupsToExport = self.numberOfRigidGroupsToExport+1
+        self.rigidGroupIndex = RigidGroupIndex().build(allRigidGroups)
+        self.numberOfRigidGroupsToExport = len(self.rigidGroupIndex.links)
+        for name in self.rigidGroupIndex.duplicateLinks:
+            self.logfile.write("WARNING: ignoring duplicate export of " + name + ", check your model for duplicate EXPORT Rigid Groups\n")
+        for (path, names) in self.rigidGroupIndex.sharedOccurrences.items():
+            self.logfile.write("WARNING: " + path + " is part of several EXPORT Rigid Groups: " + ", ".join(names) + ", using " + names[-1] + "\n")
+        # the links are known now, the changes since the previous export can be found
+        if self.incremental and not self.subtreeRoot:
+            self.detectChangedLinks()
         return allRigidGroups
 
+    ## Returns the membership map of occurrences and links.
+    def getRigidGroupIndex(self):
+        if self.rigidGroupIndex is None:
+            self.getAllRigidGroups()
+        return self.rigidGroupIndex
+
     def getAllBodiesInRigidGroup(self, name, rigidGroup):
         self.numberOfBodies[name] = 0
-        self.COM[name] = adsk.core.Point3D.create(0,0,0)
-        self.number_of_coms[name] = 0
-        self.totalMass[name] = 0
         self.getBodies(name,rigidGroup.occurrences,0)
 
     def getBodies(self, name, occurrences, currentLevel):
@@ -151,658 +310,286 @@ class SDFExporter():
             if occurrence.childOccurrences:
                 self.getBodies(name,occurrence.childOccurrences,currentLevel+1)
 
-    def getCOM(self, name, component):
-        # check if a COM point is defined
-        calculateCOM = True
-        for occurrence in self.rootOcc:
-            com = occurrence.component
-            if com is not None:
-                allConstructionPoints = com.constructionPoints
-                for point in allConstructionPoints:
-                    if point is not None:
-                        if point.name[:3] == "COM" and point.name[4:] == name:
-                            calculateCOM = False
-                            self.COM[name] = adsk.core.Point3D.create(point.geometry.x,point.geometry.y,point.geometry.z)
-                            self.COM[name].transformBy(occurrence.transform)
-        for com in self.design.allComponents:
-            if com is not None:
-                allConstructionPoints = com.constructionPoints
-                for point in allConstructionPoints:
-                    if point is not None:
-                        if point.name[:3] == "COM" and point.name[4:] == name:
-                            calculateCOM = False
-                            self.COM[name] = adsk.core.Point3D.create(point.geometry.x,point.geometry.y,point.geometry.z)
-
-        if calculateCOM == True:
-            centerOfMass = component.getPhysicalProperties().centerOfMass
-            centerOfMass = centerOfMass.asVector()
-            #centerOfMass.scaleBy(physicalProperties.mass)
-            self.COM[name] = centerOfMass
-
-        self.logfile.write("COM: " + name + " " + str(self.COM[name].x) + " " + str(self.COM[name].y) + " " + str(self.COM[name].z) + "\n")
-
-    def copyBodiesToNewComponentAndExport(self, name):
-
-        self.logfile.write("Body: " + name + "\n")
-
-        transformMatrix = adsk.core.Matrix3D.create()
-        self.transformMatrices[name] = transformMatrix
-        progressDialog = self.app.userInterface.createProgressDialog()
-        new_component = None
-        if not self.rootOcc.itemByName("EXPORT_" + name + ":1") or self.updateRigidGroups:
-            if self.rootOcc.itemByName("EXPORT_" + name + ":1"):
-                self.rootOcc.itemByName("EXPORT_" + name + ":1").deleteMe()
-            progressDialog.isBackgroundTranslucent = False
-            temp_component = self.rootOcc.addNewComponent(transformMatrix)
-            temp_component.component.name = "TEMP_" + name
-            group = [g for g in self.rootComp.allRigidGroups if g.name == "EXPORT_"+name][0]
-            progressDialog.show(name, 'Copy Bodies to new component: %v/%m', 0, len(group.occurrences), 1)
-            i = 0
-            for occurrence in group.occurrences:
-                for b in occurrence.bRepBodies:
-                    new_body = b.copyToComponent(temp_component)
-                    new_body.name = 'body'+str(i)
-                    progressDialog.progressValue = progressDialog.progressValue + 1
-                    i = i+1
-                    if progressDialog.wasCancelled:
-                        progressDialog.hide()
-                        return False
-            self.getCOM(name,temp_component)
-            transformMatrix = temp_component.transform
-            transformMatrix.translation = adsk.core.Vector3D.create( self.COM[name].x, self.COM[name].y, self.COM[name].z)
-            self.transformMatrices[name] = transformMatrix
-            print(self.transformMatrices[name].asArray())
-            self.rootOcc.itemByName("TEMP_" + name + ":1").deleteMe()
-            adsk.doEvents()
-            if self.exportMeshes:
-                self.logfile.write("exporting stl of " + name + "\n")
-                new_component = self.rootOcc.addNewComponent(self.transformMatrices[name])
-                new_component.component.name = "EXPORT_" + name
-                group = [g for g in self.rootComp.allRigidGroups if g.name == "EXPORT_"+name][0]
-                progressDialog.show(name, 'Exporting STL: %v/%m', 0, len(group.occurrences), 1)
-                i = 0
-                for occurrence in group.occurrences:
-                    for b in occurrence.bRepBodies:
-                        new_body = b.copyToComponent(new_component)
-                        new_body.name = 'body'+str(i)
-                        progressDialog.progressValue = progressDialog.progressValue + 1
-                        i = i+1
-                        if progressDialog.wasCancelled:
-                            progressDialog.hide()
-                            return False
-                progressDialog.hide()
-        else:
-            new_component =  self.rootOcc.itemByName("EXPORT_" + name + ":1")
-
-        if self.exportMeshes:
-            self.exportToStl(new_component, name)
-
-
-        link = self.linkSDF(new_component, name)
-        self.model.append(link)
-        self.rootOcc.itemByName("EXPORT_" + name + ":1") .isLightBulbOn = False
-        # delete the temporary new occurrence
-        # new_component.deleteMe()
-        # Call doEvents to give Fusion a chance to react.
-        adsk.doEvents()
-        return True
-
-    def exportJointsToSDF(self):
-        progressDialog = self.app.userInterface.createProgressDialog()
-        progressDialog.isBackgroundTranslucent = False
-
-        #get all joints of the design
-        allComponents = self.design.allComponents
-        allRigidGroups = self.rootComp.allRigidGroups
-        for com in allComponents:
-            if com is not None:
-                allJoints = com.joints
-
-                for joi in allJoints:
-                    if joi is not None and joi.name[:6] == "EXPORT":
-                        progressDialog.show("Joint", "Processing joints", 0, 30, 0)
-                        progressDialog.progressValue += 1
-                        progressDialog.message = joi.name
-                        self.logfile.write("Joint: " + joi.name + "\n")
-                        one = joi.occurrenceOne
-                        two = joi.occurrenceTwo
-                        if one is not None and two is not None:
-                            name_parent = None
-                            name_child = None
-                            for rig in allRigidGroups:
-                                if rig is not None and rig.name[:6] == "EXPORT":
-                                    value_child = rig.occurrences.itemByName(one.name)
-                                    value_parent = rig.occurrences.itemByName(two.name)
-                                    if value_parent is not None:
-                                        name_parent = rig.name[7:]
-                                    if value_child is not None:
-                                        name_child = rig.name[7:]
-                            if name_parent is not None and name_child is not None:
-                                self.logfile.write("\tparent: " + name_parent + "\n")
-                                self.logfile.write("\tchild: " + name_child + "\n")
-                                matrix = self.transformMatrices[name_child]
-                                print(one.transform.translation.asArray())
-                                self.joints[name_child] = (name_parent,joi)
-        #                        transformMatrix.transformBy(one.transform)
-                                #print(matrix.asArray())
-                                joint = self.jointSDF(joi, name_parent, name_child, matrix)
-                                self.model.append(joint)
-                            else:
-                                self.logfile.write("\tERROR writing joint " + joi.name + ", check your rigid EXPORT groups, the parent/child link must be part of a rigid Export group!\n")
-                        progressDialog.hide()
-
-    def exportViaPointsToSDF(self):
-        allComponents = self.design.allComponents
-        EEs = []
-        VMs = []
-        construction_point_names = []
-        for occurrence in self.rootOcc:
-            com = occurrence.component
-        for com in allComponents:
-            try:
-                if com is not None:
-                    allConstructionPoints = com.constructionPoints
-                    for point in allConstructionPoints:
-                        if point is not None:
-                            viaPoint = ViaPoint()
-                            construction_point_names.append(point.name[:2])
-                            if point.name[:2] == "VP":
-                                viaPointInfo = point.name.split("_")
-                                vec = adsk.core.Point3D.create(point.geometry.x,point.geometry.y,point.geometry.z)
-                                # vec.transformBy(com.occurrences[0].transform)
-                                viaPoint.global_coordinates = [vec.x,vec.y,vec.z]
-                                linkname = '_'.join(viaPointInfo[3:-1])
-                                origin = self.transformMatrices[linkname].translation
-                                origin = origin.asPoint()
-                                dist = origin.vectorTo(vec)
-                                viaPoint.coordinates = str(dist.x*0.01) + " " + str(dist.y*0.01) + " " + str(dist.z*0.01)
-                                viaPoint.link = linkname
-                                viaPoint.number = viaPointInfo[-1:]
-                                myoNumber = viaPointInfo[1][5:]
-                                myoMuscleList = list(filter(lambda x: x.number == myoNumber, self.myoMuscles))
-                                if not myoMuscleList:
-                                    myoMuscle = MyoMuscle(myoNumber)
-                                    myoMuscle.viaPoints.append(viaPoint)
-                                    self.myoMuscles.append(myoMuscle)
-                                if myoMuscleList:
-                                    myoMuscleList[0].viaPoints.append(viaPoint)
-                            if point.name[:2] == "EE":
-                                eeInfo = point.name.split("_")
-                                vec = adsk.core.Point3D.create(point.geometry.x,point.geometry.y,point.geometry.z)
-                                viaPoint.global_coordinates = [point.geometry.x,point.geometry.y,point.geometry.z]
-                                linkname = '_'.join(eeInfo[1:])
-                                origin = self.transformMatrices[linkname].translation
-                                origin = origin.asPoint()
-                                dist = origin.vectorTo(vec)
-                                ee = VisualMarker()
-                                ee.coordinates = str(dist.x*0.01) + " " + str(dist.y*0.01) + " " + str(dist.z*0.01)
-                                ee.link = linkname
-                                EEs.append(ee)
-                            if point.name[:2] == "VM":
-                                vmInfo = point.name.split("_")
-                                vec = adsk.core.Point3D.create(point.geometry.x,point.geometry.y,point.geometry.z)
-                                viaPoint.global_coordinates = [point.geometry.x,point.geometry.y,point.geometry.z]
-                                linkname = '_'.join(vmInfo[1:])
-                                origin = self.transformMatrices[linkname].translation
-                                origin = origin.asPoint()
-                                dist = origin.vectorTo(vec)
-                                vm = VisualMarker()
-                                vm.coordinates = str(dist.x*0.01) + " " + str(dist.y*0.01) + " " + str(dist.z*0.01)
-                                vm.link = linkname
-                                VMs.append(vm)
-
-            except:
-                   self.ui.messageBox("Exception in " + point.name + '\n' +traceback.format_exc())
-                   pass
-
-        plugin = ET.Element("plugin", filename=self.pluginFileName, name=self.pluginName)
-        if (not self.exportOpenSimMuscles):
-            self.model.append(plugin)
-        #allMyoMuscles.sort(key=lambda x: x.number)
-        # create myoMuscle nodes
-        # self.contructViapointTree(plugin)
-
-        i = 0
-        for ee in EEs:
-            endeffector = ET.Element("endEffector", name="endeffector"+str(i), link=ee.link)
-            i = i+1
-            endeffector.text = ee.coordinates
-            plugin.append(endeffector)
-        for vm in VMs:
-            marker = ET.Element("marker", link=vm.link)
-            marker.text = vm.coordinates
-            plugin.append(marker)
-
-        if (self.exportOpenSimMuscles):
-            self.exportOpenSimMusclesToOsim()
-
-    def contructViapointTree(self, rootElement):
-        for myo in self.myoMuscles:
-            myoMuscle = ET.Element("myoMuscle", name="motor"+myo.number)
-            rootElement.append(myoMuscle)
-            allViaPoints = myo.viaPoints
-            allViaPoints.sort(key=lambda x: x.number)
-            link = ET.Element("link", name="default")
-            # create viaPoint nodes as children of links
-            for via in allViaPoints:
-                if link.get("name") != via.link:
-                    link = ET.Element("link", name=via.link)
-                    myoMuscle.append(link)
-                # TODO: export more types of viaPoints
-                viaPoint = ET.Element("viaPoint", type="FIXPOINT")
-                # TODO: rotate global coordinates into link frame coordinates
-                viaPoint.text=via.coordinates
-                link.append(viaPoint)
-
-    def traverseViaPoints(self):
-
-        app = adsk.core.Application.get()
-
-        try:
-            #current product
-            product = app.activeProduct
-            #current component
-            rootComp = product.rootComponent
-            #get sketches collection
-            sketches = rootComp.sketches
-            #get one sketch
-            num = sketches.count - 1
-            while(num != -1):
-                print(num)
-                oneSketch = sketches.item(num)
-                oneSketch.deleteMe()
-                num -= 1
-
-        except:
-            ui = app.userInterface
-            if ui:
-                ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
-
-        allComponents = self.design.allComponents
-        sketches = adsk.fusion.Design.cast(adsk.core.Application.get().activeProduct).rootComponent.sketches
-        xyPlane = self.rootComp.xYConstructionPlane
-        points = {}
-
-
-        for com in allComponents:
-            try:
-                if com is not None:
-                    allConstructionPoints = com.constructionPoints
-                    for point in allConstructionPoints:
-                        if point is not None:
-                            if point.name[:2] == "VP":
-                                viaPointInfo = point.name.split("_")
-                                vec = adsk.core.Point3D.create(point.geometry.x,point.geometry.y,point.geometry.z)
-                                myoNumber = viaPointInfo[1][5:]
-
-                                if myoNumber not in points:
-
-                                    points[myoNumber] = adsk.core.ObjectCollection.create()
-                                points[myoNumber].add(vec)
-            except:
-                   self.ui.messageBox("Exception in " + point.name + '\n' +traceback.format_exc())
-                   pass
-
-        for motorNumber in points:
-            try:
-                sketch = sketches.add(xyPlane)
-                sketch.name = "tendon_" + motorNumber
-                sketch.sketchCurves.sketchFittedSplines.add(points[motorNumber])
-            except:
-                self.logfile.write("Error in motor"  + str(motorNumber))
-                self.ui.messageBox("Exception in motor" + str(motorNumber) + '\n' +traceback.format_exc())
-                pass
-
-    def exportLighthouseSensorsToYAML(self):
-        #get all joints of the design
-        allComponents = self.design.allComponents
-        DarkRoomSensors = defaultdict(list)
-        for com in allComponents:
-            if com is not None:
-                allConstructionPoints = com.constructionPoints
-                for point in allConstructionPoints:
-                    if point.name[:2] == "LS":
-                        names = point.name.split('_')
-                        linkname = "_".join(names[1:-1])
-                        sensor_position = adsk.core.Point3D.create(point.geometry.x,point.geometry.y,point.geometry.z)
-                        # the lighthouse sensors shall be relative to COM, such that the pose estimation returns a pose for the COM
-                        vec = self.COM[linkname].vectorTo(sensor_position)
-                        DarkRoomSensors[linkname].append(vec)
-        objectID = 0
-        for name,sensors in DarkRoomSensors.items():
-            file = open(self.fileDir+'/lighthouseSensors/' + name+'.yaml', 'w')
-            file.write('name: ' + name + '\n');
-            file.write('ObjectID: ' + str(objectID) + '\n');
-            file.write('mesh: ' + "../meshes/CAD/" + name + '.stl\n');
-            file.write('sensor_relative_locations:\n');
-            i = 0
-            for point in sensors:
-                line = '- [' + str (i) + ', ' + str(point.x*0.01) + ', ' + str(point.y*0.01) + ', ' + str(point.z*0.01) + ']\n'
-                file.write(line);
-                i = i+1
-            file.close()
-            objectID = objectID + 1
-
-    def finish(self):
-        # write sdf
-        filename = self.fileDir + "/model.sdf"
-        domxml = DOM.parseString(ET.tostring(self.root))
-        pretty = domxml.toprettyxml()
-        file = open(filename, "w")
-        file.write(pretty)
-        file.close()
-        # write config
-        file = open(self.fileDir + '/model.config', 'w')
-        file.write('<?xml version="1.0" ?>\n<model>\n<name>'+self.modelName+'</name>\n<version>1.0</version>\n')
-        file.write('<sdf version="1.6">model.sdf</sdf>\n<author>\n<name></name>\n<email></email>\n</author>\n')
-        file.write('<description>awesome</description>\n<changes>exported from fusion 360</changes>\n</model>\n')
-        file.close();
-
-        if (self.osimroot != None):
-            file = open(self.fileDir + '/muscles.osim', 'w')
-            domxml = DOM.parseString(ET.tostring(self.osimroot))
-            pretty = domxml.toprettyxml()
-            file.write(pretty)
-            file.close()
-
-        if (self.cardsflowroot != None):
-            file = open(self.fileDir + '/cardsflow.xml', 'w')
-            domxml = DOM.parseString(ET.tostring(self.cardsflowroot))
-            pretty = domxml.toprettyxml()
-            file.write(pretty)
-            file.close()
-
-        self.logfile.close()
-        self.ui.messageBox("SDF file of model " + self.modelName + " written to '" + self.fileDir + "'.")
-
-
-
-    ## Builds SDF pose node from vector.
+    ## Returns the construction point index of the design.
     #
-    # This function builds the SDF pose node for every joint.
+    # The index is built on first use, i.e. after the optional clean up removed
+    # small parts, and is shared by all subsequent stages of the export. All
+    # annotated points are recorded in the snapshot.
+    def getConstructionPointIndex(self):
+        if self.pointIndex is None:
+            known = {}
+            if self.previous is not None:
+                for (name, position) in self.previous.points:
+                    parsed = parseConstructionPointName(name)
+                    if parsed is not None and self.keepsPreviousLink(parsed[1]):
+                        known[name] = tuple(position)
+            with self.tracer.phase("buildConstructionPointIndex"):
+                self.pointIndex = ConstructionPointIndex().build(self.design.allComponents, known)
+            for name in self.pointIndex.malformed:
+                self.logfile.write("WARNING: ignoring construction point " + name + ", it does not follow the naming convention\n")
+            self.snapshot.points = [(entry.name, entry.position) for entry in self.pointIndex.entries]
+        return self.pointIndex
+
+    ## Returns the center of mass of a link.
     #
-    # @param vector the vector pointing to the origin of the joint.
-    # @return the SDF pose node
-    def sdfPoseVector(self, vector):
-        pose = ET.Element("pose") #, frame="")
-        # convert from cm (Fusion 360) to m (SI)
-        x = 0.01 * vector.x
-        y = 0.01 * vector.y
-        z = 0.01 * vector.z
-        pos = vectorToString(x, y, z)
-        rot = vectorToString(0, 0, 0)
-        pose.text = pos + " " + rot
-        return pose
+    # @param name the name of the link
+    # @param centerOfMass the center of mass of the bodies of the link
+    # @return the (x, y, z) center of mass in design coordinates (cm)
+    @traced()
+    def getCOM(self, name, centerOfMass):
+        # check if a COM point is defined, the last one in design order wins
+        comPoints = self.getConstructionPointIndex().get("COM", name)
+        if comPoints:
+            com = tuple(comPoints[-1].position)
+        else:
+            com = tuple(centerOfMass)
 
-    ## Builds SDF pose node from matrix.
-    #
-    # This function builds the SDF pose node for every link.
-    #
-    # @param matrix the transformation matrix of the link
-    # @return the SDF pose node
-    def sdfPoseMatrix(self, matrix):
-        pose = ET.Element("pose") #, frame="")
-        # convert from cm (Fusion 360) to m (SI)
-        trans = matrix.translation
-        x = 0.01 * trans.x
-        y = 0.01 * trans.y
-        z = 0.01 * trans.z
-        pos = vectorToString(x, y, z)
-        # calculate roll pitch yaw from transformation matrix
-        r11 = matrix.getCell(0, 0)
-        r21 = matrix.getCell(1, 0)
-        r31 = matrix.getCell(2, 0)
-        r32 = matrix.getCell(2, 1)
-        r33 = matrix.getCell(2, 2)
-        pitch = math.atan2(-r31, math.sqrt(math.pow(r11, 2) + math.pow(r21, 2)))
-        cp = math.cos(pitch)
-        yaw = math.atan2(r21 / cp, r11 / cp)
-        roll = math.atan2(r32 / cp, r33 / cp)
-        rot = vectorToString(roll, pitch, yaw)
-        pose.text = pos + " " + rot
-        return pose
+        self.logfile.write("COM: " + name + " " + str(com[0]) + " " + str(com[1]) + " " + str(com[2]) + "\n")
+        return com
 
-    ## Builds SDF inertial node from physical properties.
+    ## Reads the physical properties of one body.
     #
-    # This function builds the SDF inertial node for every link.
+    # @param body the body, a proxy in the design context
+    # @param name the name of the body in the exported component
+    def extractBody(self, body, name):
+        physics = body.physicalProperties
+        centerOfMass = physics.centerOfMass
+        return BodySnapshot(name, physics.mass, physics.volume,
+                            (centerOfMass.x, centerOfMass.y, centerOfMass.z),
+                            physics.getXYZMomentsOfInertia()[1:], body.material.name)
+
+    ## Measures mass and inertia of a link.
     #
-    # @param physics the physical properties of a link
-    # @return the SDF inertial node
-    def sdfInertial(self, link):
-        physics = link.physicalProperties
-        name = link.name
-        inertial = ET.Element("inertial")
-        # the link frame is located at the COM, therefor we use zero vector for pose
-        zeroVector = adsk.core.Point3D.create(0,0,0)
-        pose = self.sdfPoseVector(zeroVector)
-        inertial.append(pose)
-        # build mass node
-        mass = ET.Element("mass")
-        if self.dummy_inertia:
-            mass.text = "0.1"
-        else:
-            mass.text = str(physics.mass) # * 0.1)
-        inertial.append(mass)
-        # build inertia node
-        inertia = self.sdfInertia(link) #physics,name)
-        inertial.append(inertia)
-        return inertial
-
-    # converts the moment of inertia from world frame to
-    # link's center of mass frame
-    def inertiaToLinkFrame(self, link):
-        [x,y,z] = link.transform.translation.asArray()
-        (_, xx, yy, zz, xy, yz, xz) = link.physicalProperties.getXYZMomentsOfInertia()
-        i_world = [xx,yy,zz,xy,yz,xz]
-        mass = link.physicalProperties.mass
-        xx_t = mass*(y*y+z*z)
-        yy_t = mass*(x*x+z*z)
-        zz_t = mass*(x*x+y*y)
-        xy_t = -mass*x*y
-        xz_t = -mass*x*z
-        yz_t = -mass*y*z
-        i_transform = [xx_t, yy_t, zz_t, xy_t, yz_t, xz_t]
-        return (i-t for (i,t) in zip(i_world,i_transform))
-
-    ## Builds SDF node for one moment of inertia.
+    # This function reads the physical properties of every body of the rigid
+    # group once and combines them, so the link does not have to be copied
+    # before its frame is known. The link frame is located at the center of
+    # mass.
     #
-    # This helper function builds the SDF node for one moment of inertia.
+    # @param name the name of the link
+    # @param group the rigid group of the link
+    # @return the LinkSnapshot
+    @traced()
+    def extractLink(self, name, group):
+        bodies = []
+        for occurrence in group.occurrences:
+            for body in occurrence.bRepBodies:
+                bodies.append(self.extractBody(body, 'body' + str(len(bodies))))
+        (mass, centerOfMass, world) = combineMassProperties(bodies)
+        com = self.getCOM(name, centerOfMass)
+        inertia = inertiaToLinkFrame(com, mass, world)
+        self.logfile.write(f"link {name}\ninertia local frame: {inertia}\ninertia world frame {world}\n")
+        transform = adsk.core.Matrix3D.create()
+        transform.translation = adsk.core.Vector3D.create(*com)
+        return LinkSnapshot(name, transform.asArray(), mass, com, inertia, self.linkMeshes(name),
+                            [occurrence.fullPathName for occurrence in group.occurrences], bodies)
+
+    ## Copies the bodies of a rigid group into another component.
     #
-    # @param tag the tag of the XML node
-    # @param value the text of the XML node
-    # @return the SDF moment of inertia node
-    def sdfMom(self, tag, value):
-        node = ET.Element(tag)
-        # convert from kg/cm^2 (Fusion 360) to kg/m^2 (SI)
-        node.text = str(0.0001 * value) # * 0.1)
-        return node
+    # @param group the rigid group
+    # @param target the occurrence receiving the copies
+    # @param name the name of the link shown in the progress dialog
+    # @return False if the copy was cancelled
+    @traced()
+    def copyBodies(self, group, target, name):
+        bodies = [b for occurrence in group.occurrences for b in occurrence.bRepBodies]
+        message = self.progress.message
+        i = 0
+        for b in bodies:
+            new_body = b.copyToComponent(target)
+            new_body.name = 'body'+str(i)
+            i = i+1
+            self.progress.message = message + " " + name + ", body " + str(i) + "/" + str(len(bodies))
+            if not self.progress.pump():
+                return False
+        self.progress.message = message
+        return True
 
-    ## Builds SDF inertia node from physical properties.
-    #
-    # This function builds the SDF inertia node for every link.
+    ## Returns the mesh files of a link by level, empty without meshes.
+    def linkMeshes(self, name):
+        if not self.exportMeshes:
+            return {}
+        return {level: meshes.meshFile(name, level) for level in self.meshLevels()}
+
+    ## Exports the meshes of a link at some refinement levels.
     #
-    # @param physics the physical properties of a link
-    # @return the SDF inertia node
-    def sdfInertia(self, link): #physics, name):
-        physics = link.physicalProperties
-        name = link.name
-        inertia = ET.Element("inertia")
-        xx = 1000
-        yy = 1000
-        zz = 1000
-        xy = 0
-        xz = 0
-        yz = 0
-        if not self.dummy_inertia:
-            # (returnValue, xx, yy, zz, xy, yz, xz) = physics.getXYZMomentsOfInertia()
-            (xx, yy, zz, xy, yz, xz) = self.inertiaToLinkFrame(link)
-            
-            self.logfile.write(f"link {name}\ninertia local frame: {(xx, yy, zz, xy, yz, xz)}\ninertia world frame {physics.getXYZMomentsOfInertia()[1:]}\n")
+    # @param occ the occurrence of the exported link
+    # @param name the name of the link
+    # @param levels the mesh levels
+    def exportMeshLevels(self, occ, name, levels):
+        for level in levels:
+            self.logfile.write("exporting " + level + " stl of " + name + "\n")
+            self.exportToStl(occ, name, level)
+            self.meshJobs[(name, level)] = None
+            if self.postProcessMeshes:
+                # runs in a worker while the next link is copied and meshed
+                self.meshJobs[(name, level)] = self.worker.submit('meshes.postProcessStl', os.path.join(self.fileDir, meshes.meshFile(name, level)))
+
+    @traced()
+    def copyBodiesToNewComponentAndExport(self, name):
 
-        inertia.append(self.sdfMom("ixx", xx))
-        inertia.append(self.sdfMom("ixy", xy))
-        inertia.append(self.sdfMom("ixz", xz))
-        inertia.append(self.sdfMom("iyy", yy))
-        inertia.append(self.sdfMom("iyz", yz))
-        inertia.append(self.sdfMom("izz", zz))
+        self.logfile.write("Body: " + name + "\n")
 
-        self.inertias[name].append(xx)
-        self.inertias[name].append(yy)
-        self.inertias[name].append(zz)
-        self.inertias[name].append(xy)
-        self.inertias[name].append(yz)
-        self.inertias[name].append(xz)
-        return inertia
+        if self.keepsPreviousLink(name):
+            self.logfile.write("keeping " + name + " of the previous export\n")
+            self.snapshot.links[name] = self.previous.links[name]
+            self.model.append(self.linkSDF(name))
+            return True
 
-    ## Builds SDF link node.
-    #
-    # This function builds the SDF link node for every link.
-    #
-    # @param lin the link to be exported
-    # @param name of the link to be exported
-    # @return the SDF link node
-    def linkSDF(self, lin, name):
-        # linkName = lin.component.name
-        link = ET.Element("link", name=name)
-        self_collide = ET.Element("self_collide")
-        if self.self_collide:
-            self_collide.text = "true"
+        transformMatrix = adsk.core.Matrix3D.create()
+        new_component = self.rootOcc.itemByName("EXPORT_" + name + ":1")
+        group = self.getRigidGroupIndex().group(name)
+        fingerprint = self.linkFingerprint(name)
+        cached = None
+        if new_component and self.exportCache is not None:
+            cached = self.exportCache.lookup(name, fingerprint)
+        if cached is None:
+            self.logfile.write("rebuilding " + name + "\n")
+            with self.transaction("EXPORT_" + name) as transaction:
+                if new_component:
+                    transaction.delete(new_component)
+                link = self.extractLink(name, group)
+                transformMatrix.translation = adsk.core.Vector3D.create(*link.com)
+                new_component = self.rootOcc.addNewComponent(transformMatrix)
+                new_component.component.name = "EXPORT_" + name
+                if not self.copyBodies(group, new_component, name):
+                    return False
+            link.transform = tuple(new_component.transform.asArray())
+            self.exportMeshLevels(new_component, name, list(link.meshes))
+            if self.exportCache is not None:
+                self.exportCache.store(name, fingerprint, link.toDict())
         else:
-            self_collide.text = "false"
-        link.append(self_collide)
-
-        # build pose node
-        #matrix = gazeboMatrix()
-        pose = self.sdfPoseMatrix(lin.transform)
-        link.append(pose)
-        # get physical properties of occurrence
-        physics = lin.physicalProperties
-        # build inertial node
-        inertial = self.sdfInertial(lin) #physics, name)
-        # self.debugMoI(physics,lin.transform)
-        link.append(inertial)
-        # build collision node
-        collision = ET.Element("collision", name = name + "_collision")
-        if (not self.exportOpenSimMuscles):
-            link.append(collision)
-        # build geometry node
-        geometry = ET.Element("geometry")
-        collision.append(geometry)
-        # build mesh node
-        mesh = ET.Element("mesh")
-        geometry.append(mesh)
-        # build uri node
-        uri = ET.Element("uri")
-        global modelName
-        uri.text = "model://" + self.modelName + "/meshes/CAD/" + name + ".stl"
-        mesh.append(uri)
-        # scale the mesh from mm to m
-        scale = ET.Element("scale")
-        scale.text = "0.001 0.001 0.001"
-        mesh.append(scale)
-        # build visual node (equal to collision node)
-        visual = ET.Element("visual", name = name + "_visual")
-        visual.append(geometry)
-        link.append(visual)
-        return link
+            self.logfile.write("reusing cached " + name + "\n")
+            link = LinkSnapshot.fromDict(cached["link"])
+            link.transform = tuple(new_component.transform.asArray())
+            # levels requested for the first time or deleted since
+            link.meshes = self.linkMeshes(name)
+            self.exportMeshLevels(new_component, name, self.exportCache.missingMeshes(link.meshes))
+
+        self.snapshot.links[name] = link
+        self.model.append(self.linkSDF(name))
+        new_component.isLightBulbOn = False
+        # delete the temporary new occurrence
+        # new_component.deleteMe()
+        # give Fusion a chance to react
+        self.progress.pump()
+        return True
 
-    ## Builds SDF joint node.
-    #
-    # This function builds the SDF joint node for every joint type.
+    ## Reads one EXPORT joint into the snapshot.
     #
     # @param joi the joint
     # @param name_parent the name of the parent link
     # @param name_child the name of the child link
-    # @return the SDF joint node
-    def jointSDF(self, joi, name_parent, name_child, transformMatrix):
-        jointInfo = []
-        jointType = ""
-        jType = joi.jointMotion.jointType
-        if jType == 0: # fixed
-            jointType = "fixed"
-        elif jType == 1: # revolute joint
-            # build axis node
-            axis = ET.Element("axis")
-            xyz = ET.Element("xyz")
-            vector = joi.jointMotion.rotationAxisVector
-            xyz.text = vectorToString(vector.x, vector.y, vector.z)
-            axis.append(xyz)
-            # build limit node
-            mini = joi.jointMotion.rotationLimits.minimumValue
-            maxi = joi.jointMotion.rotationLimits.maximumValue
-            limit = ET.Element("limit")
-            axis.append(limit)
-            lower = ET.Element("lower")
-            lower.text = str(mini)
-            limit.append(lower)
-            upper = ET.Element("upper")
-            upper.text = str(maxi)
-            limit.append(upper)
-            # build frame node
-            frame = ET.Element("use_parent_model_frame")
-            frame.text = "0"
-            axis.append(frame)
-            jointInfo.append(axis)
-            jointType = "revolute"
+    # @return the JointSnapshot
+    def extractJoint(self, joi, name_parent, name_child):
+        motion = joi.jointMotion
+        jType = motion.jointType
+        axis = (0.0, 0.0, 0.0)
+        lower = 0.0
+        upper = 0.0
+        if jType == 1: # revolute joint
+            vector = motion.rotationAxisVector
+            axis = (vector.x, vector.y, vector.z)
+            lower = motion.rotationLimits.minimumValue
+            upper = motion.rotationLimits.maximumValue
         elif jType == 2: # slider
-            # build axis node
-            axis = ET.Element("axis")
-            xyz = ET.Element("xyz")
-            vector = joi.jointMotion.slideDirectionVector
-            xyz.text = vectorToString(vector.x, vector.y, vector.z)
-            axis.append(xyz)
-            # build limit node, convert from cm to meter
-            mini = joi.jointMotion.slideLimits.minimumValue/100.0
-            maxi = joi.jointMotion.slideLimits.maximumValue/100.0
-            limit = ET.Element("limit")
-            axis.append(limit)
-            lower = ET.Element("lower")
-            lower.text = str(mini)
-            limit.append(lower)
-            upper = ET.Element("upper")
-            upper.text = str(maxi)
-            limit.append(upper)
-            # build frame node
-            frame = ET.Element("use_parent_model_frame")
-            frame.text = "0"
-            axis.append(frame)
-            jointInfo.append(axis)
-            jointType = "prismatic"
-        elif jType == 3: # cylindrical
-            # not implemented
-            jointType = ""
-        elif jType == 4: # pin slot
-            # not implemented
-            jointType = ""
-        elif jType == 5: # planar
-            # not implemented
-            jointType = ""
-        elif jType == 6:
-            # SDFormat does not implement ball joint limits
-            jointType = "ball"
-        name = joi.name[7:]
-        joint = ET.Element("joint", name=name, type=jointType)
-        # build parent node
-        parent = ET.Element("parent")
-        parent.text = name_parent
-        joint.append(parent)
-        # build child node
-        child = ET.Element("child")
-        child.text = name_child
-        joint.append(child)
-        # build pose node
-        vec = joi.geometryOrOriginTwo.origin
-        print(vec.asArray())
-        origin = transformMatrix.translation
-        origin = origin.asPoint()
-        dist = origin.vectorTo(vec)
-        #print(transformMatrix.asArray())
-        pose = self.sdfPoseVector(dist)
-        self.logfile.write("\tpos: "+ str(dist.x) + "\t" + str(dist.y) + "\t" + str(dist.z) + "\n")
+            vector = motion.slideDirectionVector
+            axis = (vector.x, vector.y, vector.z)
+            lower = motion.slideLimits.minimumValue
+            upper = motion.slideLimits.maximumValue
+        # cylindrical, pin slot and planar joints are not implemented
+        return JointSnapshot(joi.name[7:], self.jointTypes.get(jType, ""), name_parent, name_child, axis, lower, upper,
+                             joi.geometryOrOriginOne.origin.asArray(), joi.geometryOrOriginTwo.origin.asArray())
+
+    ## Returns all EXPORT joints of the design.
+    def getExportJoints(self):
+        exportJoints = []
+        for com in self.design.allComponents:
+            if com is not None:
+                for joi in com.joints:
+                    if joi is not None and joi.name[:6] == "EXPORT":
+                        exportJoints.append(joi)
+        return exportJoints
 
-        joint.append(pose)
-        joint.extend(jointInfo)
-        return joint
+    @traced()
+    def exportJointsToSDF(self):
+        rigidGroupIndex = self.getRigidGroupIndex()
+        previousJoints = {}
+        if self.previous is not None:
+            previousJoints = {joint.name: joint for joint in self.previous.joints}
+        exportJoints = self.getExportJoints()
+
+        self.progress.start("Joint", "Processing joints: %v/%m", len(exportJoints))
+        for joi in exportJoints:
+            self.progress.step(message="Processing joints: %v/%m " + joi.name)
+            previous = previousJoints.get(joi.name[7:])
+            if previous is not None and self.keepsPreviousLink(previous.child) and previous.parent in self.snapshot.links:
+                self.snapshot.joints.append(previous)
+                continue
+            self.logfile.write("Joint: " + joi.name + "\n")
+            one = joi.occurrenceOne
+            two = joi.occurrenceTwo
+            if one is not None and two is not None:
+                name_child = rigidGroupIndex.linkOf(one)
+                name_parent = rigidGroupIndex.linkOf(two)
+                if name_parent is not None and name_child is not None and name_child in self.snapshot.links:
+                    self.logfile.write("\tparent: " + name_parent + "\n")
+                    self.logfile.write("\tchild: " + name_child + "\n")
+                    self.snapshot.joints.append(self.extractJoint(joi, name_parent, name_child))
+                else:
+                    self.logfile.write("\tERROR writing joint " + joi.name + ", check your rigid EXPORT groups, the parent/child link must be part of a rigid Export group!\n")
+        self.progress.finish()
+        for joint in self.snapshot.joints:
+            self.exportCache.setJointFingerprint(joint.name, fingerprintJoint(joint.toDict()))
+        super().exportJointsToSDF()
+
+    ## Updates the sketch with the fitted spline through the via-points of every motor.
+    #
+    # The sketches are called tendon_<motor> and carry the fingerprint of the
+    # via-points they were drawn through. Only sketches whose via-points
+    # changed are drawn again and tendon sketches of motors without
+    # via-points are deleted. Sketches with other names are never touched.
+    @traced()
+    def traverseViaPoints(self):
+        sketches = self.rootComp.sketches
+        tendons = {}
+        for sketch in sketches:
+            if sketch is not None and sketch.name.startswith("tendon_"):
+                tendons[sketch.name] = sketch
+        kept = 0
+        redrawn = 0
+        changed = []
+        for (myoNumber, entries) in self.getConstructionPointIndex().byMotor("VP").items():
+            try:
+                positions = [entry.position for entry in sorted(entries, key=lambda entry: int(entry.number))]
+            except ValueError:
+                self.reportError("Exception in motor" + str(myoNumber) + '\n' + traceback.format_exc())
+                continue
+            fingerprint = fingerprintTendon(positions)
+            sketch = tendons.get("tendon_" + myoNumber)
+            if sketch is not None:
+                attribute = sketch.attributes.itemByName(self.attributeGroup, "tendon")
+                if attribute is not None and attribute.value == fingerprint:
+                    del tendons["tendon_" + myoNumber]
+                    kept += 1
+                    continue
+                redrawn += 1
+            changed.append((myoNumber, positions, fingerprint))
+        # the remaining sketches are outdated or belong to motors without via-points
+        removed = len(tendons) - redrawn
+        with self.transaction("tendon sketches") as transaction:
+            transaction.delete(list(tendons.values()))
+            for (myoNumber, positions, fingerprint) in changed:
+                try:
+                    points = adsk.core.ObjectCollection.create()
+                    for position in positions:
+                        points.add(adsk.core.Point3D.create(*position))
+                    sketch = sketches.add(self.rootComp.xYConstructionPlane)
+                    sketch.name = "tendon_" + myoNumber
+                    sketch.sketchCurves.sketchFittedSplines.add(points)
+                    sketch.attributes.add(self.attributeGroup, "tendon", fingerprint)
+                except:
+                    self.reportError("Exception in motor" + str(myoNumber) + '\n' + traceback.format_exc())
+        self.logfile.write("tendon sketches: " + str(kept) + " kept, " + str(len(changed)) + " drawn, " + str(removed) + " deleted\n")
 
     ## Plain STL export.
     ##
@@ -813,235 +600,23 @@ class SDFExporter():
         stepOptions = self.exportMgr.createSTEPExportOptions(self.fileDir+ '/meshes/CAD/' + linkname + '.step', occ.component)
         return self.exportMgr.execute(stepOptions)
 
-    def exportToStl(self, occ, linkname):
+    @traced()
+    def exportToStl(self, occ, linkname, level=meshes.LOW):
+        filename = os.path.join(self.fileDir, meshes.meshFile(linkname, level))
+        # the old mesh may be a hardlink into the mesh store, never write through it
+        if os.path.isfile(filename):
+            os.remove(filename)
         # Create an STEPExportOptions object and do the export.
-        stlExportOptions = self.exportMgr.createSTLExportOptions(occ, self.fileDir+ '/meshes/CAD/' + linkname + '.stl')
-        stlExportOptions.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementLow
+        stlExportOptions = self.exportMgr.createSTLExportOptions(occ, filename)
+        stlExportOptions.meshRefinement = self.meshRefinements[level]
         return self.exportMgr.execute(stlExportOptions)
 
-    def exportCASPRcables(self):
-        file = open(self.fileDir + '/caspr/'+ self.modelName+'_cables.xml', 'w')
-        file.write('<?xml version="1.0" encoding="utf-8"?>\n')
-        file.write('<!DOCTYPE cables SYSTEM "../../../templates/cables.dtd">\n')
-        cables = ET.Element('cables')
-        cables.set('default_cable_set', 'WORKING')
-        cable_set = ET.SubElement(cables, 'cable_set')
-        cable_set.set('id','WORKING')
-
-        # create myoMuscle nodes
-        i = 0
-        for myo in self.myoMuscles:
-            cable_ideal = ET.SubElement(cable_set, 'cable_ideal')
-            cable_ideal.set('name', 'cable ' + str(i))
-            i = i+1
-            cable_ideal.set('attachment_reference', 'com')
-            properties = ET.SubElement(cable_ideal, 'properties')
-            force_min = ET.SubElement(properties, 'force_min')
-            force_min.text = '10'
-            force_max = ET.SubElement(properties, 'force_max')
-            force_max.text = '80'
-
-            attachments = ET.SubElement(cable_ideal, 'attachments')
-            allViaPoints = myo.viaPoints
-            allViaPoints.sort(key=lambda x: x.number)
-            for via in allViaPoints:
-                attachment = ET.SubElement(attachments, 'attachment')
-                link = ET.SubElement(attachment, 'link')
-                link.text = via.link
-                location = ET.SubElement(attachment, 'location')
-                location.text=via.coordinates
-        file.write(prettify(cables))
-        file.close()
-
-    def exportCASPRbodies(self):
-        file = open(self.fileDir + '/caspr/'+ self.modelName+'_bodies.xml', 'w')
-        file.write('<?xml version="1.0" encoding="utf-8"?>\n')
-        file.write('<!DOCTYPE bodies_system SYSTEM "../../../templates/bodies.dtd">\n')
-        bodies_system = ET.Element('bodies_system')
-        links = ET.SubElement(bodies_system, 'links')
-        links.set('display_range','-0.3 0.3 0.0 1.0 -0.3 0.3')
-        links.set('view_angle','-37 32')
-        for (parent_name,(child_name, joint)) in self.joints.items():
-            link_rigid = ET.SubElement(links, 'link_rigid')
-            link_rigid.set('num','1')
-            link_rigid.set('name',parent_name)
-            joi = ET.SubElement(link_rigid, 'joint')
-            joi.set('type','R_xyx')
-            vector = joint.jointMotion.rotationAxisVector
-            joi.set('axis',vectorToString(vector.x, vector.y, vector.z))
-            joi.set('q_min', str(joint.jointMotion.rotationLimits.minimumValue))
-            joi.set('q_max', str(joint.jointMotion.rotationLimits.maximumValue))
-            physical = ET.SubElement(link_rigid, 'physical')
-            mass = ET.SubElement(physical, 'mass')
-            mass.text = str(self.totalMass[parent_name])
-
-            joint_origin = joint.geometryOrOriginOne.origin
-
-            com_origin = self.COM[parent_name]
-            com_location = ET.SubElement(physical, 'com_location')
-            com_location.text = str((com_origin.x-joint_origin.x)/100.0) + ' ' + str((com_origin.y-joint_origin.y)/100.0) + ' ' + str((com_origin.z-joint_origin.z)/100.0)
 
-            end_location = ET.SubElement(physical, 'end_location')
-            end_location.text = '0 0 0'
-            inertia = ET.SubElement(physical, 'inertia')
-            inertia.set('ref','com')
-            Ixx = ET.SubElement(inertia, 'Ixx')
-            Ixx.text = str(self.inertias[parent_name][0])
-            Iyy = ET.SubElement(inertia, 'Iyy')
-            Iyy.text = str(self.inertias[parent_name][1])
-            Izz = ET.SubElement(inertia, 'Izz')
-            Izz.text = str(self.inertias[parent_name][2])
-            Ixy = ET.SubElement(inertia, 'Ixy')
-            Ixy.text = str(self.inertias[parent_name][3])
-            Ixz = ET.SubElement(inertia, 'Ixz')
-            Ixz.text = str(self.inertias[parent_name][5])
-            Iyz = ET.SubElement(inertia, 'Iyz')
-            Iyz.text = str(self.inertias[parent_name][4])
-
-            print(parent_name + ' ' + str(joint.geometryOrOriginOne.origin.asArray()))
-            print(child_name + ' ' + str(joint.geometryOrOriginTwo.origin.asArray()))
-
-            parent = ET.SubElement(link_rigid, 'parent')
-            num = ET.SubElement(parent, 'num')
-            num.text = child_name
-            location = ET.SubElement(parent, 'location')
-            location.text = str(joint_origin.x/100.0) + ' ' + str(joint_origin.y/100.0) + ' ' + str(joint_origin.z/100.0)
-
-        operational_spaces = ET.SubElement(bodies_system, 'operational_spaces')
-        operational_spaces.set('default_operational_set', 'test')
-        operational_set = ET.SubElement(operational_spaces, 'operational_set')
-        operational_set.set('id','test')
-        position = ET.SubElement(operational_set, 'position')
-        position.set('marker_id','1')
-        position.set('name','test1')
-        link = ET.SubElement(position, 'link')
-        link.text = '2'
-        offset = ET.SubElement(position, 'offset')
-        offset.text = '0.0 0.0 0.0'
-        axes = ET.SubElement(position, 'axes')
-        axes.set('active_axes','x')
-
-        file.write(prettify(bodies_system))
-        file.close()
-
-    def exportToCardsflow(self):
-        self.cardsflowroot = ET.Element("cardsflow")
-        self.contructViapointTree(self.cardsflowroot)
-
-    def exportOpenSimMusclesToOsim(self):
-        osimPlugin = ET.Element("plugin", filename="libgazebo_ros_muscle_interface.so", name="muscle_interface_plugin")
-        self.model.append(osimPlugin)
-        osimMuscles = ET.Element("muscles")
-        osimMuscles.text = "model://" + self.model.get("name") + "/muscles.osim"
-        self.model.append(osimMuscles)
-        self.osimroot = ET.Element("OpenSimDocument", Version="30000")
-        model = ET.Element("Model")
-        forceSet = ET.Element("ForceSet")
-        objects = ET.Element("objects")
-        forceSet.append(objects)
-        model.append(forceSet)
-        self.osimroot.append(model)
-
-        for myo in self.myoMuscles:
-            # TODO add bodies
-            muscle = ET.Element("Thelen2003Muscle", name="muscle" + myo.number)
-            objects.append(muscle)
-            gPath = ET.Element("GeometryPath")
-            ppSet = ET.Element("PathPointSet")
-            ppSetObjects = ET.Element("objects")
-            ppSet.append(ppSetObjects)
-            muscle.append(gPath)
-            gPath.append(ppSet)
-            pwSet = ET.Element("PathWrapSet")
-            pwObjects = ET.Element("objects")
-            pwSet.append(pwObjects)
-            # pWrap = ET.Element("PathWrap",name="PathWrap_"+myo.number)
-            # wrap_object = ET.Element("wrap_object") # TODO fix objects in pWrap
-            # wrap_object.text = "WrapJoint"
-            # pWrap.append(wrap_object)
-            # method = ET.Element("method")
-            # method.text = "midpoint"
-            # pWrap.append(method)
-            # pwObjects.append(pWrap)
-            gPath.append(pwSet)
-            max_isometric_force = ET.Element("max_isometric_force")
-            optimal_fiber_length = ET.Element("optimal_fiber_length")
-            tendon_slack_length = ET.Element("tendon_slack_length")
-            pennation_angle = ET.Element("pennation_angle")
-            activation_time_constant = ET.Element("activation_time_constant")
-            deactivation_time_constant = ET.Element("deactivation_time_constant")
-            Vmax = ET.Element("Vmax")
-            Vmax0 = ET.Element("Vmax0")
-            FmaxTendonStrain = ET.Element("FmaxTendonStrain")
-            FmaxMuscleStrain = ET.Element("FmaxMuscleStrain")
-            KshapeActive = ET.Element("KshapeActive")
-            KshapePassive = ET.Element("KshapePassive")
-            damping = ET.Element("damping")
-            Af = ET.Element("Af")
-            Flen = ET.Element("Flen")
-
-            max_isometric_force.text = str(546.00000000)
-            optimal_fiber_length.text = str(0.05350000)
-            tendon_slack_length.text = str(0.07800000)
-            pennation_angle.text = str(0.00000000)
-            activation_time_constant.text = str(0.01000000)
-            deactivation_time_constant.text = str(0.04000000)
-            Vmax.text = str(10.00000000)
-            Vmax0.text = str(5.00000000)
-            FmaxTendonStrain.text = str(0.03300000)
-            FmaxMuscleStrain.text = str(0.60000000)
-            KshapeActive.text = str(0.50000000)
-            KshapePassive.text = str(4.00000000)
-            damping.text = str(0.05000000)
-            Af.text = str(0.30000000)
-            Flen.text = str(1.80000000)
-
-            # max_isometric_force.text=str(546.0)
-            # stiffness.text = str(100000)
-            # dissipation.text = str(1)
-
-            muscle.append(max_isometric_force)
-            muscle.append(optimal_fiber_length)
-            muscle.append(tendon_slack_length)
-            muscle.append(pennation_angle)
-            muscle.append(activation_time_constant)
-            muscle.append(deactivation_time_constant)
-            muscle.append(Vmax)
-            muscle.append(Vmax0)
-            muscle.append(FmaxTendonStrain)
-            muscle.append(FmaxMuscleStrain)
-            muscle.append(KshapeActive)
-            muscle.append(KshapePassive)
-            muscle.append(damping)
-            muscle.append(Af)
-            muscle.append(Flen)
-
-            # muscle.append(stiffness)
-            # muscle.append(dissipation)
-
-            allViaPoints = myo.viaPoints
-            allViaPoints.sort(key=lambda x: x.number)
-
-            # dist = 0
-            # for i in range(len(allViaPoints)-1):
-            #     squared_dist = (allViaPoints[i].global_coordinates[0] - allViaPoints[i+1].global_coordinates[0])**2 + (allViaPoints[i].global_coordinates[1] - allViaPoints[i+1].global_coordinates[1])**2 + (allViaPoints[i].global_coordinates[2] - allViaPoints[i+1].global_coordinates[2])**2
-            #     # np.sum(allViaPoints[i].global_coordinates**2 + allViaPoints[i+1].global_coordinates**2, axis=0)
-            #     dist += sqrt(squared_dist)
-
-            # tendon_slack_length.text = str(0.02*dist)
-            # optimal_fiber_length.text = str(dist*0.98)#str(0.14108090847730637)  # TODO calculate optiomal fiber length
-
-            selectedViaPoints = [allViaPoints[0], allViaPoints[-1]]
-            for point in selectedViaPoints:
-                pathPoint = ET.Element("PathPoint", name=muscle.get("name") + "_node" + point.number[0])
-                location = ET.Element("location")
-                location.text = point.coordinates
-                body = ET.Element("body")
-                body.text = point.link
-                pathPoint.append(location)
-                pathPoint.append(body)
-                ppSetObjects.append(pathPoint)
-        bodySet = ET.Element("BodySet", name="")
-        bodySetObjects = ET.Element("objects")
-        bodySet.append(bodySetObjects)
-        model.append(bodySet)
+    def finish(self):
+        errors = super().finish()
+        if errors:
+            self.ui.messageBox("Writing " + str(len(errors)) + " output files of model " + self.modelName + " failed, see logfile.txt in '" + self.fileDir + "'.")
+        else:
+            changed = "\n".join(self.changedOutputs) if self.changedOutputs else "no output file changed"
+            self.ui.messageBox("SDF file of model " + self.modelName + " written to '" + self.fileDir + "'.\n\nChanged:\n" + changed)
+        return errors
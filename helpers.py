@@ -1,14 +1,7 @@
+import io
 import xml.etree.ElementTree as ET
 import xml.dom.minidom as DOM
 
-## A class to hold information about all viaPoints of a muscle.
-class MyoMuscle:
-    number = ""
-    viaPoints = []
-    def __init__(self,num):
-        self.number = num
-        self.viaPoints = []
-
 ## A class to hold information about a viaPoint.
 class ViaPoint:
     coordinates = ""
@@ -17,13 +10,13 @@ class ViaPoint:
     global_coordinates = []
     motor = ''
     edge = None
-    def __init__(self, coordinates='', motor='', link='', number='', edge='', global_coordinates=[]):
+    def __init__(self, coordinates='', motor='', link='', number='', edge='', global_coordinates=None):
         self.motor = motor
         self.link = link
         self.number = number
         self.edge = edge
         self.coordinates = coordinates
-        self.global_coordinates = global_coordinates
+        self.global_coordinates = list(global_coordinates or [])
 
 class VisualMarker:
     coordinates = ""
@@ -55,10 +48,59 @@ def clearName(name):
 def prettify(elem):
     """Return a pretty-printed XML string for the Element.
     """
+    stream = io.StringIO()
+    writeXmlStream(stream, elem)
+    return stream.getvalue()
+
+## Pretty-prints an element with minidom.
+#
+# This is the original implementation of prettify, it keeps three copies of the
+# document in memory. writeXmlStream produces the same output in one pass.
+def prettifyMinidom(elem):
     rough_string = ET.tostring(elem, 'utf-8')
     reparsed = DOM.parseString(rough_string)
     return reparsed.toprettyxml(indent="\t")
 
+def _escapeXml(data):
+    return data.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+def _writeElement(write, elem, indent, addindent, newl):
+    write(indent + "<" + elem.tag)
+    for (name, value) in elem.items():
+        write(" " + name + "=\"" + _escapeXml(value) + "\"")
+    children = len(elem)
+    if elem.text:
+        if not children:
+            write(">" + _escapeXml(elem.text) + "</" + elem.tag + ">" + newl)
+            return
+        write(">" + newl + indent + addindent + _escapeXml(elem.text) + newl)
+    elif children:
+        write(">" + newl)
+    else:
+        write("/>" + newl)
+        return
+    for child in elem:
+        _writeElement(write, child, indent + addindent, addindent, newl)
+        if child.tail:
+            write(indent + addindent + _escapeXml(child.tail) + newl)
+    write(indent + "</" + elem.tag + ">" + newl)
+
+## Writes an element tree to a stream in a single pass.
+#
+# With the default arguments the output is byte-compatible to
+# minidom's toprettyxml, which SDFusion used to pretty-print all files.
+# Pass indent='' and newl='' for compact output.
+#
+# @param stream a text stream, e.g. an open file
+# @param elem the root element
+# @param indent the indentation of one level
+# @param newl the line separator
+# @param declaration whether to start with the XML declaration
+def writeXmlStream(stream, elem, indent="\t", newl="\n", declaration=True):
+    if declaration:
+        stream.write('<?xml version="1.0" ?>' + newl)
+    _writeElement(stream.write, elem, "", indent, newl)
+
 ## Converts three double values to string.
 #
 # This function converts three double values to a string separated by spaces.
@@ -69,4 +111,42 @@ def prettify(elem):
 # @return the string of these values
 def vectorToString(x, y, z):
     string = str(x) + " " + str(y) + " " + str(z)
-    return string
\ No newline at end of file
+    return string
+
+## Combines the mass properties of several bodies.
+#
+# The center of mass is the mass weighted centroid of the bodies, their
+# moments about the design origin simply add up.
+#
+# @param bodies BodySnapshots with moments of inertia about the design origin
+# @return (mass, com, inertia) with the inertia (xx, yy, zz, xy, yz, xz) about the design origin
+def combineMassProperties(bodies):
+    mass = 0.0
+    first = [0.0, 0.0, 0.0]
+    inertia = [0.0] * 6
+    for body in bodies:
+        mass += body.mass
+        first = [f + body.mass * c for (f, c) in zip(first, body.com)]
+        inertia = [i + b for (i, b) in zip(inertia, body.inertia)]
+    com = tuple(f / mass for f in first) if mass > 0 else (0.0, 0.0, 0.0)
+    return (mass, com, tuple(inertia))
+
+## Converts moments of inertia about the design origin to the center of mass.
+#
+# This applies the parallel axis theorem for a link whose frame is located
+# at its center of mass.
+#
+# @param com the (x, y, z) center of mass in cm
+# @param mass the mass in kg
+# @param inertia (xx, yy, zz, xy, yz, xz) about the design origin in kg cm^2
+# @return (xx, yy, zz, xy, yz, xz) about the center of mass
+def inertiaToLinkFrame(com, mass, inertia):
+    (x, y, z) = com
+    xx_t = mass*(y*y+z*z)
+    yy_t = mass*(x*x+z*z)
+    zz_t = mass*(x*x+y*y)
+    xy_t = -mass*x*y
+    xz_t = -mass*x*z
+    yz_t = -mass*y*z
+    i_transform = [xx_t, yy_t, zz_t, xy_t, yz_t, xz_t]
+    return tuple(i-t for (i,t) in zip(inertia, i_transform))
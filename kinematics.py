@@ -0,0 +1,105 @@
+## @package kinematics
+# Kinematic tree of the links and joints of a design.
+#
+# Links are numbered in the order they were exported. The tree keeps the
+# parent link and the joint to the parent of every link in flat arrays and
+# orders the links depth first, so the subtree of a link is a contiguous
+# slice of that order. Joints that would give a link a second parent or
+# close a loop, and joints between unknown links, are kept out of the tree
+# and reported, the outputs still get them after the joints of the tree.
+
+class KinematicTree:
+    def __init__(self, links, joints):
+        ## link names, the index of a link is its position in here
+        self.names = list(links)
+        self.index = {name: i for (i, name) in enumerate(self.names)}
+        self.joints = list(joints)
+        n = len(self.names)
+        ## index of the parent link, -1 for roots
+        self.parent = [-1] * n
+        ## index of the joint to the parent in joints, -1 for roots
+        self.parentJoint = [-1] * n
+        self.children = [[] for _ in range(n)]
+        ## names of the joints between links that do not exist
+        self.unknown = []
+        ## names of the joints that would give a link a second parent
+        self.extraParents = []
+        ## names of the joints that would close a loop
+        self.cycles = []
+        for (j, joint) in enumerate(self.joints):
+            parent = self.index.get(joint.parent)
+            child = self.index.get(joint.child)
+            if parent is None or child is None:
+                self.unknown.append(joint.name)
+                continue
+            if self.parent[child] != -1:
+                self.extraParents.append(joint.name)
+                continue
+            ancestor = parent
+            while ancestor != -1 and ancestor != child:
+                ancestor = self.parent[ancestor]
+            if ancestor == child:
+                self.cycles.append(joint.name)
+                continue
+            self.parent[child] = parent
+            self.parentJoint[child] = j
+            self.children[parent].append(child)
+        self.roots = [i for i in range(n) if self.parent[i] == -1]
+        ## link indices depth first, parents before their children
+        self.order = []
+        ## position of every link in order
+        self.position = [0] * n
+        ## end of the subtree of every link in order, exclusive
+        self.end = [0] * n
+        for root in self.roots:
+            stack = [(root, False)]
+            while stack:
+                (i, done) = stack.pop()
+                if done:
+                    self.end[i] = len(self.order)
+                    continue
+                self.position[i] = len(self.order)
+                self.order.append(i)
+                stack.append((i, True))
+                for child in reversed(self.children[i]):
+                    stack.append((child, False))
+
+    ## Builds the tree of the links and joints of a DesignSnapshot.
+    @classmethod
+    def fromSnapshot(cls, snapshot):
+        return cls(snapshot.links, snapshot.joints)
+
+    ## Links without any joint in a design with several links.
+    def orphans(self):
+        if len(self.names) < 2:
+            return []
+        return [self.names[i] for i in self.roots if not self.children[i]]
+
+    ## Names of the links in the subtree of a link, the link first.
+    def subtree(self, name):
+        i = self.index[name]
+        return [self.names[k] for k in self.order[self.position[i]:self.end[i]]]
+
+    ## All joints, the joints of the tree first, every joint after the joint to its parent link.
+    #
+    # The joints that are not part of the tree follow in the order of the design.
+    def jointOrder(self):
+        tree = [self.parentJoint[i] for i in self.order if self.parentJoint[i] != -1]
+        inTree = set(tree)
+        return [self.joints[j] for j in tree] + [joint for (j, joint) in enumerate(self.joints) if j not in inTree]
+
+    ## Describes everything that is wrong with the tree.
+    #
+    # @return list of messages, empty for a valid tree
+    def problems(self):
+        messages = []
+        for name in self.unknown:
+            messages.append("joint " + name + " connects links that are not exported")
+        for name in self.extraParents:
+            messages.append("joint " + name + " gives its child a second parent")
+        for name in self.cycles:
+            messages.append("joint " + name + " closes a kinematic loop")
+        orphans = self.orphans()
+        if orphans:
+            messages.append("links without joints: " + ", ".join(orphans))
+        return messages
@@ -0,0 +1,141 @@
+## @package massproperties
+# Mass, center of mass and inertia of closed triangle meshes.
+#
+# The volume integrals of 1, x, y, z, x^2, ... over the solid are turned into
+# sums over the triangles of its surface with the divergence theorem, see
+# D. Eberly, "Polyhedral Mass Properties (Revisited)". All triangles are
+# processed at once with NumPy, so a link mesh takes milliseconds, compared to
+# a full physicalProperties round-trip through Fusion.
+#
+# The solid has a uniform density. The results use Fusion's units and
+# conventions: cm, kg, kg cm^2 and products of inertia as tensor entries,
+# i.e. xy = -integral(x y dm).
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import meshes
+
+## Use the mass properties measured by Fusion.
+FUSION = "fusion"
+## Use Fusion's mass properties and log how far the mesh based ones are off.
+CHECK = "check"
+## Replace Fusion's mass properties by the mesh based ones.
+MESH = "mesh"
+modes = (FUSION, CHECK, MESH)
+
+## Density of steel, the default material of Fusion, in kg / cm^3.
+steel = 0.00785
+
+## Whether the mesh based mass properties are available.
+def available():
+    return np is not None
+
+## Computes the ten volume integrals of a closed, outward oriented mesh.
+#
+# @param triangles float array of shape (n, 3, 3)
+# @return (1, x, y, z, x^2, y^2, z^2, xy, yz, zx) integrated over the solid
+def volumeIntegrals(triangles):
+    (v0, v1, v2) = (triangles[:, 0], triangles[:, 1], triangles[:, 2])
+    d = np.cross(v1 - v0, v2 - v0)
+    # Eberly's subexpressions, column k is the coordinate k of all triangles
+    temp0 = v0 + v1
+    f1 = temp0 + v2
+    temp1 = v0 * v0
+    temp2 = temp1 + v1 * temp0
+    f2 = temp2 + v2 * f1
+    f3 = v0 * temp1 + v1 * temp2 + v2 * f2
+    g0 = f2 + v0 * (f1 + v0)
+    g1 = f2 + v1 * (f1 + v1)
+    g2 = f2 + v2 * (f1 + v2)
+    (x, y, z) = (0, 1, 2)
+    integrals = np.array([
+        (d[:, x] * f1[:, x]).sum() / 6.0,
+        (d[:, x] * f2[:, x]).sum() / 24.0,
+        (d[:, y] * f2[:, y]).sum() / 24.0,
+        (d[:, z] * f2[:, z]).sum() / 24.0,
+        (d[:, x] * f3[:, x]).sum() / 60.0,
+        (d[:, y] * f3[:, y]).sum() / 60.0,
+        (d[:, z] * f3[:, z]).sum() / 60.0,
+        (d[:, x] * (v0[:, y] * g0[:, x] + v1[:, y] * g1[:, x] + v2[:, y] * g2[:, x])).sum() / 120.0,
+        (d[:, y] * (v0[:, z] * g0[:, y] + v1[:, z] * g1[:, y] + v2[:, z] * g2[:, y])).sum() / 120.0,
+        (d[:, z] * (v0[:, x] * g0[:, z] + v1[:, x] * g1[:, z] + v2[:, x] * g2[:, z])).sum() / 120.0,
+    ])
+    return integrals
+
+## Computes the mass properties of a closed triangle mesh.
+#
+# @param triangles float array of shape (n, 3, 3) in cm
+# @param density the density in kg / cm^3
+# @return (mass, volume, com, inertia) with the inertia (xx, yy, zz, xy, yz, xz) about the com
+def meshMassProperties(triangles, density):
+    integrals = volumeIntegrals(np.asarray(triangles, dtype=np.float64))
+    volume = integrals[0]
+    if volume <= 0:
+        raise ValueError("the mesh is not closed or not oriented outwards, its volume is " + str(volume))
+    com = integrals[1:4] / volume
+    (cx, cy, cz) = com
+    # second moments about the origin, shifted to the center of mass
+    xx = integrals[5] + integrals[6] - volume * (cy * cy + cz * cz)
+    yy = integrals[4] + integrals[6] - volume * (cz * cz + cx * cx)
+    zz = integrals[4] + integrals[5] - volume * (cx * cx + cy * cy)
+    xy = -(integrals[7] - volume * cx * cy)
+    yz = -(integrals[8] - volume * cy * cz)
+    xz = -(integrals[9] - volume * cz * cx)
+    inertia = tuple(float(density * value) for value in (xx, yy, zz, xy, yz, xz))
+    return (float(density * volume), float(volume), tuple(float(c) for c in com), inertia)
+
+## Computes the mass properties of an STL file.
+#
+# @param filename the STL file
+# @param density the density in kg / cm^3
+# @param scale factor converting the STL units to cm, 0.1 for Fusion's mm
+# @return (filename, mass, volume, com, inertia), see meshMassProperties
+def stlMassProperties(filename, density, scale=0.1):
+    triangles = meshes.readStl(filename) * scale
+    return (filename,) + meshMassProperties(triangles, density)
+
+## Density of a link for the mesh based mass properties.
+#
+# The mesh of a link is a single solid, so links made of several materials
+# get the volume weighted mean density of their bodies.
+#
+# @param link the LinkSnapshot
+# @param densities dict of link or material names to densities in kg / cm^3
+# @param default the density if nothing else is known
+# @return the density in kg / cm^3
+def linkDensity(link, densities, default):
+    if link.name in densities:
+        return densities[link.name]
+    mass = 0.0
+    volume = 0.0
+    for body in link.bodies:
+        density = densities.get(body.material)
+        if density is None:
+            if body.volume <= 0 or body.mass <= 0:
+                continue
+            density = body.mass / body.volume
+        mass += density * body.volume
+        volume += body.volume
+    if volume > 0:
+        return mass / volume
+    return default
+
+## Compares two sets of mass properties.
+#
+# @param reference (mass, com, inertia), e.g. from Fusion
+# @param other (mass, com, inertia), e.g. from the mesh
+# @return (relative mass error, COM distance in cm, relative inertia error)
+def compareMassProperties(reference, other):
+    (mass, com, inertia) = reference
+    (otherMass, otherCom, otherInertia) = other
+    massError = abs(otherMass - mass) / mass if mass else float('inf')
+    distance = math.sqrt(sum((a - b) ** 2 for (a, b) in zip(com, otherCom)))
+    norm = math.sqrt(sum(value * value for value in inertia))
+    difference = math.sqrt(sum((a - b) ** 2 for (a, b) in zip(inertia, otherInertia)))
+    inertiaError = difference / norm if norm else float('inf')
+    return (massError, distance, inertiaError)
@@ -0,0 +1,114 @@
+## @package meshes
+# Post-processing of the STL files exported by Fusion 360.
+#
+# Fusion writes one STL per link in millimetres. The post-processor rewrites
+# such a file as compact binary STL, welds duplicate vertices, drops
+# degenerate triangles and bakes the millimetre to metre scale into the
+# vertices, so the SDF can use a unit scale. It needs NumPy and is skipped
+# if NumPy is not installed.
+
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+## Mesh refinement levels, the low level is the mesh of previous versions.
+LOW = "low"
+MEDIUM = "medium"
+HIGH = "high"
+levels = (LOW, MEDIUM, HIGH)
+
+## Returns the STL file of a link at a refinement level.
+#
+# @param name the name of the link
+# @param level one of levels
+# @return the path relative to the export directory
+def meshFile(name, level=LOW):
+    if level == LOW:
+        return 'meshes/CAD/' + name + '.stl'
+    return 'meshes/CAD/' + level + '/' + name + '.stl'
+
+## Whether mesh post-processing is available.
+def available():
+    return np is not None
+
+## Reads an ASCII or binary STL file.
+#
+# @param filename the STL file
+# @return float array of shape (n, 3, 3) with the corners of all triangles
+def readStl(filename):
+    with open(filename, 'rb') as file:
+        data = file.read()
+    if len(data) >= 84:
+        (count,) = struct.unpack('<I', data[80:84])
+        if len(data) == 84 + 50 * count:
+            record = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+            return np.frombuffer(data, dtype=record, count=count, offset=84)['vertices'].astype(np.float64)
+    vertices = [line.split()[1:4] for line in data.decode('ascii', 'replace').splitlines()
+                if line.lstrip().startswith('vertex')]
+    return np.array(vertices, dtype=np.float64).reshape(-1, 3, 3)
+
+## Writes an indexed triangle mesh as binary STL.
+#
+# @param filename the STL file
+# @param vertices float array of shape (m, 3)
+# @param faces int array of shape (n, 3)
+def writeBinaryStl(filename, vertices, faces, header=b'SDFusion'):
+    triangles = vertices[faces]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1
+    record = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+    records = np.zeros(len(faces), dtype=record)
+    records['normal'] = normals / lengths[:, None]
+    records['vertices'] = triangles
+    temp = filename + '.tmp'
+    with open(temp, 'wb') as file:
+        file.write(header[:80].ljust(80, b'\0'))
+        file.write(struct.pack('<I', len(faces)))
+        file.write(records.tobytes())
+    os.replace(temp, filename)
+
+## Merges vertices closer than a tolerance.
+#
+# @param triangles float array of shape (n, 3, 3)
+# @param tolerance the welding distance
+# @return (vertices, faces)
+def weldVertices(triangles, tolerance):
+    corners = triangles.reshape(-1, 3)
+    keys = np.round(corners / tolerance).astype(np.int64)
+    (_, first, inverse) = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    return (corners[first], inverse.reshape(-1, 3))
+
+## Removes triangles that collapsed to a line or a point.
+#
+# @param vertices float array of shape (m, 3)
+# @param faces int array of shape (n, 3)
+# @param tolerance the smallest triangle area that is kept
+# @return the remaining faces
+def removeDegenerateFaces(vertices, faces, tolerance):
+    distinct = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    faces = faces[distinct]
+    triangles = vertices[faces]
+    areas = 0.5 * np.linalg.norm(np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1)
+    return faces[areas > tolerance]
+
+## Rewrites an exported STL file in place.
+#
+# @param filename the STL file exported by Fusion
+# @param scale factor applied to all vertices, 0.001 converts mm to m
+# @param tolerance the welding distance after scaling
+# @return (filename, triangles before, triangles after, vertices after)
+def postProcessStl(filename, scale=0.001, tolerance=1e-6):
+    triangles = readStl(filename) * scale
+    (vertices, faces) = weldVertices(triangles, tolerance)
+    faces = removeDegenerateFaces(vertices, faces, tolerance * tolerance)
+    # drop vertices that are only used by removed triangles
+    (used, faces) = np.unique(faces, return_inverse=True)
+    vertices = vertices[used]
+    faces = faces.reshape(-1, 3)
+    writeBinaryStl(filename, vertices, faces)
+    return (filename, len(triangles), len(faces), len(vertices))
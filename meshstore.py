@@ -0,0 +1,82 @@
+## @package meshstore
+# Content addressed store of mesh files shared by exports.
+#
+# Every distinct mesh is kept once as <store>/<first two hex digits>/<digest>.stl,
+# the digest is the SHA-1 of the file content. Exports hardlink their meshes
+# to the stored file, so identical link geometry of repeated exports and of
+# robot variants takes disk space once. The meshes keep their names in the
+# export directory and the URIs in model.sdf stay valid. Where a hardlink is
+# not possible, e.g. across drives, the export keeps its own copy.
+#
+# Files in the export directory are replaced, never written through, so a
+# stored mesh does not change once it is in the store.
+
+import os
+import shutil
+
+from .writers import hashFile, temporaryName
+
+## Replaces destination by a hardlink to source, or by a copy if that fails.
+#
+# @return True if destination is a hardlink
+def _linkOrCopy(source, destination):
+    temporary = temporaryName(destination)
+    try:
+        os.link(source, temporary)
+        linked = True
+    except OSError:
+        shutil.copyfile(source, temporary)
+        linked = False
+    try:
+        os.replace(temporary, destination)
+    except OSError:
+        os.remove(temporary)
+        raise
+    return linked
+
+class MeshStore:
+    def __init__(self, root):
+        self.root = root
+
+    ## Returns the path of the stored file of a digest.
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest + ".stl")
+
+    ## Whether a mesh with this digest is stored.
+    def contains(self, digest):
+        return os.path.isfile(self.path(digest))
+
+    ## Adds a file to the store.
+    #
+    # @param filename the mesh file
+    # @param digest the SHA-1 of the file if already known
+    # @return (digest, added), added is False if the content was stored before
+    def add(self, filename, digest=None):
+        if digest is None:
+            digest = hashFile(filename)[1]
+        if self.contains(digest):
+            return (digest, False)
+        os.makedirs(os.path.dirname(self.path(digest)), exist_ok=True)
+        _linkOrCopy(filename, self.path(digest))
+        return (digest, True)
+
+    ## Puts the stored mesh of a digest at filename.
+    #
+    # @return True if filename is a hardlink into the store, False if it is a copy
+    def place(self, digest, filename):
+        stored = self.path(digest)
+        if os.path.isfile(filename) and os.path.samefile(stored, filename):
+            return True
+        return _linkOrCopy(stored, filename)
+
+## Moves a mesh into the store and links it back, runs in the workers.
+#
+# @param root the directory of the store
+# @param filename the mesh file
+# @param destination where the mesh is needed, defaults to filename
+# @return (destination, digest, added to the store, destination is a hardlink)
+def storeMesh(root, filename, destination=None):
+    store = MeshStore(root)
+    (digest, added) = store.add(filename)
+    destination = destination or filename
+    return (destination, digest, added, store.place(digest, destination))
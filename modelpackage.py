@@ -0,0 +1,213 @@
+## @package modelpackage
+# Packs an exported model into a single archive for shipping.
+#
+# The archive holds the model files below a directory named after the model,
+# the way Gazebo expects them in its model path, and a manifest.json with the
+# size and SHA-1 of every file. The text outputs are packed while they are
+# written, see writers.OutputFile, and the meshes are copied in chunks at the
+# end, so no file is read back whole. Meshes are compressed with a fast level
+# since binary STL compresses little, XML and the other text files with the
+# best level.
+#
+# zip needs nothing but the standard library. tar.zst needs the zstandard
+# package and compresses the whole archive as one stream. A tar entry needs
+# its size up front, so the text outputs are copied from their temporary
+# files instead of being streamed into the archive.
+
+import hashlib
+import io
+import json
+import os
+import tarfile
+import time
+import zipfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .writers import temporaryName
+
+## No package, only the export directory.
+NONE = ""
+ZIP = "zip"
+TAR_ZST = "tar.zst"
+formats = (NONE, ZIP, TAR_ZST)
+
+## Name of the manifest in the archive.
+manifestName = "manifest.json"
+
+## Compression levels of meshes and of everything else.
+meshLevel = 1
+textLevel = 9
+## Level of the zstd stream of tar.zst archives.
+zstdLevel = 10
+
+## Whether archives of a format can be written.
+def available(format):
+    return format != TAR_ZST or zstandard is not None
+
+## Returns the archive of a model, it is written next to its export directory.
+def packageFilename(fileDir, modelName, format):
+    return os.path.join(os.path.dirname(os.path.abspath(fileDir)), modelName + "." + format)
+
+def _isMesh(path):
+    return path.lower().endswith(".stl")
+
+# hashes and counts the bytes read from a file, for the tar entries
+class _HashingReader:
+    def __init__(self, file):
+        self.file = file
+        self.digest = hashlib.sha1()
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.digest.update(data)
+        self.size += len(data)
+        return data
+
+## Writes the archive of an exported model while its files are written.
+#
+# The archive is written to a temporary file, close() adds the manifest and
+# moves it into place, abort() drops it.
+#
+#     package = PackageWriter(filename, fileDir, modelName, ZIP)
+#     with writers.packing(package):
+#         writers.writeFile(fileDir + '/model.config', text)
+#     package.add(*package.copy(fileDir + '/meshes/CAD/arm.stl'))
+#     package.close()
+class PackageWriter:
+    ## @param filename the archive
+    # @param fileDir the export directory, paths in the archive are relative to it
+    # @param modelName the name of the model, the directory in the archive
+    # @param format ZIP or TAR_ZST
+    def __init__(self, filename, fileDir, modelName, format):
+        self.filename = filename
+        self.fileDir = fileDir
+        self.modelName = modelName
+        self.format = format
+        ## manifest entries of the files packed so far by path
+        self.files = {}
+        self.temporary = temporaryName(filename)
+        self.file = open(self.temporary, 'wb')
+        if format == TAR_ZST:
+            self.stream = zstandard.ZstdCompressor(level=zstdLevel).stream_writer(self.file, closefd=False)
+            self.archive = tarfile.open(fileobj=self.stream, mode='w|')
+        else:
+            self.stream = None
+            self.archive = zipfile.ZipFile(self.file, 'w', zipfile.ZIP_DEFLATED)
+
+    ## Returns the path of a file in the manifest.
+    def path(self, filename):
+        return os.path.relpath(filename, self.fileDir).replace(os.sep, '/')
+
+    def _name(self, filename):
+        return self.modelName + '/' + self.path(filename)
+
+    def _openZip(self, filename):
+        self.archive.compresslevel = meshLevel if _isMesh(filename) else textLevel
+        return self.archive.open(self._name(filename), 'w')
+
+    def _closeZip(self, filename):
+        self.archive.getinfo(self._name(filename)).external_attr = 0o644 << 16
+
+    ## Opens the entry of a file for streaming its content into the archive.
+    #
+    # @return a binary stream, None if the format needs the size of the entry
+    # first, then the file is packed with copy()
+    def open(self, filename):
+        if self.format == TAR_ZST:
+            return None
+        return _ZipEntry(self, filename, self._openZip(filename))
+
+    ## Copies a file into the archive in chunks and hashes it on the way.
+    #
+    # @param filename the file, its path in the archive is relative to fileDir
+    # @param source the file to read, by default filename itself
+    # @return (filename, size in bytes, SHA-1 hex digest), see add
+    def copy(self, filename, source=None):
+        with open(source or filename, 'rb') as file:
+            reader = _HashingReader(file)
+            if self.format == TAR_ZST:
+                info = tarfile.TarInfo(self._name(filename))
+                info.size = os.fstat(file.fileno()).st_size
+                info.mtime = time.time()
+                info.mode = 0o644
+                self.archive.addfile(info, reader)
+            else:
+                with self._openZip(filename) as entry:
+                    for chunk in iter(lambda: reader.read(1 << 20), b''):
+                        entry.write(chunk)
+                self._closeZip(filename)
+        return (filename, reader.size, reader.digest.hexdigest())
+
+    ## Adds a packed file to the manifest.
+    def add(self, filename, size, sha1):
+        path = self.path(filename)
+        self.files[path] = {"path": path, "size": size, "sha1": sha1}
+
+    ## Number of files and their total size in bytes before compression.
+    def totals(self):
+        return (len(self.files), sum(entry["size"] for entry in self.files.values()))
+
+    ## Writes the manifest and moves the archive into place.
+    #
+    # @return (filename, number of files, total size of the files in bytes)
+    def close(self):
+        manifest = {"model": self.modelName, "files": [self.files[path] for path in sorted(self.files)]}
+        data = json.dumps(manifest, indent=1).encode('utf-8')
+        manifestFile = os.path.join(self.fileDir, manifestName)
+        try:
+            if self.format == TAR_ZST:
+                info = tarfile.TarInfo(self._name(manifestFile))
+                info.size = len(data)
+                info.mtime = time.time()
+                info.mode = 0o644
+                self.archive.addfile(info, io.BytesIO(data))
+            else:
+                with self._openZip(manifestFile) as entry:
+                    entry.write(data)
+                self._closeZip(manifestFile)
+            self._close()
+            os.replace(self.temporary, self.filename)
+        except BaseException:
+            self.abort()
+            raise
+        return (self.filename,) + self.totals()
+
+    ## Drops the archive.
+    def abort(self):
+        try:
+            self._close()
+        except Exception:
+            pass
+        if os.path.exists(self.temporary):
+            os.remove(self.temporary)
+
+    def _close(self):
+        self.archive.close()
+        if self.stream is not None:
+            self.stream.close()
+        self.file.close()
+
+# a zip entry that is written while its file is, marks the entry as a plain file when closed
+class _ZipEntry(io.RawIOBase):
+    def __init__(self, package, filename, entry):
+        super().__init__()
+        self.package = package
+        self.filename = filename
+        self.entry = entry
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.entry.write(data)
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            self.entry.close()
+            self.package._closeZip(self.filename)
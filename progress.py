@@ -0,0 +1,89 @@
+## @package progress
+# Throttled progress dialog and event pump of the export.
+#
+# Repainting the progress dialog and adsk.doEvents() take measurable time
+# when they run for every body or joint. Progress coalesces them: the dialog
+# is updated, Fusion processes its events and the cancel button is checked
+# at most once per interval, and always when a task starts or finishes.
+
+import time
+import adsk
+import adsk.core
+
+class Progress:
+    ## Minimum time between two updates of the dialog in seconds.
+    interval = 0.1
+
+    def __init__(self, ui, interval=None):
+        self.ui = ui
+        if interval is not None:
+            self.interval = interval
+        self.dialog = None
+        self.title = ""
+        self.message = ""
+        self.value = 0
+        self.total = 0
+        ## whether the user pressed cancel during the current task
+        self.cancelled = False
+        ## number of times the dialog was updated, for the benchmarks
+        self.updates = 0
+        self.lastUpdate = 0.0
+
+    ## Shows the dialog for a new task.
+    #
+    # @param title the title of the dialog
+    # @param message the message, %v and %m are replaced by the value and the total
+    # @param total the number of steps of the task
+    def start(self, title, message, total):
+        if self.dialog is None:
+            self.dialog = self.ui.createProgressDialog()
+            self.dialog.isBackgroundTranslucent = False
+        self.title = title
+        self.message = message
+        self.value = 0
+        self.total = total
+        self.cancelled = False
+        self.dialog.show(title, message, 0, total, 0)
+        self.update()
+
+    ## Advances the current task.
+    #
+    # @param steps the number of finished steps
+    # @param message the new message, None keeps the current one
+    # @return False if the user cancelled
+    def step(self, steps=1, message=None):
+        self.value += steps
+        if message is not None:
+            self.message = message
+        return self.pump()
+
+    ## Updates the dialog and processes events if the interval has passed.
+    #
+    # @return False if the user cancelled
+    def pump(self):
+        if time.perf_counter() - self.lastUpdate >= self.interval:
+            return self.update()
+        return not self.cancelled
+
+    ## Updates the dialog, processes events and checks for cancellation now.
+    #
+    # @return False if the user cancelled
+    def update(self):
+        if self.dialog is not None and self.dialog.isShowing:
+            self.dialog.progressValue = min(self.value, self.total)
+            self.dialog.message = self.message
+            if self.dialog.wasCancelled:
+                self.cancelled = True
+        adsk.doEvents()
+        self.updates += 1
+        self.lastUpdate = time.perf_counter()
+        return not self.cancelled
+
+    ## Shows the final state of the task and hides the dialog.
+    #
+    # @return False if the user cancelled
+    def finish(self):
+        result = self.update()
+        if self.dialog is not None:
+            self.dialog.hide()
+        return result
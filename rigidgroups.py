@@ -0,0 +1,82 @@
+## @package rigidgroups
+# Membership map between occurrences and the links of the robot.
+#
+# Every rigid group called `EXPORT_<link>` is one link. The map is built once
+# per export and answers which link an occurrence belongs to and which rigid
+# group makes up a link, without scanning all rigid groups again.
+
+from collections import defaultdict
+
+## Strips the EXPORT_ tag of a rigid group name.
+#
+# @param name the name of a rigid group
+# @return the link name or None if the group is not exported
+def linkNameOfRigidGroup(name):
+    if name[:6] != "EXPORT":
+        return None
+    return name[7:]
+
+class RigidGroupIndex:
+    def __init__(self):
+        ## occurrence full path name -> link name
+        self.linkOfOccurrence = {}
+        ## link name -> rigid group
+        self.groupOfLink = {}
+        ## link names in export order
+        self.links = []
+        ## link names defined by more than one EXPORT rigid group
+        self.duplicateLinks = []
+        ## occurrence full path name -> all link names it is a member of,
+        # only for occurrences in more than one EXPORT rigid group, the last
+        # one of them is the link of the occurrence
+        self.sharedOccurrences = {}
+
+    ## Builds the map in a single pass over all rigid groups.
+    #
+    # The first rigid group of a link makes up its meshes, but the occurrences
+    # of every EXPORT rigid group are mapped to its link. An occurrence in
+    # several of them belongs to the last one, like the joint lookup that
+    # scanned all rigid groups did.
+    #
+    # @param rigidGroups an iterable of rigid groups, e.g. rootComp.allRigidGroups
+    def build(self, rigidGroups):
+        memberships = defaultdict(list)
+        for rig in rigidGroups:
+            if rig is None:
+                continue
+            name = linkNameOfRigidGroup(rig.name)
+            if name is None:
+                continue
+            if name in self.groupOfLink:
+                self.duplicateLinks.append(name)
+            else:
+                self.groupOfLink[name] = rig
+                self.links.append(name)
+            for occurrence in rig.occurrences:
+                path = occurrence.fullPathName
+                if name not in memberships[path]:
+                    memberships[path].append(name)
+                self.linkOfOccurrence[path] = name
+        for (path, names) in memberships.items():
+            if len(names) > 1:
+                self.sharedOccurrences[path] = names
+        return self
+
+    ## Returns the link an occurrence belongs to.
+    #
+    # Occurrences nested in a member of a rigid group belong to the same link,
+    # so the lookup walks up the occurrence path until it finds a member.
+    #
+    # @param occurrence an occurrence in the context of the root component
+    # @return the link name or None if the occurrence is not part of any link
+    def linkOf(self, occurrence):
+        path = occurrence.fullPathName
+        while path:
+            if path in self.linkOfOccurrence:
+                return self.linkOfOccurrence[path]
+            path = path.rpartition('+')[0]
+        return None
+
+    ## Returns the rigid group of a link or None.
+    def group(self, name):
+        return self.groupOfLink.get(name)
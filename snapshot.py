@@ -0,0 +1,182 @@
+## @package snapshot
+# Plain data snapshot of everything the emitters need from a design.
+#
+# The Fusion 360 exporter extracts rigid groups, physical properties,
+# transforms, joints, construction points and the exported meshes once into a
+# DesignSnapshot and writes it as snapshot.json next to the model. The engine
+# (see engine.py) runs all emitters against a snapshot without Fusion, so the
+# outputs can be regenerated in batch or on a headless machine.
+#
+# All lengths are in Fusion's internal unit (cm), masses in kg and moments of
+# inertia in kg cm^2. Transforms are 4x4 matrices as 16 values in row-major
+# order, as returned by Matrix3D.asArray().
+
+import json
+import os
+
+from .writers import writeFile
+
+## Name of the snapshot file in the export directory.
+snapshotName = "snapshot.json"
+
+## Version of the snapshot layout.
+snapshotVersion = 1
+
+## Identity transform.
+identity = (1.0, 0.0, 0.0, 0.0,
+            0.0, 1.0, 0.0, 0.0,
+            0.0, 0.0, 1.0, 0.0,
+            0.0, 0.0, 0.0, 1.0)
+
+## Translation part of a row-major 4x4 transform.
+def translation(transform):
+    return (transform[3], transform[7], transform[11])
+
+## Physical properties of one body of a link.
+class BodySnapshot:
+    name = ""
+    material = ""
+    mass = 0.0
+    volume = 0.0
+    com = (0.0, 0.0, 0.0)
+    ## (xx, yy, zz, xy, yz, xz) about the origin of the design
+    inertia = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    def __init__(self, name='', mass=0.0, volume=0.0, com=(0.0, 0.0, 0.0), inertia=(0.0, 0.0, 0.0, 0.0, 0.0, 0.0), material=''):
+        self.name = name
+        self.material = material
+        self.mass = mass
+        self.volume = volume
+        self.com = tuple(com)
+        self.inertia = tuple(inertia)
+
+    def toDict(self):
+        return {"name": self.name, "material": self.material, "mass": self.mass, "volume": self.volume,
+                "com": list(self.com), "inertia": list(self.inertia)}
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(data["name"], data["mass"], data["volume"], data["com"], data["inertia"], data.get("material", ""))
+
+## One link, i.e. one EXPORT rigid group.
+class LinkSnapshot:
+    name = ""
+    ## pose of the link frame, its origin is the center of mass
+    transform = identity
+    mass = 0.0
+    com = (0.0, 0.0, 0.0)
+    ## (xx, yy, zz, xy, yz, xz) in the link frame
+    inertia = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    ## the STL files relative to the export directory by refinement level
+    meshes = {}
+    ## full path names of the member occurrences of the rigid group
+    occurrences = ()
+    bodies = ()
+    def __init__(self, name, transform=identity, mass=0.0, com=(0.0, 0.0, 0.0), inertia=(0.0, 0.0, 0.0, 0.0, 0.0, 0.0), meshes=None, occurrences=(), bodies=()):
+        self.name = name
+        self.transform = tuple(transform)
+        self.mass = mass
+        self.com = tuple(com)
+        self.inertia = tuple(inertia)
+        self.meshes = dict(meshes or {})
+        self.occurrences = list(occurrences)
+        self.bodies = list(bodies)
+
+    def toDict(self):
+        return {"name": self.name, "transform": list(self.transform), "mass": self.mass,
+                "com": list(self.com), "inertia": list(self.inertia), "meshes": self.meshes,
+                "occurrences": self.occurrences, "bodies": [body.toDict() for body in self.bodies]}
+
+    @classmethod
+    def fromDict(cls, data):
+        meshes = data.get("meshes")
+        if meshes is None:
+            # snapshots of older versions have the low level mesh only
+            meshes = {"low": data["mesh"]} if data.get("mesh") else {}
+        return cls(data["name"], data["transform"], data["mass"], data["com"], data["inertia"],
+                   meshes, data.get("occurrences", []),
+                   [BodySnapshot.fromDict(body) for body in data.get("bodies", [])])
+
+## One EXPORT joint between two links.
+class JointSnapshot:
+    name = ""
+    ## "fixed", "revolute", "prismatic", "ball" or "" for unsupported joints
+    type = ""
+    parent = ""
+    child = ""
+    axis = (0.0, 0.0, 0.0)
+    ## joint limits, rad for revolute and cm for prismatic joints
+    lower = 0.0
+    upper = 0.0
+    originOne = (0.0, 0.0, 0.0)
+    originTwo = (0.0, 0.0, 0.0)
+    def __init__(self, name, type, parent, child, axis=(0.0, 0.0, 0.0), lower=0.0, upper=0.0, originOne=(0.0, 0.0, 0.0), originTwo=(0.0, 0.0, 0.0)):
+        self.name = name
+        self.type = type
+        self.parent = parent
+        self.child = child
+        self.axis = tuple(axis)
+        self.lower = lower
+        self.upper = upper
+        self.originOne = tuple(originOne)
+        self.originTwo = tuple(originTwo)
+
+    def toDict(self):
+        return {"name": self.name, "type": self.type, "parent": self.parent, "child": self.child,
+                "axis": list(self.axis), "lower": self.lower, "upper": self.upper,
+                "originOne": list(self.originOne), "originTwo": list(self.originTwo)}
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(data["name"], data["type"], data["parent"], data["child"], data["axis"],
+                   data["lower"], data["upper"], data["originOne"], data["originTwo"])
+
+class DesignSnapshot:
+    def __init__(self, modelName=''):
+        self.modelName = modelName
+        ## the export settings, see ModelEmitter.settingNames
+        self.settings = {}
+        ## link name -> LinkSnapshot, in export order
+        self.links = {}
+        self.joints = []
+        ## (name, (x, y, z)) of all annotated construction points, in design order
+        self.points = []
+        ## directory the snapshot was loaded from, meshes are relative to it
+        self.sourceDir = ''
+
+    def toDict(self):
+        return {"version": snapshotVersion, "modelName": self.modelName, "settings": self.settings,
+                "links": [link.toDict() for link in self.links.values()],
+                "joints": [joint.toDict() for joint in self.joints],
+                "points": [[name, list(position)] for (name, position) in self.points]}
+
+    @classmethod
+    def fromDict(cls, data):
+        if data.get("version") != snapshotVersion:
+            raise ValueError("unsupported snapshot version " + str(data.get("version")))
+        snapshot = cls(data["modelName"])
+        snapshot.settings = dict(data.get("settings", {}))
+        for link in data["links"]:
+            snapshot.links[link["name"]] = LinkSnapshot.fromDict(link)
+        snapshot.joints = [JointSnapshot.fromDict(joint) for joint in data["joints"]]
+        snapshot.points = [(name, tuple(position)) for (name, position) in data["points"]]
+        return snapshot
+
+    ## Reads a snapshot.
+    #
+    # @param filename a snapshot file or an export directory containing one
+    @classmethod
+    def load(cls, filename):
+        if os.path.isdir(filename):
+            filename = os.path.join(filename, snapshotName)
+        with open(filename, 'r') as file:
+            snapshot = cls.fromDict(json.load(file))
+        snapshot.sourceDir = os.path.dirname(os.path.abspath(filename))
+        return snapshot
+
+## Writes a snapshot given as dict, see DesignSnapshot.toDict.
+#
+# @param filename the output file
+# @param data the snapshot as dict
+# @return (filename, True if the file changed), see writers.writeFile
+def writeSnapshot(filename, data):
+    return writeFile(filename, json.dumps(data, indent=1))
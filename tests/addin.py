@@ -0,0 +1,21 @@
+## @package addin
+# Imports the modules of the add-in for the tests.
+#
+# The add-in is a package named after its directory and imports adsk, the
+# tests run it against the stand-in in benchmark/adsk like the benchmark.
+
+import importlib
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the stand-in must be found before the add-in imports adsk
+sys.path.insert(0, os.path.join(root, "benchmark"))
+sys.path.insert(0, os.path.dirname(root))
+
+## Name of the add-in package.
+package = os.path.basename(root)
+
+## Imports a module of the add-in, e.g. load("transaction").
+def load(name):
+    return importlib.import_module(package + "." + name)
@@ -0,0 +1,50 @@
+## @package shapes
+# Closed triangle meshes with known mass properties for the tests.
+
+import struct
+
+## The 12 outward oriented triangles of an axis-aligned box.
+#
+# @param size the (x, y, z) edge lengths
+# @param center the (x, y, z) center
+# @return list of triangles, each a list of three (x, y, z) corners
+def boxTriangles(size, center=(0.0, 0.0, 0.0)):
+    half = [s / 2.0 for s in size]
+    triangles = []
+    for axis in range(3):
+        (u, v) = ((axis + 1) % 3, (axis + 2) % 3)
+        for sign in (-1.0, 1.0):
+            corners = []
+            for (du, dv) in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+                point = [0.0, 0.0, 0.0]
+                point[axis] = center[axis] + sign * half[axis]
+                point[u] = center[u] + du * half[u]
+                point[v] = center[v] + dv * half[v]
+                corners.append(tuple(point))
+            if sign < 0:
+                corners.reverse()
+            triangles.append([corners[0], corners[1], corners[2]])
+            triangles.append([corners[0], corners[2], corners[3]])
+    return triangles
+
+## Writes triangles as binary STL.
+def writeBinaryStl(filename, triangles):
+    with open(filename, 'wb') as file:
+        file.write(b'test'.ljust(80, b' '))
+        file.write(struct.pack('<I', len(triangles)))
+        for triangle in triangles:
+            file.write(struct.pack('<12fH', 0.0, 0.0, 0.0, *[c for corner in triangle for c in corner], 0))
+
+## Writes triangles as ASCII STL.
+def writeAsciiStl(filename, triangles):
+    lines = ["solid test"]
+    for triangle in triangles:
+        lines.append(" facet normal 0 0 0")
+        lines.append("  outer loop")
+        for corner in triangle:
+            lines.append("   vertex %r %r %r" % corner)
+        lines.append("  endloop")
+        lines.append(" endfacet")
+    lines.append("endsolid test")
+    with open(filename, 'w') as file:
+        file.write("\n".join(lines) + "\n")
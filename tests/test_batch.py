@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+
+import pytest
+
+from addin import load
+from design import generateDesign
+
+batch = load("batch")
+run = load("benchmark.run")
+
+def exportTo(fileDir, links):
+    generateDesign(links, viaPoints=2 * links)
+    run.exportDesign(fileDir, {"exportViaPoints": True, "workerProcesses": 0})
+    return fileDir
+
+def test_parse_setting():
+    assert batch.parseSetting("exportCASPR=true") == ("exportCASPR", True)
+    assert batch.parseSetting('densities={"link0": 0.0027}') == ("densities", {"link0": 0.0027})
+    assert batch.parseSetting("visualMesh=high") == ("visualMesh", "high")
+    for text in ("exportCASPR", "=true"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            batch.parseSetting(text)
+
+def test_output_directories_are_unique(tmp_path):
+    sources = []
+    for path in ("a/robot", "b/robot", "c/arm", "d/robot"):
+        os.makedirs(str(tmp_path / path))
+        sources.append(str(tmp_path / path))
+    # a snapshot file is named after its directory
+    sources[1] = os.path.join(sources[1], "snapshot.json")
+    names = [os.path.basename(path) for path in batch.outputDirectories(sources, str(tmp_path / "models"))]
+    assert names == ["robot", "robot_2", "arm", "robot_3"]
+
+def test_batch_in_this_process(tmp_path):
+    sources = [exportTo(str(tmp_path / "arm"), 3), exportTo(str(tmp_path / "leg"), 4),
+               str(tmp_path / "missing")]
+    summary = batch.runBatch(sources, str(tmp_path / "models"), {"prettyXml": False}, jobs=1)
+    (arm, leg, missing) = summary["designs"]
+    assert (arm["links"], leg["links"]) == (3, 4)
+    assert not arm["failed"] and not arm["errors"]
+    assert "model.sdf" in arm["changed"]
+    assert missing["failed"] and missing["errors"]
+    with open(os.path.join(arm["fileDir"], "model.sdf")) as file:
+        assert "\n" not in file.read().strip()
+    with open(str(tmp_path / "models" / batch.summaryName)) as file:
+        assert json.load(file)["settings"] == {"prettyXml": False}
+    table = batch.formatSummary(summary).splitlines()
+    assert table[1].split()[-1] == "ok" and table[3].split()[-1] == "FAILED"
+    assert table[4].startswith("3 designs, 1 failed")
+
+def test_main_in_a_process_pool(tmp_path, capsys):
+    sources = [exportTo(str(tmp_path / "arm"), 3), exportTo(str(tmp_path / "leg"), 4)]
+    output = str(tmp_path / "models")
+    assert batch.main(sources + ["--output", output, "--jobs", "2", "--set", "exportCASPR=true"]) == 0
+    assert "2 designs, 0 failed" in capsys.readouterr().out
+    for name in ("arm", "leg"):
+        assert os.path.isfile(os.path.join(output, name, "model.sdf"))
+    assert batch.main([str(tmp_path / "missing"), "--output", output, "--jobs", "1"]) == 1
@@ -0,0 +1,107 @@
+import math
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from addin import load
+from design import generateDesign
+from shapes import boxTriangles, writeBinaryStl
+
+collision = load("collision")
+meshes = load("meshes")
+run = load("benchmark.run")
+
+def test_hull_of_a_cube_with_inner_points():
+    rng = np.random.default_rng(0)
+    corners = np.array([(x, y, z) for x in (0.0, 2.0) for y in (0.0, 3.0) for z in (0.0, 4.0)])
+    inner = rng.uniform(0.1, 1.9, (50, 3)) * np.array([1.0, 1.5, 2.0])
+    (vertices, faces) = collision.convexHull(np.vstack([inner, corners]))
+    assert len(vertices) == 8
+    assert len(faces) == 12
+    assert math.isclose(collision.meshVolume(vertices, faces), 24.0)
+
+def test_hull_of_a_point_cloud_on_a_sphere():
+    rng = np.random.default_rng(1)
+    points = rng.normal(size=(400, 3))
+    points /= np.linalg.norm(points, axis=1)[:, None]
+    (vertices, faces) = collision.convexHull(points)
+    assert len(vertices) == 400
+    # a closed triangulated surface of genus 0
+    assert len(faces) == 2 * len(vertices) - 4
+    volume = collision.meshVolume(vertices, faces)
+    assert 0.9 * 4.0 / 3.0 * math.pi < volume < 4.0 / 3.0 * math.pi
+
+def test_degenerate_point_sets():
+    with pytest.raises(ValueError):
+        collision.convexHull([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)])
+    with pytest.raises(ValueError):
+        collision.convexHull([(x, y, 0.0) for x in range(3) for y in range(3)])
+
+def test_rotation_to_rpy():
+    (roll, pitch, yaw) = (0.1, -0.2, 0.3)
+    (cr, sr, cp, sp, cy, sy) = (math.cos(roll), math.sin(roll), math.cos(pitch), math.sin(pitch), math.cos(yaw), math.sin(yaw))
+    rotation = np.array([[cy, -sy, 0.0], [sy, cy, 0.0], [0.0, 0.0, 1.0]]) @ \
+               np.array([[cp, 0.0, sp], [0.0, 1.0, 0.0], [-sp, 0.0, cp]]) @ \
+               np.array([[1.0, 0.0, 0.0], [0.0, cr, -sr], [0.0, sr, cr]])
+    assert np.allclose(collision.rotationToRPY(rotation), (roll, pitch, yaw))
+
+def test_box_is_fitted_to_a_box(tmp_path):
+    filename = str(tmp_path / "link.stl")
+    writeBinaryStl(filename, boxTriangles((40.0, 20.0, 10.0), (100.0, 0.0, 0.0)))
+    hull = str(tmp_path / "collision" / "link.stl")
+    result = collision.simplifyStl(filename, collision.AUTO, 0.001, 0.15, hull)
+    assert result["shape"] == collision.BOX
+    assert result["error"] < 1e-9
+    assert np.allclose(sorted(result["size"]), (0.01, 0.02, 0.04))
+    assert np.allclose(result["pose"][:3], (0.1, 0.0, 0.0))
+    assert not os.path.exists(hull)
+
+def test_hull_when_no_primitive_fits(tmp_path):
+    filename = str(tmp_path / "link.stl")
+    # an L of two boxes fills less than 85 % of every primitive
+    writeBinaryStl(filename, boxTriangles((40.0, 10.0, 10.0), (20.0, 5.0, 5.0)) + boxTriangles((10.0, 40.0, 10.0), (5.0, 20.0, 5.0)))
+    hull = str(tmp_path / "collision" / "link.stl")
+    result = collision.simplifyStl(filename, collision.AUTO, 0.001, 0.15, hull)
+    assert result["shape"] == collision.HULL
+    assert result["file"] == hull
+    triangles = meshes.readStl(hull)
+    assert len(triangles) == result["faces"]
+
+def test_forced_shapes(tmp_path):
+    filename = str(tmp_path / "link.stl")
+    writeBinaryStl(filename, boxTriangles((10.0, 10.0, 10.0)))
+    hull = str(tmp_path / "collision" / "link.stl")
+    assert collision.simplifyStl(filename, collision.MESH, 0.001, 0.15, hull) == {"shape": collision.MESH}
+    sphere = collision.simplifyStl(filename, collision.SPHERE, 0.001, 0.15, hull)
+    assert math.isclose(sphere["radius"], 0.005 * math.sqrt(3.0))
+    cylinder = collision.simplifyStl(filename, collision.CYLINDER, 0.001, 0.15, hull)
+    assert math.isclose(cylinder["radius"], 0.005 * math.sqrt(2.0))
+    assert math.isclose(cylinder["length"], 0.01)
+
+def collisionSizes(fileDir):
+    sizes = {}
+    for link in ET.parse(os.path.join(fileDir, "model.sdf")).getroot().iter("link"):
+        box = link.find("collision/geometry/box/size")
+        sizes[link.get("name")] = [float(v) for v in box.text.split()]
+    return sizes
+
+def test_links_falling_back_to_millimetres_are_scaled(tmp_path, monkeypatch):
+    settings = {"postProcessMeshes": True, "simplifyCollisions": True, "workerProcesses": 0}
+    generateDesign(3, bodiesPerLink=1)
+    run.exportDesign(str(tmp_path / "processed"), settings)
+    postProcessStl = meshes.postProcessStl
+    def failOnLink1(filename, *args):
+        if os.path.basename(filename) == "link1.stl":
+            raise ValueError("broken mesh")
+        return postProcessStl(filename, *args)
+    monkeypatch.setattr(meshes, "postProcessStl", failOnLink1)
+    generateDesign(3, bodiesPerLink=1)
+    run.exportDesign(str(tmp_path / "fallback"), settings)
+    processed = collisionSizes(str(tmp_path / "processed"))
+    fallback = collisionSizes(str(tmp_path / "fallback"))
+    assert sorted(fallback) == ["link0", "link1", "link2"]
+    for name in processed:
+        assert np.allclose(fallback[name], processed[name]), name
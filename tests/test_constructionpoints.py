@@ -0,0 +1,50 @@
+from addin import load
+
+constructionpoints = load("constructionpoints")
+parse = constructionpoints.parseConstructionPointName
+
+def test_center_of_mass():
+    assert parse("COM_upper_arm") == ("COM", "upper_arm", '', '', '')
+    assert parse("COM") is None
+
+def test_via_points():
+    # the EXPORT tag of the rigid group is not part of the link name
+    assert parse("VP_motor3_EXPORT_upper_arm_12") == ("VP", "upper_arm", "3", "12", '')
+    assert parse("VP_motor0_EXPORT_hand_1") == ("VP", "hand", "0", "1", '')
+    assert parse("VP_motor3_hand") is None
+    assert parse("VP_muscle3_hand_1") is None
+
+def test_end_effectors_and_markers():
+    assert parse("EE_left_hand") == ("EE", "left_hand", '', '', '')
+    assert parse("VM_head") == ("VM", "head", '', '', '')
+    assert parse("EE") is None
+
+def test_lighthouse_sensors():
+    assert parse("LS_upper_arm_7") == ("LS", "upper_arm", '', '7', '')
+    assert parse("LS_7") is None
+
+def test_collision_overrides():
+    assert parse("COL_box_upper_arm") == ("COL", "upper_arm", '', '', "box")
+    assert parse("COL_box") is None
+
+def test_other_names():
+    assert parse("Point1") is None
+    assert parse("joint_origin") is None
+
+def test_index_groups_by_prefix_link_and_motor():
+    index = constructionpoints.ConstructionPointIndex()
+    assert index.add("VP_motor1_EXPORT_hand_0", (0.0, 0.0, 0.0)).motor == "1"
+    index.add("VP_motor2_EXPORT_hand_0", (1.0, 0.0, 0.0))
+    index.add("VP_motor1_EXPORT_arm_1", (2.0, 0.0, 0.0))
+    index.add("COM_hand", (3.0, 0.0, 0.0))
+    index.add("COM_hand", (4.0, 0.0, 0.0))
+    assert index.add("Point1", (5.0, 0.0, 0.0)) is None
+    assert index.add("LS_7", (6.0, 0.0, 0.0)) is None
+    assert index.malformed == ["LS_7"]
+    assert [entry.position for entry in index.get("COM", "hand")] == [(3.0, 0.0, 0.0), (4.0, 0.0, 0.0)]
+    assert index.get("COM", "arm") == []
+    assert [entry.name for entry in index.all("VP")] == ["VP_motor1_EXPORT_hand_0", "VP_motor2_EXPORT_hand_0", "VP_motor1_EXPORT_arm_1"]
+    motors = index.byMotor("VP")
+    assert sorted(motors) == ["1", "2"]
+    assert [entry.link for entry in motors["1"]] == ["hand", "arm"]
+    assert len(index.entries) == 5
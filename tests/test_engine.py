@@ -0,0 +1,47 @@
+import os
+
+from addin import load
+from design import generateDesign
+
+engine = load("engine")
+snapshot = load("snapshot")
+run = load("benchmark.run")
+
+## The outputs that are the same whether they come from Fusion or from a snapshot.
+outputs = ("model.sdf", "model.config", "cardsflow.xml", "caspr/robot_cables.xml", "caspr/robot_bodies.xml", "snapshot.json")
+
+def read(fileDir, name):
+    with open(os.path.join(fileDir, name), 'rb') as file:
+        return file.read()
+
+def exportTo(fileDir, links=6):
+    generateDesign(links, viaPoints=4 * links, nestedParts=True)
+    run.exportDesign(str(fileDir), {"exportViaPoints": True, "exportCASPR": True, "workerProcesses": 0})
+
+def test_snapshot_round_trip(tmp_path):
+    exportTo(tmp_path)
+    loaded = snapshot.DesignSnapshot.load(str(tmp_path))
+    assert loaded.sourceDir == str(tmp_path)
+    assert len(loaded.links) == 6 and len(loaded.joints) == 5
+    again = snapshot.DesignSnapshot.fromDict(loaded.toDict())
+    assert again.toDict() == loaded.toDict()
+
+def test_emitter_reproduces_the_export(tmp_path):
+    source = tmp_path / "fusion"
+    exportTo(source)
+    emitter = engine.ModelEmitter(snapshot.DesignSnapshot.load(str(source)))
+    emitter.workerProcesses = 0
+    target = tmp_path / "emitted"
+    assert emitter.run(str(target)) == []
+    for name in outputs:
+        assert read(str(target), name) == read(str(source), name), name
+    for link in emitter.snapshot.links.values():
+        for mesh in link.meshes.values():
+            assert read(str(target), mesh) == read(str(source), mesh)
+
+def test_emitting_again_changes_nothing(tmp_path):
+    exportTo(tmp_path)
+    emitter = engine.ModelEmitter(snapshot.DesignSnapshot.load(str(tmp_path)))
+    emitter.workerProcesses = 0
+    assert emitter.run(str(tmp_path)) == []
+    assert emitter.changedOutputs == []
@@ -0,0 +1,56 @@
+from addin import load
+
+import adsk.core
+from design import generateDesign
+
+exportcache = load("exportcache")
+
+def groupOccurrences(design, name):
+    return list(design.rootComponent.rigidGroups.itemByName("EXPORT_" + name).occurrences)
+
+def test_fingerprint_is_stable():
+    occurrences = groupOccurrences(generateDesign(3), "link1")
+    first = exportcache.fingerprintRigidGroup(occurrences, "low", [(1.0, 2.0, 3.0)])
+    assert first == exportcache.fingerprintRigidGroup(occurrences, "low", [(1.0, 2.0, 3.0)])
+    assert first != exportcache.fingerprintRigidGroup(occurrences, "high", [(1.0, 2.0, 3.0)])
+
+def test_fingerprint_does_not_depend_on_entity_tokens():
+    # the same design opened again gets new entity tokens
+    first = generateDesign(3)
+    second = generateDesign(3)
+    tokens = [groupOccurrences(design, "link0")[0].bRepBodies[0].entityToken for design in (first, second)]
+    assert tokens[0] != tokens[1]
+    for name in ("link0", "link1", "link2"):
+        assert exportcache.fingerprintRigidGroup(groupOccurrences(first, name)) == exportcache.fingerprintRigidGroup(groupOccurrences(second, name))
+
+def test_fingerprint_covers_geometry():
+    occurrences = groupOccurrences(generateDesign(3), "link1")
+    before = exportcache.fingerprintRigidGroup(occurrences)
+    body = occurrences[0].component.bRepBodies[0]
+    body.center = (body.center[0] + 0.1,) + body.center[1:]
+    assert exportcache.fingerprintRigidGroup(occurrences) != before
+
+def test_fingerprint_covers_materials():
+    occurrences = groupOccurrences(generateDesign(3), "link1")
+    before = exportcache.fingerprintRigidGroup(occurrences)
+    body = occurrences[0].component.bRepBodies[0]
+    body.density = 0.00785 if body.density != 0.00785 else 0.0027
+    assert exportcache.fingerprintRigidGroup(occurrences) != before
+    # a custom material keeps its name, its density still counts
+    body.density = 0.001
+    custom = exportcache.fingerprintRigidGroup(occurrences)
+    body.density = 0.002
+    assert exportcache.fingerprintRigidGroup(occurrences) != custom
+
+def test_fingerprint_covers_com_points():
+    occurrences = groupOccurrences(generateDesign(3), "link1")
+    without = exportcache.fingerprintRigidGroup(occurrences)
+    com = exportcache.fingerprintRigidGroup(occurrences, comPoints=[(1.0, 2.0, 3.0)])
+    moved = exportcache.fingerprintRigidGroup(occurrences, comPoints=[(1.0, 2.0, 3.5)])
+    assert len({without, com, moved}) == 3
+
+def test_fingerprint_covers_transforms():
+    occurrences = groupOccurrences(generateDesign(3), "link1")
+    before = exportcache.fingerprintRigidGroup(occurrences)
+    occurrences[0].transform.translation = adsk.core.Vector3D.create(1.0, 2.0, 3.0)
+    assert exportcache.fingerprintRigidGroup(occurrences) != before
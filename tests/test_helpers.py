@@ -0,0 +1,67 @@
+import io
+import math
+import xml.etree.ElementTree as ET
+
+from addin import load
+
+helpers = load("helpers")
+snapshot = load("snapshot")
+
+def sampleTree():
+    root = ET.Element("sdf", version="1.6")
+    model = ET.SubElement(root, "model", name="robot & <friends>")
+    link = ET.SubElement(model, "link", name='say "hi"')
+    ET.SubElement(link, "pose").text = "0.1 0.2 0.3 0 0 0"
+    ET.SubElement(link, "empty")
+    inertial = ET.SubElement(link, "inertial")
+    ET.SubElement(inertial, "mass").text = "1 < 2 && 3 > 2"
+    mixed = ET.SubElement(model, "plugin", filename="libplugin.so")
+    mixed.text = "leading"
+    child = ET.SubElement(mixed, "child")
+    child.tail = "trailing"
+    ET.SubElement(mixed, "other").text = "value"
+    return root
+
+def stream(elem, **options):
+    output = io.StringIO()
+    helpers.writeXmlStream(output, elem, **options)
+    return output.getvalue()
+
+def test_stream_matches_minidom():
+    root = sampleTree()
+    assert stream(root) == helpers.prettifyMinidom(root)
+    assert helpers.prettify(root) == helpers.prettifyMinidom(root)
+
+def test_stream_matches_minidom_for_single_elements():
+    for elem in (ET.Element("empty"), ET.Element("text", a="1")):
+        assert stream(elem) == helpers.prettifyMinidom(elem)
+    elem = ET.Element("text")
+    elem.text = "value"
+    assert stream(elem) == helpers.prettifyMinidom(elem)
+
+def test_compact_stream_parses_to_the_same_tree():
+    root = sampleTree()
+    compact = stream(root, indent='', newl='', declaration=False)
+    assert "\n" not in compact
+    assert ET.tostring(ET.fromstring(compact)) == ET.tostring(root)
+
+def test_combine_mass_properties_of_two_points():
+    bodies = [snapshot.BodySnapshot("a", 1.0, 1.0, (0.0, 0.0, 0.0), (0.0,) * 6),
+              snapshot.BodySnapshot("b", 3.0, 1.0, (4.0, 0.0, 0.0), (0.0, 48.0, 48.0, 0.0, 0.0, 0.0))]
+    (mass, com, inertia) = helpers.combineMassProperties(bodies)
+    assert mass == 4.0
+    assert com == (3.0, 0.0, 0.0)
+    assert inertia == (0.0, 48.0, 48.0, 0.0, 0.0, 0.0)
+    # about the center of mass: 1 kg at 3 cm and 3 kg at 1 cm
+    local = helpers.inertiaToLinkFrame(com, mass, inertia)
+    assert [round(value, 12) for value in local] == [0.0, 12.0, 12.0, 0.0, 0.0, 0.0]
+
+def test_inertia_to_link_frame_products():
+    (mass, com) = (2.0, (1.0, 2.0, 3.0))
+    # a point mass seen from the origin
+    (x, y, z) = com
+    world = (mass * (y * y + z * z), mass * (x * x + z * z), mass * (x * x + y * y), -mass * x * y, -mass * y * z, -mass * x * z)
+    assert all(math.isclose(value, 0.0, abs_tol=1e-12) for value in helpers.inertiaToLinkFrame(com, mass, world))
+
+def test_combine_without_mass():
+    assert helpers.combineMassProperties([]) == (0.0, (0.0, 0.0, 0.0), (0.0,) * 6)
@@ -0,0 +1,43 @@
+from addin import load
+
+kinematics = load("kinematics")
+snapshot = load("snapshot")
+
+def joint(name, parent, child):
+    return snapshot.JointSnapshot(name, "revolute", parent, child)
+
+def tree(links, joints):
+    return kinematics.KinematicTree(links, joints)
+
+def test_order_puts_parents_first():
+    joints = [joint("j3", "b", "d"), joint("j1", "a", "b"), joint("j2", "a", "c"), joint("j4", "c", "e")]
+    result = tree(["d", "e", "c", "b", "a"], joints)
+    assert [result.names[i] for i in result.order] == ["a", "b", "d", "c", "e"]
+    assert [j.name for j in result.jointOrder()] == ["j1", "j3", "j2", "j4"]
+    assert result.problems() == []
+
+def test_subtrees_are_slices_of_the_order():
+    joints = [joint("j1", "a", "b"), joint("j2", "a", "c"), joint("j3", "b", "d"), joint("j4", "d", "f")]
+    result = tree(["a", "b", "c", "d", "e", "f"], joints)
+    assert result.subtree("a") == ["a", "b", "d", "f", "c"]
+    assert result.subtree("b") == ["b", "d", "f"]
+    assert result.subtree("c") == ["c"]
+    assert result.subtree("e") == ["e"]
+    assert result.orphans() == ["e"]
+
+def test_joints_outside_of_the_tree_come_last():
+    joints = [joint("j1", "a", "b"), joint("j2", "b", "c"), joint("second", "a", "c"),
+              joint("unknown", "a", "x"), joint("cycle", "c", "a")]
+    result = tree(["a", "b", "c"], joints)
+    assert result.cycles == ["cycle"]
+    assert result.extraParents == ["second"]
+    assert result.unknown == ["unknown"]
+    names = [j.name for j in result.jointOrder()]
+    assert names == ["j1", "j2", "second", "unknown", "cycle"]
+    problems = result.problems()
+    assert any("second" in problem and "second parent" in problem for problem in problems)
+    assert any("cycle" in problem and "loop" in problem for problem in problems)
+    assert any("unknown" in problem for problem in problems)
+
+def test_single_link_is_no_orphan():
+    assert tree(["a"], []).orphans() == []
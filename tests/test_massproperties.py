@@ -0,0 +1,112 @@
+import math
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from addin import load
+from design import generateDesign
+from shapes import boxTriangles, writeBinaryStl
+
+massproperties = load("massproperties")
+snapshot = load("snapshot")
+run = load("benchmark.run")
+
+def test_box_matches_the_closed_form():
+    (a, b, c) = (2.0, 3.0, 5.0)
+    density = 0.0027
+    (mass, volume, com, inertia) = massproperties.meshMassProperties(boxTriangles((a, b, c), (1.0, -2.0, 3.0)), density)
+    assert math.isclose(volume, a * b * c)
+    assert math.isclose(mass, density * a * b * c)
+    assert np.allclose(com, (1.0, -2.0, 3.0))
+    expected = (mass * (b * b + c * c) / 12, mass * (a * a + c * c) / 12, mass * (a * a + b * b) / 12, 0.0, 0.0, 0.0)
+    assert np.allclose(inertia, expected, atol=1e-12)
+
+def test_rotated_box_has_products_of_inertia():
+    # a 2 x 1 x 1 box rotated by 45 degrees about z
+    rotation = np.array([[1.0, -1.0, 0.0], [1.0, 1.0, 0.0], [0.0, 0.0, math.sqrt(2.0)]]) / math.sqrt(2.0)
+    triangles = np.array(boxTriangles((2.0, 1.0, 1.0))) @ rotation.T
+    (mass, _, com, inertia) = massproperties.meshMassProperties(triangles, 1.0)
+    local = np.diag([(1 + 1) / 12.0, (4 + 1) / 12.0, (4 + 1) / 12.0]) * mass
+    world = rotation @ local @ rotation.T
+    (xx, yy, zz, xy, yz, xz) = inertia
+    assert np.allclose(com, 0.0, atol=1e-12)
+    assert np.allclose((xx, yy, zz), np.diag(world))
+    # tensor entries, the products of inertia carry the minus sign
+    assert np.allclose((xy, yz, xz), (world[0, 1], world[1, 2], world[0, 2]))
+
+def test_inside_out_mesh_is_rejected():
+    triangles = [list(reversed(triangle)) for triangle in boxTriangles((1.0, 1.0, 1.0))]
+    with pytest.raises(ValueError):
+        massproperties.meshMassProperties(triangles, 1.0)
+
+def test_stl_in_millimetres(tmp_path):
+    filename = str(tmp_path / "link.stl")
+    writeBinaryStl(filename, boxTriangles((10.0, 20.0, 30.0)))
+    (_, mass, volume, com, inertia) = massproperties.stlMassProperties(filename, 0.001, 0.1)
+    assert math.isclose(volume, 6.0, rel_tol=1e-6)
+    assert math.isclose(mass, 0.006, rel_tol=1e-6)
+
+def test_link_density():
+    bodies = [snapshot.BodySnapshot("a", 2.0, 1.0, material="Steel"),
+              snapshot.BodySnapshot("b", 1.0, 1.0, material="PLA"),
+              snapshot.BodySnapshot("c", 0.0, 0.0, material="Air")]
+    link = snapshot.LinkSnapshot("arm", bodies=bodies)
+    assert massproperties.linkDensity(link, {}, 7.0) == 1.5
+    assert massproperties.linkDensity(link, {"PLA": 3.0}, 7.0) == 2.5
+    assert massproperties.linkDensity(link, {"arm": 4.0}, 7.0) == 4.0
+    assert massproperties.linkDensity(snapshot.LinkSnapshot("empty"), {}, 7.0) == 7.0
+
+def test_compare_mass_properties():
+    reference = (2.0, (0.0, 0.0, 0.0), (3.0, 4.0, 0.0, 0.0, 0.0, 0.0))
+    (massError, distance, inertiaError) = massproperties.compareMassProperties(reference, (2.2, (0.0, 3.0, 4.0), (3.0, 4.5, 0.0, 0.0, 0.0, 0.0)))
+    assert math.isclose(massError, 0.1)
+    assert math.isclose(distance, 5.0)
+    assert math.isclose(inertiaError, 0.1)
+
+def exportInMeshMode(fileDir):
+    generateDesign(4, viaPoints=12, sensors=8)
+    run.exportDesign(fileDir, {"massProperties": massproperties.MESH, "exportViaPoints": True, "exportCASPR": True,
+                               "exportLighthouseSensors": True, "workerProcesses": 0})
+    return snapshot.DesignSnapshot.load(fileDir)
+
+def test_mesh_mode_outputs_agree(tmp_path):
+    fileDir = str(tmp_path)
+    design = exportInMeshMode(fileDir)
+    links = design.links
+    # the bodies keep the mass measured by Fusion
+    assert any(not math.isclose(link.mass, sum(body.mass for body in link.bodies)) for link in links.values())
+    # the SDF inertial is placed relative to the link frame
+    for element in ET.parse(os.path.join(fileDir, "model.sdf")).getroot().iter("link"):
+        link = links[element.get("name")]
+        assert float(element.find("inertial/mass").text) == link.mass
+        pose = [float(v) for v in element.find("inertial/pose").text.split()[:3]]
+        origin = snapshot.translation(link.transform)
+        assert np.allclose(pose, [0.01 * (c - o) for (c, o) in zip(link.com, origin)])
+    # the CASPR bodies are placed relative to the joint origin
+    origins = {joint.child: joint.originOne for joint in design.joints}
+    with open(os.path.join(fileDir, "caspr", "robot_bodies.xml")) as file:
+        # skip the header in front of the XML declaration
+        bodies = ET.fromstring(file.read().split("\n", 2)[2]).iter("link_rigid")
+    names = []
+    for element in bodies:
+        link = links[element.get("name")]
+        names.append(link.name)
+        assert float(element.find("physical/mass").text) == link.mass
+        com = [float(v) for v in element.find("physical/com_location").text.split()]
+        assert np.allclose(com, [(c - o) / 100.0 for (c, o) in zip(link.com, origins[link.name])])
+    assert len(names) == 3
+    # the lighthouse sensors are relative to the COM
+    sensors = {}
+    for (name, position) in design.points:
+        if name.startswith("LS_"):
+            sensors.setdefault(name.split("_")[1], []).append(position)
+    assert sensors
+    for (name, positions) in sensors.items():
+        with open(os.path.join(fileDir, "lighthouseSensors", name + ".yaml")) as file:
+            rows = [line[3:-2].split(", ") for line in file if line.startswith("- [")]
+        com = links[name].com
+        expected = [[0.01 * (p - c) for (p, c) in zip(position, com)] for position in positions]
+        assert np.allclose([[float(v) for v in row[1:]] for row in rows], expected)
@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from addin import load
+from shapes import boxTriangles, writeAsciiStl, writeBinaryStl
+
+meshes = load("meshes")
+
+def test_read_binary_and_ascii(tmp_path):
+    triangles = boxTriangles((10.0, 20.0, 30.0), (5.0, 0.0, -5.0))
+    writeBinaryStl(str(tmp_path / "binary.stl"), triangles)
+    writeAsciiStl(str(tmp_path / "ascii.stl"), triangles)
+    binary = meshes.readStl(str(tmp_path / "binary.stl"))
+    ascii = meshes.readStl(str(tmp_path / "ascii.stl"))
+    assert binary.shape == (12, 3, 3)
+    assert np.allclose(binary, np.array(triangles))
+    assert np.allclose(ascii, binary)
+
+def test_weld_and_remove_degenerate_faces():
+    triangles = np.array(boxTriangles((1.0, 1.0, 1.0)) + [[(0.25, 0.25, 0.25), (0.25, 0.25, 0.25), (0.25, 0.25, 0.25)],
+                                                        [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (2.0, 0.0, 0.0)]])
+    (vertices, faces) = meshes.weldVertices(triangles, 1e-6)
+    assert len(vertices) == 8 + 1 + 3
+    assert faces.shape == (14, 3)
+    kept = meshes.removeDegenerateFaces(vertices, faces, 1e-12)
+    assert len(kept) == 12
+
+def test_post_process_scales_and_welds(tmp_path):
+    filename = str(tmp_path / "link.stl")
+    # a 10 mm cube whose faces are split into 4 triangles each
+    triangles = []
+    for triangle in boxTriangles((10.0, 10.0, 10.0)):
+        center = tuple(sum(corner[k] for corner in triangle) / 3.0 for k in range(3))
+        triangles.append(triangle)
+        triangles.append([triangle[0], triangle[1], center])
+    writeBinaryStl(filename, triangles)
+    (_, before, after, vertices) = meshes.postProcessStl(filename)
+    assert before == 24
+    assert after == 24
+    assert vertices == 8 + 12
+    result = meshes.readStl(filename)
+    assert np.allclose(result.min(axis=(0, 1)), -0.005) and np.allclose(result.max(axis=(0, 1)), 0.005)
@@ -0,0 +1,59 @@
+import os
+import struct
+import xml.etree.ElementTree as ET
+
+from addin import load
+from design import generateDesign
+
+meshes = load("meshes")
+run = load("benchmark.run")
+
+def triangleCount(filename):
+    with open(filename, 'rb') as file:
+        file.seek(80)
+        return struct.unpack('<I', file.read(4))[0]
+
+def uris(fileDir, tag):
+    links = ET.parse(os.path.join(fileDir, "model.sdf")).getroot().iter("link")
+    return {link.get("name"): link.find(tag + "/geometry/mesh/uri").text for link in links}
+
+def export(fileDir, **settings):
+    settings["workerProcesses"] = 0
+    run.exportDesign(fileDir, settings)
+    with open(os.path.join(fileDir, "logfile.txt")) as file:
+        return [line for line in file if line.startswith("exporting ")]
+
+def test_mesh_files_by_level():
+    assert meshes.meshFile("arm") == "meshes/CAD/arm.stl"
+    assert meshes.meshFile("arm", meshes.LOW) == "meshes/CAD/arm.stl"
+    assert meshes.meshFile("arm", meshes.HIGH) == "meshes/CAD/high/arm.stl"
+
+def test_default_exports_the_low_level_only(tmp_path):
+    generateDesign(2)
+    fileDir = str(tmp_path)
+    export(fileDir)
+    assert uris(fileDir, "visual") == uris(fileDir, "collision") == {
+        "link0": "model://robot/meshes/CAD/link0.stl", "link1": "model://robot/meshes/CAD/link1.stl"}
+    assert not os.path.exists(str(tmp_path / "meshes" / "CAD" / "medium"))
+    assert not os.path.exists(str(tmp_path / "meshes" / "CAD" / "high"))
+
+def test_visual_and_collision_levels(tmp_path):
+    generateDesign(2)
+    fileDir = str(tmp_path)
+    export(fileDir, visualMesh=meshes.HIGH, collisionMesh=meshes.LOW)
+    assert uris(fileDir, "visual")["link0"] == "model://robot/meshes/CAD/high/link0.stl"
+    assert uris(fileDir, "collision")["link0"] == "model://robot/meshes/CAD/link0.stl"
+    low = triangleCount(os.path.join(fileDir, meshes.meshFile("link0", meshes.LOW)))
+    high = triangleCount(os.path.join(fileDir, meshes.meshFile("link0", meshes.HIGH)))
+    assert high > low
+    assert not os.path.exists(str(tmp_path / "meshes" / "CAD" / "medium"))
+
+def test_only_missing_levels_are_exported_again(tmp_path):
+    fileDir = str(tmp_path)
+    generateDesign(2)
+    export(fileDir)
+    # the same design again, its links are taken from the export cache
+    exported = export(fileDir, visualMesh=meshes.MEDIUM)
+    assert exported == ["exporting medium stl of link0\n", "exporting medium stl of link1\n"]
+    assert uris(fileDir, "visual")["link1"] == "model://robot/meshes/CAD/medium/link1.stl"
+    assert uris(fileDir, "collision")["link1"] == "model://robot/meshes/CAD/link1.stl"
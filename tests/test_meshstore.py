@@ -0,0 +1,63 @@
+import hashlib
+import os
+
+from addin import load
+from design import generateDesign
+
+meshstore = load("meshstore")
+run = load("benchmark.run")
+
+def write(filename, content):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'wb') as file:
+        file.write(content)
+
+def read(filename):
+    with open(filename, 'rb') as file:
+        return file.read()
+
+def test_identical_meshes_are_stored_once(tmp_path):
+    store = str(tmp_path / "store")
+    first = str(tmp_path / "one" / "arm.stl")
+    second = str(tmp_path / "two" / "arm.stl")
+    write(first, b"solid arm")
+    write(second, b"solid arm")
+    (_, digest, added, linked) = meshstore.storeMesh(store, first)
+    assert digest == hashlib.sha1(b"solid arm").hexdigest()
+    assert added and linked
+    assert meshstore.MeshStore(store).path(digest) == os.path.join(store, digest[:2], digest + ".stl")
+    assert meshstore.storeMesh(store, second)[2:] == (False, True)
+    assert os.path.samefile(first, second)
+    assert os.listdir(os.path.join(store, digest[:2])) == [digest + ".stl"]
+
+def test_place_into_another_directory(tmp_path):
+    store = meshstore.MeshStore(str(tmp_path / "store"))
+    source = str(tmp_path / "source.stl")
+    write(source, b"solid hand")
+    (digest, added) = store.add(source)
+    assert added and store.contains(digest)
+    destination = str(tmp_path / "export" / "hand.stl")
+    os.makedirs(os.path.dirname(destination))
+    assert meshstore.storeMesh(store.root, source, destination) == (destination, digest, False, True)
+    assert store.place(digest, destination)
+    assert read(destination) == b"solid hand"
+
+def test_replacing_an_exported_mesh_keeps_the_stored_one(tmp_path):
+    store = str(tmp_path / "store")
+    filename = str(tmp_path / "export" / "arm.stl")
+    write(filename, b"solid arm")
+    digest = meshstore.storeMesh(store, filename)[1]
+    # exports replace their files instead of writing through the hardlink
+    write(str(tmp_path / "new.stl"), b"solid bigger arm")
+    os.replace(str(tmp_path / "new.stl"), filename)
+    assert read(meshstore.MeshStore(store).path(digest)) == b"solid arm"
+
+def test_exports_share_their_meshes(tmp_path):
+    store = str(tmp_path / "store")
+    for name in ("one", "two"):
+        generateDesign(3)
+        run.exportDesign(str(tmp_path / name), {"meshStore": store, "workerProcesses": 0})
+    for link in ("link0", "link1", "link2"):
+        one = str(tmp_path / "one" / "meshes" / "CAD" / (link + ".stl"))
+        assert os.path.samefile(one, str(tmp_path / "two" / "meshes" / "CAD" / (link + ".stl")))
+    assert sum(len(files) for (_, _, files) in os.walk(store)) == 3
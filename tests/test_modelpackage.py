@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import zipfile
+
+import pytest
+
+from addin import load
+from design import generateDesign
+
+modelpackage = load("modelpackage")
+writers = load("writers")
+run = load("benchmark.run")
+
+def export(fileDir, **settings):
+    settings.setdefault("workerProcesses", 0)
+    settings.setdefault("packageFormat", modelpackage.ZIP)
+    run.exportDesign(fileDir, dict(settings, exportViaPoints=True))
+    with open(os.path.join(fileDir, "logfile.txt")) as file:
+        return file.read().splitlines()
+
+def sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+def test_archive_matches_the_export(tmp_path):
+    fileDir = str(tmp_path / "robot")
+    generateDesign(3, viaPoints=9)
+    log = export(fileDir)
+    # the archive is next to the export directory, not in it
+    filename = str(tmp_path / "robot.zip")
+    assert modelpackage.packageFilename(fileDir, "robot", modelpackage.ZIP) == filename
+    assert not [name for name in os.listdir(fileDir) if name.endswith(".zip") or name.endswith(".tmp")]
+    with zipfile.ZipFile(filename) as archive:
+        names = archive.namelist()
+        manifest = json.loads(archive.read("robot/" + modelpackage.manifestName))
+        contents = {name: archive.read(name) for name in names}
+    paths = [entry["path"] for entry in manifest["files"]]
+    assert manifest["model"] == "robot" and paths == sorted(paths)
+    assert sorted(names) == sorted(["robot/" + path for path in paths] + ["robot/" + modelpackage.manifestName])
+    for path in ("model.sdf", "model.config", "cardsflow.xml", "meshes/CAD/link0.stl"):
+        assert path in paths
+    # the export directory keeps its own files
+    assert "snapshot.json" not in paths and "logfile.txt" not in paths
+    for entry in manifest["files"]:
+        with open(os.path.join(fileDir, entry["path"]), 'rb') as file:
+            data = file.read()
+        assert contents["robot/" + entry["path"]] == data
+        assert (entry["size"], entry["sha1"]) == (len(data), sha1(data))
+    assert ("package robot.zip: " + str(len(paths)) + " files, "
+            + str(sum(entry["size"] for entry in manifest["files"])) + " bytes before compression") in log
+
+def test_unchanged_outputs_are_packed_again(tmp_path):
+    fileDir = str(tmp_path / "robot")
+    generateDesign(2)
+    export(fileDir)
+    with zipfile.ZipFile(str(tmp_path / "robot.zip")) as archive:
+        before = sorted(archive.namelist())
+    export(fileDir)
+    with zipfile.ZipFile(str(tmp_path / "robot.zip")) as archive:
+        assert sorted(archive.namelist()) == before
+
+def test_outputs_are_streamed_into_the_archive(tmp_path):
+    fileDir = str(tmp_path / "robot")
+    os.makedirs(fileDir)
+    filename = str(tmp_path / "robot.zip")
+    package = modelpackage.PackageWriter(filename, fileDir, "robot", modelpackage.ZIP)
+    opened = []
+    streamed = package.open
+    package.open = lambda name: opened.append(os.path.basename(name)) or streamed(name)
+    with writers.packing(package):
+        writers.writeFile(fileDir + "/model.config", "<model/>\n")
+    # outside of the block nothing is packed
+    writers.writeFile(fileDir + "/snapshot.json", "{}\n")
+    with open(fileDir + "/arm.stl", 'wb') as file:
+        file.write(b"solid" * 100000)
+    package.add(*package.copy(fileDir + "/arm.stl"))
+    assert package.close() == (filename, 2, 9 + 500000)
+    assert opened == ["model.config"]
+    with zipfile.ZipFile(filename) as archive:
+        assert archive.read("robot/model.config") == b"<model/>\n"
+        assert archive.getinfo("robot/arm.stl").file_size == 500000
+        manifest = json.loads(archive.read("robot/manifest.json"))
+    assert manifest["files"] == [
+        {"path": "arm.stl", "size": 500000, "sha1": sha1(b"solid" * 100000)},
+        {"path": "model.config", "size": 9, "sha1": sha1(b"<model/>\n")}]
+
+def test_failed_output_drops_the_archive(tmp_path):
+    fileDir = str(tmp_path / "robot")
+    os.makedirs(fileDir)
+    package = modelpackage.PackageWriter(str(tmp_path / "robot.zip"), fileDir, "robot", modelpackage.ZIP)
+    with pytest.raises(ZeroDivisionError):
+        with writers.packing(package):
+            output = writers.OutputFile(fileDir + "/model.sdf")
+            with output as stream:
+                stream.write("<sdf>")
+                1 / 0
+    assert package.files == {}
+    package.abort()
+    assert os.listdir(str(tmp_path)) == ["robot"]
+
+def test_missing_zstandard_writes_a_zip(tmp_path, monkeypatch):
+    monkeypatch.setattr(modelpackage, "zstandard", None)
+    fileDir = str(tmp_path / "robot")
+    generateDesign(2)
+    log = export(fileDir, packageFormat=modelpackage.TAR_ZST)
+    assert "WARNING: the zstandard package is not installed, writing a zip package instead of tar.zst" in log
+    assert zipfile.is_zipfile(str(tmp_path / "robot.zip"))
+    assert not os.path.exists(str(tmp_path / "robot.tar.zst"))
+
+def test_tar_zst_archive(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    import tarfile
+    fileDir = str(tmp_path / "robot")
+    generateDesign(2)
+    export(fileDir, packageFormat=modelpackage.TAR_ZST)
+    with open(str(tmp_path / "robot.tar.zst"), 'rb') as file:
+        with zstandard.ZstdDecompressor().stream_reader(file) as stream:
+            with tarfile.open(fileobj=stream, mode='r|') as archive:
+                contents = {info.name: archive.extractfile(info).read() for info in archive}
+    manifest = json.loads(contents.pop("robot/manifest.json"))
+    for entry in manifest["files"]:
+        assert sha1(contents["robot/" + entry["path"]]) == entry["sha1"]
+    assert "robot/model.sdf" in contents and "robot/meshes/CAD/link0.stl" in contents
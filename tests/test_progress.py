@@ -0,0 +1,57 @@
+from addin import load
+
+import adsk
+import adsk.core
+
+progress = load("progress")
+
+def pumped(monkeypatch):
+    calls = []
+    monkeypatch.setattr(adsk, "doEvents", lambda: calls.append(True))
+    return calls
+
+def test_steps_are_throttled(monkeypatch):
+    events = pumped(monkeypatch)
+    result = progress.Progress(adsk.core.UserInterface(), interval=3600.0)
+    result.start("SDFusion", "Processing rigid groups: %v/%m", 100)
+    for i in range(100):
+        assert result.step(message="%v/%m link" + str(i))
+    # only the start updated the dialog so far
+    assert result.updates == 1 and len(events) == 1
+    assert result.dialog.progressValue == 0
+    assert result.finish()
+    assert result.updates == 2 and len(events) == 2
+    assert result.dialog.progressValue == 100
+    assert result.dialog.message == "%v/%m link99"
+    assert not result.dialog.isShowing
+
+def test_every_step_updates_without_interval(monkeypatch):
+    events = pumped(monkeypatch)
+    result = progress.Progress(adsk.core.UserInterface(), interval=0.0)
+    result.start("Joint", "Processing joints", 3)
+    for i in range(3):
+        result.step()
+    assert result.updates == 4 and len(events) == 4
+
+def test_value_is_clamped_to_the_total(monkeypatch):
+    pumped(monkeypatch)
+    result = progress.Progress(adsk.core.UserInterface(), interval=0.0)
+    result.start("Joint", "Processing joints", 2)
+    result.step(5)
+    assert result.value == 5 and result.dialog.progressValue == 2
+
+def test_cancel_is_noticed_on_the_next_update(monkeypatch):
+    pumped(monkeypatch)
+    result = progress.Progress(adsk.core.UserInterface(), interval=3600.0)
+    result.start("SDFusion", "%v/%m", 10)
+    result.dialog.wasCancelled = True
+    # throttled steps do not look at the dialog
+    assert result.step()
+    assert not result.update()
+    assert not result.step() and result.cancelled
+    assert not result.finish()
+    # a new task starts uncancelled with the same dialog
+    dialog = result.dialog
+    result.dialog.wasCancelled = False
+    result.start("Clean up", "%v/%m", 5)
+    assert not result.cancelled and result.dialog is dialog
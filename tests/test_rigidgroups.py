@@ -0,0 +1,50 @@
+from addin import load
+
+import adsk.core
+import adsk.fusion
+from design import generateDesign
+
+rigidgroups = load("rigidgroups")
+
+def index(design):
+    return rigidgroups.RigidGroupIndex().build(design.rootComponent.allRigidGroups)
+
+def test_link_names_of_rigid_groups():
+    assert rigidgroups.linkNameOfRigidGroup("EXPORT_upper_arm") == "upper_arm"
+    assert rigidgroups.linkNameOfRigidGroup("Rigid1") is None
+
+def test_membership_includes_nested_occurrences():
+    design = generateDesign(3, bodiesPerLink=4, nestedParts=True)
+    result = index(design)
+    assert result.links == ["link0", "link1", "link2"]
+    for occurrence in design.rootComponent.occurrences:
+        name = occurrence.component.name
+        assert result.linkOf(occurrence) == name
+        assert result.group(name).name == "EXPORT_" + name
+        for child in occurrence.childOccurrences:
+            assert result.linkOf(child) == name
+    assert result.group("link3") is None
+
+def test_occurrences_outside_of_links():
+    design = generateDesign(2, smallParts=1)
+    screw = [o for o in design.rootComponent.occurrences if o.component.name == "screw0"][0]
+    assert index(design).linkOf(screw) is None
+
+def test_duplicates_and_shared_occurrences_are_reported():
+    design = generateDesign(3)
+    root = design.rootComponent
+    occurrences = list(root.occurrences)
+    root.rigidGroups.items.append(adsk.fusion.RigidGroup(root, "EXPORT_link1", [occurrences[2]]))
+    root.rigidGroups.items.append(adsk.fusion.RigidGroup(root, "EXPORT_extra", [occurrences[0]]))
+    result = index(design)
+    assert result.links == ["link0", "link1", "link2", "extra"]
+    assert result.duplicateLinks == ["link1"]
+    # the first group of a link makes up the link
+    assert list(result.group("link1").occurrences) == [occurrences[1]]
+    # but an occurrence belongs to the last EXPORT group it is a member of
+    assert result.sharedOccurrences == {
+        occurrences[0].fullPathName: ["link0", "extra"],
+        occurrences[2].fullPathName: ["link2", "link1"],
+    }
+    assert result.linkOf(occurrences[0]) == "extra"
+    assert result.linkOf(occurrences[2]) == "link1"
@@ -0,0 +1,62 @@
+from addin import load
+
+import adsk.core
+from design import generateDesign
+
+exporter = load("exporter")
+
+def occurrenceNames(design):
+    return sorted(occurrence.fullPathName for occurrence in design.rootComponent.allOccurrences)
+
+def addNut(design):
+    screw = [o for o in design.rootComponent.occurrences if o.component.name == "screw0"][0]
+    nut = screw.component.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+    nut.component.name = "nut"
+    nut.component.addBody("Body0", (0.0, 0.0, 0.0), (0.2, 0.2, 0.2), 0.00785)
+    return nut
+
+def cleanUp(fileDir, dryRun=False, incremental=True):
+    result = exporter.SDFExporter()
+    result.modelName = "robot"
+    result.fileDir = fileDir
+    result.incremental = incremental
+    result.smallPartsDryRun = dryRun
+    result.createDiectoryStructure()
+    removed = result.removeSmallParts()
+    result.exportCache.save()
+    result.logfile.close()
+    return (result, removed)
+
+def test_small_parts_are_removed_in_one_batch(tmp_path):
+    design = generateDesign(3, smallParts=2)
+    nut = addNut(design)
+    computes = len(design.computes)
+    (_, removed) = cleanUp(str(tmp_path))
+    # the nut goes with the screw it is part of
+    assert [path for (path, _) in removed] == ["screw0:1", "screw1:1"]
+    assert all(0.0 < mass < 0.001 for (_, mass) in removed)
+    assert nut.fullPathName not in occurrenceNames(design)
+    assert not [name for name in occurrenceNames(design) if "screw" in name]
+    assert len(design.computes) == computes + 1
+
+def test_dry_run_leaves_the_design_untouched(tmp_path):
+    design = generateDesign(3, smallParts=2)
+    before = occurrenceNames(design)
+    (result, removed) = cleanUp(str(tmp_path), dryRun=True)
+    assert len(removed) == 2
+    assert occurrenceNames(design) == before
+    assert result.ui.messages[-1].startswith("Clean up would remove 2 occurrences")
+
+def test_masses_are_measured_once(tmp_path):
+    generateDesign(3, smallParts=2)
+    cleanUp(str(tmp_path), dryRun=True)
+    # a new session gives the components new entity tokens but the same ids
+    design = generateDesign(3, smallParts=2)
+    link = design.rootComponent.occurrences[0].component
+    link.addBody("Body9", (0.0, 0.0, 0.0), (1.0, 1.0, 1.0), 0.0027)
+    cleanUp(str(tmp_path), dryRun=True)
+    with open(str(tmp_path / "logfile.txt")) as file:
+        assert "measured 1 of 6 components\n" in file.read()
+    cleanUp(str(tmp_path), dryRun=True, incremental=False)
+    with open(str(tmp_path / "logfile.txt")) as file:
+        assert "measured 5 of 6 components\n" in file.read()
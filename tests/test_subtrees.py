@@ -0,0 +1,83 @@
+import os
+
+from addin import load
+from design import generateDesign
+
+kinematics = load("kinematics")
+snapshot = load("snapshot")
+run = load("benchmark.run")
+
+settings = {"exportViaPoints": True, "workerProcesses": 0}
+
+def export(fileDir, **overrides):
+    run.exportDesign(fileDir, dict(settings, **overrides))
+    with open(os.path.join(fileDir, "logfile.txt")) as file:
+        log = file.read().splitlines()
+    detected = [line for line in log if line.startswith("changed links: ")]
+    kept = sorted(line.split()[1] for line in log if line.startswith("keeping "))
+    return (detected, kept)
+
+def read(fileDir, name):
+    with open(os.path.join(fileDir, name), 'rb') as file:
+        return file.read()
+
+def subtree(fileDir, name):
+    return sorted(kinematics.KinematicTree.fromSnapshot(snapshot.DesignSnapshot.load(fileDir)).subtree(name))
+
+def link(design, name):
+    return [o for o in design.rootComponent.occurrences if o.component.name == name][0]
+
+def assertSameAsFullExport(tmp_path, fileDir):
+    full = str(tmp_path / "full")
+    export(full, incremental=False)
+    for name in ("model.sdf", "cardsflow.xml"):
+        assert read(fileDir, name) == read(full, name), name
+
+def test_nothing_changed(tmp_path):
+    fileDir = str(tmp_path / "robot")
+    generateDesign(6, viaPoints=12)
+    export(fileDir)
+    (detected, kept) = export(fileDir)
+    assert detected == ["changed links: none, changed joints: none, exporting again: none"]
+    assert kept == ["link" + str(i) for i in range(6)]
+
+def test_changed_link_exports_its_subtree(tmp_path):
+    fileDir = str(tmp_path / "robot")
+    design = generateDesign(6, viaPoints=12)
+    export(fileDir)
+    body = link(design, "link1").component.bRepBodies[0]
+    body.center = (body.center[0] + 0.5,) + body.center[1:]
+    again = subtree(fileDir, "link1")
+    (detected, kept) = export(fileDir)
+    assert detected == ["changed links: link1, changed joints: none, exporting again: " + ", ".join(again)]
+    assert kept == sorted(set("link" + str(i) for i in range(6)) - set(again))
+    assertSameAsFullExport(tmp_path, fileDir)
+
+def test_changed_joint_exports_the_subtree_of_its_child(tmp_path):
+    fileDir = str(tmp_path / "robot")
+    design = generateDesign(6, viaPoints=12)
+    export(fileDir)
+    joint = design.rootComponent.joints[2]
+    joint.jointMotion.rotationLimits.maximumValue = 0.5
+    joint.jointMotion.slideLimits.maximumValue = 0.5
+    child = joint.occurrenceOne.component.name
+    (detected, kept) = export(fileDir)
+    assert detected == ["changed links: " + child + ", changed joints: joint3, exporting again: " + ", ".join(subtree(fileDir, child))]
+    assert child not in kept
+    assertSameAsFullExport(tmp_path, fileDir)
+
+def test_changed_settings_export_everything(tmp_path):
+    fileDir = str(tmp_path / "robot")
+    generateDesign(3)
+    export(fileDir)
+    (detected, kept) = export(fileDir, exportViaPoints=False)
+    assert detected == [] and kept == []
+
+def test_subtree_setting_overrides_the_detection(tmp_path):
+    fileDir = str(tmp_path / "robot")
+    generateDesign(6, viaPoints=12)
+    export(fileDir)
+    again = subtree(fileDir, "link2")
+    (detected, kept) = export(fileDir, subtreeRoot="link2")
+    assert detected == []
+    assert kept == sorted(set("link" + str(i) for i in range(6)) - set(again))
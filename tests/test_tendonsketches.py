@@ -0,0 +1,66 @@
+from addin import load
+
+import adsk.core
+from design import generateDesign
+
+exporter = load("exporter")
+
+def traverse(fileDir):
+    result = exporter.SDFExporter()
+    result.modelName = "robot"
+    result.fileDir = fileDir
+    result.createDiectoryStructure()
+    result.traverseViaPoints()
+    result.logfile.close()
+    with open(fileDir + "/logfile.txt") as file:
+        return [line for line in file if line.startswith("tendon sketches: ")][-1].strip()
+
+def sketches(design):
+    return {sketch.name: sketch for sketch in design.rootComponent.sketches}
+
+def splinePoints(sketch):
+    (spline,) = sketch.sketchCurves.sketchFittedSplines
+    return [(point.x, point.y, point.z) for point in spline]
+
+def viaPoints(design, motor):
+    points = [p for p in design.rootComponent.constructionPoints if p.name.startswith("VP_motor" + motor + "_")]
+    return sorted(points, key=lambda p: int(p.name.rpartition("_")[2]))
+
+def test_sketches_are_drawn_in_via_point_order(tmp_path):
+    design = generateDesign(4, viaPoints=18)
+    assert traverse(str(tmp_path)) == "tendon sketches: 0 kept, 3 drawn, 0 deleted"
+    drawn = sketches(design)
+    assert sorted(drawn) == ["tendon_0", "tendon_1", "tendon_2"]
+    expected = [(p.geometry.x, p.geometry.y, p.geometry.z) for p in viaPoints(design, "1")]
+    assert splinePoints(drawn["tendon_1"]) == expected
+
+def test_only_changed_tendons_are_drawn_again(tmp_path):
+    design = generateDesign(4, viaPoints=18)
+    other = design.rootComponent.sketches.add(design.rootComponent.xYConstructionPlane)
+    traverse(str(tmp_path))
+    before = sketches(design)
+    assert traverse(str(tmp_path)) == "tendon sketches: 3 kept, 0 drawn, 0 deleted"
+    assert sketches(design) == before
+    # move a via-point of motor 1
+    point = viaPoints(design, "1")[0]
+    point.geometry = adsk.core.Point3D.create(point.geometry.x + 1.0, point.geometry.y, point.geometry.z)
+    assert traverse(str(tmp_path)) == "tendon sketches: 2 kept, 1 drawn, 0 deleted"
+    after = sketches(design)
+    assert after["tendon_1"] is not before["tendon_1"]
+    assert after["tendon_0"] is before["tendon_0"] and after["tendon_2"] is before["tendon_2"]
+    assert splinePoints(after["tendon_1"])[0][0] == point.geometry.x
+    # sketches with other names are never touched
+    assert after[other.name] is other
+
+def test_sketches_of_motors_without_via_points_are_deleted(tmp_path):
+    design = generateDesign(4, viaPoints=18)
+    traverse(str(tmp_path))
+    for point in viaPoints(design, "2"):
+        point.deleteMe()
+    assert traverse(str(tmp_path)) == "tendon sketches: 2 kept, 0 drawn, 1 deleted"
+    assert sorted(name for name in sketches(design) if name.startswith("tendon_")) == ["tendon_0", "tendon_1"]
+    # a redrawn sketch is not counted as deleted
+    viaPoints(design, "0")[-1].deleteMe()
+    for point in viaPoints(design, "1"):
+        point.deleteMe()
+    assert traverse(str(tmp_path)) == "tendon sketches: 0 kept, 1 drawn, 1 deleted"
@@ -0,0 +1,83 @@
+from addin import load
+
+import adsk.core
+
+tracing = load("tracing")
+
+class Exporter:
+    def __init__(self):
+        self.tracer = tracing.Tracer()
+
+    @tracing.traced()
+    def exportLink(self, name, scale=1.0):
+        return adsk.core.Point3D.create(scale, 0.0, 0.0)
+
+    @tracing.traced("export")
+    def export(self, names):
+        return [self.exportLink(name) for name in names]
+
+def phases(tracer, name):
+    return [phase for phase in tracer.phases if phase.name == name]
+
+def test_disabled_tracer_records_nothing():
+    exporter = Exporter()
+    assert exporter.export(["a", "b"])[1].x == 1.0
+    assert exporter.tracer.phases == []
+
+def test_phases_are_nested_and_keep_their_arguments():
+    exporter = Exporter()
+    exporter.tracer.start(memory=False)
+    exporter.export(["a", "b"])
+    exporter.tracer.stop()
+    (export,) = phases(exporter.tracer, "export")
+    links = phases(exporter.tracer, "exportLink")
+    assert [phase.args for phase in links] == [{"args": ["a"]}, {"args": ["b"]}]
+    assert all(export.start <= phase.start and phase.end <= export.end for phase in links)
+    # one call of Point3D.create per link, the calls inside adsk are not counted
+    assert [phase.apiCalls for phase in links] == [1, 1]
+    assert export.apiCalls == 2
+
+def test_same_phase_is_merged_into_its_parent():
+    tracer = tracing.Tracer()
+    tracer.start(memory=False)
+    with tracer.phase("finish"):
+        with tracer.phase("finish") as inner:
+            assert inner is None
+    tracer.stop()
+    assert [phase.name for phase in tracer.phases] == ["finish"]
+
+def test_stop_closes_running_phases():
+    tracer = tracing.Tracer()
+    tracer.start(memory=False)
+    with tracer.phase("outer"):
+        tracer.stop()
+    assert [phase.name for phase in tracer.phases] == ["outer"]
+    assert not tracer.enabled
+
+def test_peak_memory_of_children_counts_for_the_parent():
+    tracer = tracing.Tracer()
+    tracer.start()
+    with tracer.phase("outer"):
+        with tracer.phase("inner"):
+            data = bytearray(4 * 1024 * 1024)
+        del data
+    tracer.stop()
+    (inner,) = phases(tracer, "inner")
+    (outer,) = phases(tracer, "outer")
+    assert inner.peakMemory >= 4 * 1024 * 1024
+    assert outer.peakMemory >= inner.peakMemory
+
+def test_summary_and_trace_events():
+    exporter = Exporter()
+    exporter.tracer.start(memory=False)
+    exporter.export(["a", "b", "c"])
+    exporter.tracer.stop()
+    rows = {row[0]: row for row in exporter.tracer.summary()}
+    assert rows["exportLink"][1] == 3 and rows["exportLink"][3] == 3
+    assert rows["export"][1] == 1
+    events = exporter.tracer.traceEvents()
+    assert [event["name"] for event in events] == ["export", "exportLink", "exportLink", "exportLink"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0.0 for event in events)
+    assert events[1]["args"]["args"] == ["a"]
+    table = exporter.tracer.summaryTable().splitlines()
+    assert table[0].split()[0] == "phase" and len(table) == 3
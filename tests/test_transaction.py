@@ -0,0 +1,87 @@
+from addin import load
+
+import adsk.core
+import adsk.fusion
+
+transaction = load("transaction")
+DesignTransaction = transaction.DesignTransaction
+
+def newDesign():
+    design = adsk.fusion.Design("robot")
+    root = design.rootComponent
+    old = root.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+    old.component.name = "EXPORT_old"
+    old.component.addBody("Body0", (0.0, 0.0, 0.0), (1.0, 1.0, 1.0), 0.0027)
+    old.component.bRepBodies[0].copyToComponent(old)
+    sketch = root.sketches.add(root.xYConstructionPlane)
+    sketch.name = "tendon_0"
+    return (design, old, sketch)
+
+def addComponent(design, name):
+    occurrence = design.rootComponent.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+    occurrence.component.name = name
+    return occurrence
+
+def test_nested_delete_keeps_group_range():
+    (design, old, sketch) = newDesign()
+    timeline = design.timeline
+    with DesignTransaction(design, "SDFusion export") as outer:
+        assert outer.start == timeline.count == 3
+        addComponent(design, "first")
+        with DesignTransaction(design, "EXPORT_old") as inner:
+            assert inner.nested
+            inner.delete(old)
+        with DesignTransaction(design, "tendon sketches") as inner:
+            inner.delete([sketch])
+        addComponent(design, "second")
+        created = list(timeline.items[outer.start:])
+    assert outer.start == 0
+    assert timeline.count == 2
+    group = timeline.timelineGroups[0]
+    assert group.name == "SDFusion export"
+    assert group.items == created
+    assert [item.name for item in group.items] == ["new component", "new component"]
+
+def test_outer_group_after_delete_in_outer():
+    (design, old, sketch) = newDesign()
+    timeline = design.timeline
+    with DesignTransaction(design, "SDFusion export") as outer:
+        outer.delete([old, sketch])
+        addComponent(design, "first")
+        addComponent(design, "second")
+    assert outer.start == 0
+    assert timeline.timelineGroups[0].items == timeline.items
+
+def test_compute_is_deferred_and_batched():
+    (design, old, sketch) = newDesign()
+    design.computes = []
+    with DesignTransaction(design, "SDFusion export"):
+        assert design.isComputeDeferred
+        addComponent(design, "first")
+        addComponent(design, "second")
+        with DesignTransaction(design, "EXPORT_old") as inner:
+            inner.delete([old, sketch])
+        # the nested transaction computed its changes and the ones before once
+        assert design.computes == [4]
+        assert inner.flushes == 1
+        addComponent(design, "third")
+        assert design.computes == [4]
+    assert not design.isComputeDeferred
+    assert design.computes == [4, 1]
+
+def test_open_transactions_are_closed():
+    (design, old, sketch) = newDesign()
+    try:
+        with DesignTransaction(design, "SDFusion export"):
+            with DesignTransaction(design, "EXPORT_old"):
+                raise RuntimeError("export failed")
+    except RuntimeError:
+        pass
+    assert transaction._open == []
+    assert not design.isComputeDeferred
+
+def test_single_entry_is_not_grouped():
+    (design, old, sketch) = newDesign()
+    with DesignTransaction(design, "SDFusion export"):
+        addComponent(design, "first")
+    assert design.timeline.timelineGroups.count == 0
@@ -0,0 +1,68 @@
+from addin import load
+
+viapoints = load("viapoints")
+
+def sampleTable():
+    table = viapoints.ViaPointTable()
+    table.add("VP_motor3_EXPORT_arm_10", "3", "arm", "10", (10.0, 0.0, 0.0), (1.0, 0.0, 0.0))
+    table.add("VP_motor3_EXPORT_hand_2", "3", "hand", "2", (4.0, 0.0, 0.0), (0.0, 1.0, 0.0))
+    table.add("VP_motor1_EXPORT_arm_0", "1", "arm", "0", (0.0, 0.0, 0.0), (1.0, 0.0, 0.0))
+    table.add("VP_motor3_EXPORT_arm_1", "3", "arm", "1", (0.0, 3.0, 0.0), (1.0, 0.0, 0.0))
+    table.add("VP_motor1_EXPORT_hand_1", "1", "hand", "1", (0.0, 0.0, 2.0), (0.0, 1.0, 0.0))
+    return table
+
+def test_tendons_are_ordered_by_number():
+    table = sampleTable()
+    assert len(table) == 5
+    assert table.motors == ["3", "1"] and table.links == ["arm", "hand"]
+    # 10 comes after 2, not before
+    assert [table.number[row] for row in table.tendon("3")] == [1, 2, 10]
+    assert [(motor, [table.names[row] for row in rows]) for (motor, rows) in table.tendons()] == [
+        ("3", ["VP_motor3_EXPORT_arm_1", "VP_motor3_EXPORT_hand_2", "VP_motor3_EXPORT_arm_10"]),
+        ("1", ["VP_motor1_EXPORT_arm_0", "VP_motor1_EXPORT_hand_1"])]
+
+def test_equal_numbers_keep_the_design_order():
+    table = viapoints.ViaPointTable()
+    for (i, number) in enumerate(("1", "0", "1")):
+        table.add("VP" + str(i), "0", "arm", number, (0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+    assert [table.names[row] for row in table.tendon("0")] == ["VP1", "VP0", "VP2"]
+    # adding a row sorts again
+    table.add("VP3", "0", "arm", "0", (0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+    assert [table.names[row] for row in table.tendon("0")] == ["VP1", "VP3", "VP0", "VP2"]
+
+def test_rows_keep_their_link_and_offset():
+    table = sampleTable()
+    row = table.tendon("3")[1]
+    assert table.linkName(row) == "hand"
+    assert table.coordinates(row) == "0.04 -0.01 0.0"
+    assert list(table.position[3 * row:3 * row + 3]) == [4.0, 0.0, 0.0]
+
+def geometries(monkeypatch, table):
+    results = [viapoints.TendonGeometry(table)]
+    monkeypatch.setattr(viapoints, "np", None)
+    results.append(viapoints.TendonGeometry(table))
+    return results
+
+def test_tendon_geometry(monkeypatch):
+    table = sampleTable()
+    for geometry in geometries(monkeypatch, table):
+        # motor 3: (0, 3, 0) -> (4, 0, 0) -> (10, 0, 0), motor 1: (0, 0, 0) -> (0, 0, 2)
+        (first, second, last) = table.tendon("3")
+        assert [round(v, 12) for v in geometry.segments[first]] == [0.04, -0.03, 0.0]
+        assert abs(geometry.segmentLengths[first] - 0.05) < 1e-12
+        assert abs(geometry.segmentLengths[second] - 0.06) < 1e-12
+        # the last via-point of a tendon starts no segment
+        assert geometry.segments[last] == (0.0, 0.0, 0.0) and geometry.segmentLengths[last] == 0.0
+        assert abs(geometry.length("3") - 0.11) < 1e-12
+        assert abs(geometry.length("1") - 0.02) < 1e-12
+        assert geometry.segment(table.tendon("1")[0]) == "0.0 0.0 0.02"
+
+def test_tendon_geometry_without_segments(monkeypatch):
+    table = viapoints.ViaPointTable()
+    assert viapoints.TendonGeometry(table).lengths == []
+    table.add("VP_motor0_EXPORT_arm_0", "0", "arm", "0", (1.0, 2.0, 3.0), (0.0, 0.0, 0.0))
+    table.add("VP_motor1_EXPORT_arm_0", "1", "arm", "0", (4.0, 5.0, 6.0), (0.0, 0.0, 0.0))
+    for geometry in geometries(monkeypatch, table):
+        # two tendons of one via-point each are not connected
+        assert geometry.lengths == [0.0, 0.0]
+        assert geometry.segmentLengths == [0.0, 0.0]
@@ -0,0 +1,59 @@
+from addin import load
+
+import adsk.core
+import adsk.fusion
+
+viapointsession = load("viapointsession")
+
+def edge(x, y, z):
+    return adsk.fusion.BRepEdge(adsk.core.Point3D.create(x, y, z))
+
+def newSession():
+    design = adsk.fusion.Design("robot")
+    return (design.rootComponent, viapointsession.ViaPointSession(design.rootComponent))
+
+def test_selections_are_unique():
+    (root, session) = newSession()
+    first = edge(0.0, 0.0, 0.0)
+    assert session.add("1", "link0", "0", first)
+    assert not session.add("1", "link0", "0", edge(1.0, 0.0, 0.0))
+    assert not session.add("1", "link0", "1", first)
+    assert session.add("1", "link0", "1", edge(1.0, 0.0, 0.0))
+    assert [vp.number for vp in session.pending] == ["0", "1"]
+
+def test_preview_replaces_the_previous_point_cloud():
+    (root, session) = newSession()
+    assert session.preview() is None
+    session.add("1", "link0", "0", edge(0.0, 0.0, 0.0))
+    first = session.preview()
+    session.add("1", "link0", "1", edge(1.0, 2.0, 3.0))
+    second = session.preview()
+    assert not first.isValid
+    assert list(root.customGraphicsGroups) == [second]
+    (coordinates, indices, pointType) = second.pointSets[0]
+    assert coordinates.coordinates == [0.0, 0.0, 0.0, 1.0, 2.0, 3.0]
+    assert indices == [0, 1]
+
+def test_cancel_removes_the_preview_and_the_selection():
+    (root, session) = newSession()
+    session.add("1", "link0", "0", edge(0.0, 0.0, 0.0))
+    session.preview()
+    session.cancel()
+    assert root.customGraphicsGroups.count == 0
+    assert session.pending == []
+    assert session.preview() is None
+    assert session.add("1", "link0", "0", edge(0.0, 0.0, 0.0))
+
+def test_commit_creates_new_points_once():
+    (root, session) = newSession()
+    root.constructionPoints.add("VP_motor1_link0_0", adsk.core.Point3D.create(5.0, 0.0, 0.0))
+    session.add("1", "link0", "0", edge(0.0, 0.0, 0.0))
+    session.add("1", "link0", "1", edge(5.0, 0.0, 0.0))
+    session.add("1", "link0", "2", edge(1.0, 2.0, 3.0))
+    session.preview()
+    (created, skipped) = session.commit()
+    assert created == 1
+    assert skipped == ["VP_motor1_link0_0", "VP_motor1_link0_1"]
+    assert [point.name for point in root.constructionPoints] == ["VP_motor1_link0_0", "VP_motor1_link0_2"]
+    assert root.customGraphicsGroups.count == 0
+    assert session.pending == []
@@ -0,0 +1,66 @@
+import os
+
+from addin import load
+
+worker = load("worker")
+
+def test_inline_without_processes():
+    pool = worker.ExportWorker(0)
+    assert not pool.start()
+    future = pool.submit('writers.vectorToString', 1, 2, 3)
+    assert future.result() == "1 2 3"
+    assert pool.wait() == []
+
+def test_pool_grows_with_the_tasks_only():
+    pool = worker.ExportWorker(8)
+    assert pool.start()
+    try:
+        assert len(pool.processes) == 1
+        futures = [pool.submit('writers.vectorToString', i, 0, 0) for i in range(2)]
+        assert [future.result() for future in futures] == ["0 0 0", "1 0 0"]
+        assert len(pool.threads) <= 2
+        assert pool.wait() == []
+    finally:
+        pool.shutdown()
+    assert pool.processes == []
+
+def test_errors_are_reported():
+    pool = worker.ExportWorker(1)
+    pool.start()
+    try:
+        pool.submit('writers.vectorToString', 1)
+        errors = pool.wait()
+    finally:
+        pool.shutdown()
+    assert len(errors) == 1 and "TypeError" in errors[0]
+
+def test_crashed_worker_is_replaced():
+    pool = worker.ExportWorker(1)
+    pool.start()
+    try:
+        pool.processes[0].kill()
+        pool.processes[0].wait()
+        assert pool.submit('writers.vectorToString', 1, 2, 3).result() == "1 2 3"
+        assert pool.restarts == 1
+        assert pool.submit('writers.vectorToString', 4, 5, 6).result() == "4 5 6"
+    finally:
+        pool.shutdown()
+
+def test_tasks_run_inline_when_no_worker_can_be_started():
+    pool = worker.ExportWorker(1)
+    pool.start()
+    try:
+        pool.interpreter = os.path.join(os.path.dirname(os.path.abspath(__file__)), "missing-python")
+        pool.processes[0].kill()
+        pool.processes[0].wait()
+        assert pool.submit('writers.vectorToString', 1, 2, 3).result() == "1 2 3"
+        assert pool.submit('writers.vectorToString', 4, 5, 6).result() == "4 5 6"
+        assert pool.processes == []
+    finally:
+        pool.shutdown()
+
+def test_run_finishes_on_the_calling_thread():
+    pool = worker.ExportWorker(1)
+    future = pool.run('writers.vectorToString', 1, 2, 3)
+    assert future.done() and future.result() == "1 2 3"
+    assert pool.wait() == []
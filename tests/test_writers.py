@@ -0,0 +1,51 @@
+import os
+import xml.etree.ElementTree as ET
+
+from addin import load
+
+writers = load("writers")
+tracing = load("tracing")
+
+def test_write_file_skips_unchanged_content(tmp_path):
+    filename = str(tmp_path / "model.config")
+    assert writers.writeFile(filename, "<model/>\n") == (filename, True)
+    os.utime(filename, (1000000000, 1000000000))
+    assert writers.writeFile(filename, "<model/>\n") == (filename, False)
+    assert os.stat(filename).st_mtime == 1000000000
+    assert writers.writeFile(filename, "<model></model>\n") == (filename, True)
+    with open(filename) as file:
+        assert file.read() == "<model></model>\n"
+    assert os.listdir(str(tmp_path)) == ["model.config"]
+
+def test_write_xml_skips_unchanged_document(tmp_path):
+    filename = str(tmp_path / "model.sdf")
+    root = ET.Element("sdf")
+    ET.SubElement(root, "model").set("name", "robot")
+    assert writers.writeXml(filename, root, "<!-- header -->\n")[1]
+    assert not writers.writeXml(filename, root, "<!-- header -->\n")[1]
+    assert writers.writeXml(filename, root, "<!-- header -->\n", pretty=False)[1]
+    with open(filename) as file:
+        assert file.read() == '<!-- header -->\n<?xml version="1.0" ?><sdf><model name="robot"/></sdf>'
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    filename = str(tmp_path / "model.sdf")
+    writers.writeFile(filename, "old")
+    try:
+        with writers.OutputFile(filename) as stream:
+            stream.write("partial")
+            raise RuntimeError("serialization failed")
+    except RuntimeError:
+        pass
+    with open(filename) as file:
+        assert file.read() == "old"
+    assert os.listdir(str(tmp_path)) == ["model.sdf"]
+
+def test_trace_files_are_written_once(tmp_path):
+    tracer = tracing.Tracer()
+    tracer.start(memory=False)
+    with tracer.phase("export"):
+        pass
+    (traceFile, summaryFile) = tracer.save(str(tmp_path))
+    assert sorted(os.listdir(str(tmp_path))) == sorted([tracing.summaryName, tracing.traceName])
+    with open(traceFile) as file:
+        assert '"name": "export"' in file.read()
@@ -0,0 +1,203 @@
+## @package tracing
+# Per-phase timings, Fusion API call counts and peak memory of an export.
+#
+# Every phase records its wall time, the number of calls into the adsk
+# modules and the peak of the memory allocated by Python while it ran.
+# Nested phases are part of their parent. The result is written to the export
+# directory as trace.json in the Chrome trace event format, which opens in
+# chrome://tracing or https://ui.perfetto.dev, and as a summary table in
+# trace.txt.
+#
+# API calls are counted with a profile hook and memory with tracemalloc, both
+# slow the export down noticeably, so tracing is off unless enabled.
+
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from .writers import writeFile
+
+## Name of the Chrome trace file in the export directory.
+traceName = "trace.json"
+
+## Name of the summary table in the export directory.
+summaryName = "trace.txt"
+
+def _isApiModule(name):
+    return name == "adsk" or name.startswith("adsk.") or name.startswith("adsk_")
+
+## One finished or running phase.
+class Phase:
+    def __init__(self, name, start, apiCalls, args=None):
+        self.name = name
+        self.start = start
+        self.end = start
+        self.apiCallsAtStart = apiCalls
+        self.apiCalls = 0
+        self.peakMemory = 0
+        self.args = args or {}
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.phases = []
+        self.stack = []
+        self.apiCalls = 0
+        self.startTime = 0.0
+        self._startedTracemalloc = False
+        self._previousProfile = None
+
+    ## Starts recording.
+    #
+    # @param memory whether to track the peak memory with tracemalloc
+    def start(self, memory=True):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.phases = []
+        self.stack = []
+        self.apiCalls = 0
+        self.startTime = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._startedTracemalloc = True
+        self._previousProfile = sys.getprofile()
+        sys.setprofile(self._profile)
+
+    ## Stops recording, unfinished phases are closed.
+    def stop(self):
+        if not self.enabled:
+            return
+        while self.stack:
+            self._close(self.stack[-1])
+        sys.setprofile(self._previousProfile)
+        if self._startedTracemalloc:
+            tracemalloc.stop()
+            self._startedTracemalloc = False
+        self.enabled = False
+
+    # counts entries into the adsk modules from outside of them
+    def _profile(self, frame, event, arg):
+        if event == 'call':
+            if _isApiModule(frame.f_globals.get('__name__', '')):
+                caller = frame.f_back
+                if caller is None or not _isApiModule(caller.f_globals.get('__name__', '')):
+                    self.apiCalls += 1
+        elif event == 'c_call':
+            module = getattr(arg, '__module__', None) or ''
+            if _isApiModule(module) and not _isApiModule(frame.f_globals.get('__name__', '')):
+                self.apiCalls += 1
+
+    def _memory(self):
+        if tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[1]
+        return 0
+
+    def _open(self, name, args):
+        if self.stack and tracemalloc.is_tracing():
+            # the parents keep the peak so far, the child starts from scratch
+            peak = self._memory()
+            for parent in self.stack:
+                parent.peakMemory = max(parent.peakMemory, peak)
+            tracemalloc.reset_peak()
+        phase = Phase(name, time.perf_counter(), self.apiCalls, args)
+        self.stack.append(phase)
+        return phase
+
+    def _close(self, phase):
+        phase.end = time.perf_counter()
+        phase.apiCalls = self.apiCalls - phase.apiCallsAtStart
+        phase.peakMemory = max(phase.peakMemory, self._memory())
+        self.stack.remove(phase)
+        for parent in self.stack:
+            parent.peakMemory = max(parent.peakMemory, phase.peakMemory)
+        self.phases.append(phase)
+
+    ## Records a phase for the duration of a with block.
+    #
+    # A phase with the same name as the innermost running phase is merged into
+    # it, so overridden methods calling their base are recorded once.
+    #
+    # @param name the name of the phase
+    # @param args details shown with the phase, e.g. the link name
+    @contextlib.contextmanager
+    def phase(self, name, **args):
+        if not self.enabled or (self.stack and self.stack[-1].name == name):
+            yield None
+            return
+        phase = self._open(name, args)
+        try:
+            yield phase
+        finally:
+            if phase in self.stack:
+                self._close(phase)
+
+    ## The recorded phases as Chrome trace events.
+    def traceEvents(self):
+        events = []
+        pid = os.getpid()
+        for phase in sorted(self.phases, key=lambda p: p.start):
+            args = dict(phase.args)
+            args["apiCalls"] = phase.apiCalls
+            args["peakMemoryKiB"] = round(phase.peakMemory / 1024.0, 1)
+            events.append({"name": phase.name, "cat": "export", "ph": "X", "pid": pid, "tid": 1,
+                           "ts": round((phase.start - self.startTime) * 1e6, 3),
+                           "dur": round(phase.duration * 1e6, 3), "args": args})
+        return events
+
+    ## Aggregates the recorded phases by name.
+    #
+    # @return list of (name, count, seconds, apiCalls, peakMemory) by descending time
+    def summary(self):
+        rows = {}
+        for phase in self.phases:
+            (count, seconds, apiCalls, peak) = rows.get(phase.name, (0, 0.0, 0, 0))
+            rows[phase.name] = (count + 1, seconds + phase.duration, apiCalls + phase.apiCalls, max(peak, phase.peakMemory))
+        return sorted(((name,) + row for (name, row) in rows.items()), key=lambda row: -row[2])
+
+    ## Formats the summary as a table.
+    def summaryTable(self):
+        lines = ["%-40s %7s %11s %11s %11s %11s" % ("phase", "count", "total [s]", "mean [s]", "API calls", "peak [MiB]")]
+        for (name, count, seconds, apiCalls, peak) in self.summary():
+            lines.append("%-40s %7d %11.4f %11.4f %11d %11.2f" % (name, count, seconds, seconds / count, apiCalls, peak / 1048576.0))
+        return "\n".join(lines) + "\n"
+
+    ## Stops recording and writes trace.json and trace.txt.
+    #
+    # @param fileDir the export directory
+    # @return the file names
+    def save(self, fileDir):
+        self.stop()
+        traceFile = os.path.join(fileDir, traceName)
+        summaryFile = os.path.join(fileDir, summaryName)
+        writeFile(traceFile, json.dumps({"traceEvents": self.traceEvents(), "displayTimeUnit": "ms"}))
+        writeFile(summaryFile, self.summaryTable())
+        return (traceFile, summaryFile)
+
+## Records every call of a method as a phase of self.tracer.
+#
+# Plain positional arguments of the call, e.g. the link name, are kept with
+# the phase.
+#
+# @param name the name of the phase, defaults to the name of the method
+def traced(name=None):
+    def decorate(method):
+        phaseName = name or method.__name__
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            details = [arg for arg in args if isinstance(arg, (str, int, float))]
+            if details:
+                with self.tracer.phase(phaseName, args=details):
+                    return method(self, *args, **kwargs)
+            with self.tracer.phase(phaseName):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,103 @@
+## @package transaction
+# Groups the changes the export makes to the design.
+#
+# Fusion computes the design after every change made through the API. A
+# DesignTransaction defers that while the export changes the design. In a
+# parametric design the timeline entries created during the transaction are
+# put into one timeline group named after it, so the changes of an export
+# can be found and undone as one unit.
+#
+# Every stage that changes the design opens a transaction. Transactions
+# opened while another one is active join the outer one and compute the
+# design once when they end, so the next stage, e.g. meshing the bodies a
+# stage just copied, sees the result:
+#
+#     with DesignTransaction(design, "SDFusion export"):
+#         for name in links:
+#             with DesignTransaction(design, "EXPORT_" + name) as transaction:
+#                 transaction.delete(oldOccurrence)
+#                 ... copy bodies ...
+#             ... export meshes ...
+
+import adsk.core
+import adsk.fusion
+
+## The open transactions, the outermost first.
+_open = []
+
+class DesignTransaction:
+    def __init__(self, design, name):
+        self.design = design
+        self.name = name
+        ## whether an outer transaction deferred the compute already
+        self.nested = False
+        self.timeline = None
+        ## index of the first timeline entry of this transaction
+        self.start = 0
+        ## number of times the design was computed within the transaction
+        self.flushes = 0
+
+    def __enter__(self):
+        self.nested = self.design.isComputeDeferred
+        if not self.nested:
+            self.design.isComputeDeferred = True
+            if self.design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+                self.timeline = self.design.timeline
+                self.start = self.timeline.count
+        _open.append(self)
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        if self in _open:
+            _open.remove(self)
+        if self.nested:
+            self.flush()
+            return False
+        self.design.isComputeDeferred = False
+        if self.timeline is not None and self.timeline.count - self.start > 1:
+            try:
+                group = self.timeline.timelineGroups.add(self.start, self.timeline.count - 1)
+                group.name = self.name
+            except RuntimeError:
+                # e.g. the timeline marker is not at the end, the entries stay ungrouped
+                pass
+        return False
+
+    ## Computes the changes made so far and keeps deferring.
+    def flush(self):
+        if self.design.isComputeDeferred:
+            self.design.isComputeDeferred = False
+            self.design.isComputeDeferred = True
+            self.flushes += 1
+
+    ## The outermost open transaction of the design, the one grouping the timeline.
+    def outermost(self):
+        for transaction in _open:
+            if transaction.design is self.design:
+                return transaction
+        return self
+
+    ## Deletes entities in one operation.
+    #
+    # The entities have to be older than the outermost transaction, the
+    # start of its timeline group moves back by the deleted entries.
+    #
+    # @param entities an entity or a list or ObjectCollection of entities
+    def delete(self, entities):
+        if not isinstance(entities, (list, adsk.core.ObjectCollection)):
+            entities = [entities]
+        collection = entities
+        if isinstance(entities, list):
+            collection = adsk.core.ObjectCollection.create()
+            for entity in entities:
+                collection.add(entity)
+        if collection.count == 0:
+            return True
+        outer = self.outermost()
+        timeline = outer.timeline
+        before = timeline.count if timeline is not None else 0
+        result = self.design.deleteEntities(collection)
+        if timeline is not None:
+            # their entries were before the ones of the outermost transaction
+            outer.start = max(0, outer.start - max(0, before - timeline.count))
+        return result
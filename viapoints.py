@@ -0,0 +1,159 @@
+## @package viapoints
+# Table of the via-points of all muscles of a design.
+#
+# The via-points are stored column wise: the motor and the link of every
+# point as indices into the lists of motor and link names, the number of the
+# point along its tendon as an integer and its position in flat arrays of
+# doubles. The rows of each motor are grouped in a dictionary and ordered by
+# their number, so via-point 10 comes after via-point 2, and every exporter
+# reads the same ordered tendons instead of sorting them again.
+#
+# TendonGeometry measures all tendons at the reference pose of the design at
+# once: the vector and length of every segment between two consecutive
+# via-points and the path length of every tendon.
+
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class ViaPointTable:
+    def __init__(self):
+        ## motor names in the order they first appear
+        self.motors = []
+        self.motorIndex = {}
+        ## link names in the order they first appear
+        self.links = []
+        self.linkIndex = {}
+        ## motor of every row, an index into motors
+        self.motor = array('i')
+        ## link of every row, an index into links
+        self.link = array('i')
+        ## number of every row along its tendon
+        self.number = array('q')
+        ## x, y, z of every row in design coordinates (cm)
+        self.position = array('d')
+        ## x, y, z of every row relative to the origin of its link (cm)
+        self.offset = array('d')
+        ## names of the construction points of the rows
+        self.names = []
+        ## rows of every motor index, ordered by number once sorted
+        self.rows = {}
+        self.ordered = True
+
+    def __len__(self):
+        return len(self.number)
+
+    ## Adds a via-point.
+    #
+    # @param name the name of the construction point
+    # @param motor the motor name, e.g. "3"
+    # @param link the link name
+    # @param number the number of the via-point along its tendon, e.g. "10"
+    # @param position the (x, y, z) position in design coordinates (cm)
+    # @param origin the (x, y, z) origin of the link in design coordinates (cm)
+    # @return the row of the via-point
+    def add(self, name, motor, link, number, position, origin):
+        number = int(number)
+        m = self.motorIndex.get(motor)
+        if m is None:
+            m = self.motorIndex[motor] = len(self.motors)
+            self.motors.append(motor)
+            self.rows[m] = []
+        l = self.linkIndex.get(link)
+        if l is None:
+            l = self.linkIndex[link] = len(self.links)
+            self.links.append(link)
+        row = len(self.number)
+        self.motor.append(m)
+        self.link.append(l)
+        self.number.append(number)
+        self.position.extend(position)
+        self.offset.extend(p - o for (p, o) in zip(position, origin))
+        self.names.append(name)
+        self.rows[m].append(row)
+        self.ordered = False
+        return row
+
+    ## Orders the rows of every motor by their number, keeping the design order of equal numbers.
+    def sort(self):
+        if not self.ordered:
+            for rows in self.rows.values():
+                rows.sort(key=self.number.__getitem__)
+            self.ordered = True
+
+    ## The rows of a motor, ordered by their number.
+    def tendon(self, motor):
+        self.sort()
+        return self.rows[self.motorIndex[motor]]
+
+    ## Pairs of motor name and ordered rows, in the order the motors first appear.
+    def tendons(self):
+        self.sort()
+        return [(motor, self.rows[m]) for (m, motor) in enumerate(self.motors)]
+
+    ## The link name of a row.
+    def linkName(self, row):
+        return self.links[self.link[row]]
+
+    ## The position of a row relative to its link in m, formatted for the XML outputs.
+    def coordinates(self, row):
+        return " ".join(str(d * 0.01) for d in self.offset[3 * row:3 * row + 3])
+
+## Segments and path lengths of all tendons at the reference pose, in m.
+class TendonGeometry:
+    def __init__(self, table):
+        self.table = table
+        n = len(table)
+        ## vector from every row to the next via-point of its tendon, zero for the last one
+        self.segments = [(0.0, 0.0, 0.0)] * n
+        ## length of the segment starting at every row
+        self.segmentLengths = [0.0] * n
+        ## path length of every motor index
+        self.lengths = [0.0] * len(table.motors)
+        order = [row for (motor, rows) in table.tendons() for row in rows]
+        if n < 2:
+            return
+        if np is not None:
+            self.computeArrays(table, order)
+        else:
+            self.computeLists(table, order)
+
+    ## Computes the geometry of all tendons with one pass of array operations.
+    def computeArrays(self, table, order):
+        order = np.array(order, dtype=np.intp)
+        positions = np.array(table.position, dtype=np.float64).reshape(-1, 3)[order]
+        motors = np.array(table.motor, dtype=np.intp)[order]
+        vectors = (positions[1:] - positions[:-1]) * 0.01
+        # consecutive rows of different tendons are not connected
+        vectors[motors[1:] != motors[:-1]] = 0.0
+        lengths = np.sqrt((vectors * vectors).sum(axis=1))
+        segments = np.zeros((len(order), 3))
+        segments[order[:-1]] = vectors
+        segmentLengths = np.zeros(len(order))
+        segmentLengths[order[:-1]] = lengths
+        self.segments = [tuple(segment) for segment in segments.tolist()]
+        self.segmentLengths = segmentLengths.tolist()
+        self.lengths = np.bincount(motors[:-1], weights=lengths, minlength=len(table.motors)).tolist()
+
+    ## Computes the geometry of all tendons without NumPy.
+    def computeLists(self, table, order):
+        for (a, b) in zip(order, order[1:]):
+            if table.motor[a] != table.motor[b]:
+                continue
+            vector = tuple((table.position[3 * b + k] - table.position[3 * a + k]) * 0.01 for k in range(3))
+            length = math.sqrt(sum(v * v for v in vector))
+            self.segments[a] = vector
+            self.segmentLengths[a] = length
+            self.lengths[table.motor[a]] += length
+
+    ## The path length of a motor.
+    def length(self, motor):
+        return self.lengths[self.table.motorIndex[motor]]
+
+    ## The segment starting at a row formatted for the XML outputs.
+    def segment(self, row):
+        return " ".join(str(v) for v in self.segments[row])
@@ -0,0 +1,112 @@
+## @package viapointsession
+# Via-points placed in the ViaPoints tab, created when the dialog is confirmed.
+#
+# Fusion rolls back everything a command creates before it is confirmed, so
+# construction points added on every click were created twice, once on the
+# click and again when the dialog closed. The session only remembers the
+# selected edges while the dialog is open and draws them as custom graphics,
+# which do not touch the timeline. On OK all new points are created in one
+# go and grouped in the timeline, edges and names that already have a
+# via-point are skipped.
+
+import adsk.fusion
+
+from .helpers import ViaPoint
+from .transaction import DesignTransaction
+
+## Name of the construction point of a via-point.
+def viaPointName(motor, link, number):
+    return "VP_motor" + motor + "_" + link + "_" + number
+
+## Key identifying the edge of a via-point.
+def edgeKey(edge):
+    return edge.entityToken
+
+class ViaPointSession:
+    def __init__(self, rootComp):
+        self.rootComp = rootComp
+        ## the selected via-points, in the order they were selected
+        self.pending = []
+        self.names = set()
+        self.edges = set()
+        ## the custom graphics of the preview, None if nothing is drawn
+        self.group = None
+
+    ## Adds a selected edge.
+    #
+    # @return False if the edge or the name was selected before
+    def add(self, motor, link, number, edge):
+        name = viaPointName(motor, link, number)
+        key = edgeKey(edge)
+        if name in self.names or key in self.edges:
+            return False
+        self.names.add(name)
+        self.edges.add(key)
+        self.pending.append(ViaPoint(motor=motor, link=link, number=number, edge=edge))
+        return True
+
+    ## Draws the pending via-points as a point cloud, call from the executePreview event.
+    #
+    # The point cloud of the previous preview is replaced.
+    def preview(self):
+        self.clearPreview()
+        if not self.pending:
+            return None
+        coordinates = []
+        for vp in self.pending:
+            center = vp.edge.geometry.center
+            coordinates.extend((center.x, center.y, center.z))
+        self.group = self.rootComp.customGraphicsGroups.add()
+        self.group.addPointSet(adsk.fusion.CustomGraphicsCoordinates.create(coordinates), list(range(len(self.pending))),
+                               adsk.fusion.CustomGraphicsPointTypes.PointCloudCustomGraphicsPointType, '')
+        return self.group
+
+    ## Removes the point cloud of the preview from the viewport.
+    def clearPreview(self):
+        if self.group is not None:
+            if self.group.isValid:
+                self.group.deleteMe()
+            self.group = None
+
+    ## Forgets the pending via-points when the dialog is cancelled.
+    def cancel(self):
+        self.clearPreview()
+        self.pending = []
+        self.names = set()
+        self.edges = set()
+
+    ## Creates the construction points of all pending via-points.
+    #
+    # Names that exist in the design already are skipped, as are edges whose
+    # center has a via-point.
+    #
+    # @return (number of created points, names of the skipped ones)
+    def commit(self):
+        self.clearPreview()
+        conPoints = self.rootComp.constructionPoints
+        existing = set()
+        centers = set()
+        for point in conPoints:
+            if point is not None and point.name.startswith("VP_"):
+                existing.add(point.name)
+                geometry = point.geometry
+                centers.add((round(geometry.x, 6), round(geometry.y, 6), round(geometry.z, 6)))
+        created = 0
+        skipped = []
+        with DesignTransaction(self.rootComp.parentDesign, "via-points"):
+            for vp in self.pending:
+                name = viaPointName(vp.motor, vp.link, vp.number)
+                center = vp.edge.geometry.center
+                if name in existing or (round(center.x, 6), round(center.y, 6), round(center.z, 6)) in centers:
+                    skipped.append(name)
+                    continue
+                # Create construction point by center
+                pointInput = conPoints.createInput()
+                pointInput.setByCenter(vp.edge)
+                point = conPoints.add(pointInput)
+                point.name = name
+                created += 1
+        self.pending = []
+        self.names = set()
+        self.edges = set()
+        return (created, skipped)
@@ -0,0 +1,276 @@
+## @package worker
+# Local worker processes for the pure Python half of the export.
+#
+# The Fusion API may only be used from the main thread. Everything that does
+# not need it - serializing XML, post-processing meshes, hashing and writing
+# the side outputs - is handed to a small pool of worker processes, so Fusion
+# stays responsive and that work overlaps with meshing the next link.
+#
+# Tasks are addressed by name, e.g. "writers.writeXml", and get plain,
+# picklable arguments. The workers are plain Python interpreters started with
+# `python -m <package>.worker`, they never import adsk. If no interpreter can
+# be started, tasks run inline on the calling thread.
+
+import importlib
+import os
+import pickle
+import queue
+import struct
+import subprocess
+import sys
+import threading
+import traceback
+from concurrent.futures import Future
+
+## Returns a Python interpreter that can run the workers or None.
+#
+# Inside Fusion 360 sys.executable is the Fusion executable itself, the
+# bundled interpreter lives next to the standard library.
+def findInterpreter():
+    candidates = [sys.executable,
+                  getattr(sys, '_base_executable', ''),
+                  os.path.join(sys.prefix, 'python.exe'),
+                  os.path.join(sys.prefix, 'bin', 'python3'),
+                  os.path.join(sys.exec_prefix, 'bin', 'python3')]
+    for candidate in candidates:
+        if candidate and os.path.basename(candidate).lower().startswith('python') and os.path.isfile(candidate):
+            return candidate
+    return None
+
+def _send(stream, message):
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    _write(stream, data)
+
+def _write(stream, data):
+    stream.write(struct.pack('<Q', len(data)))
+    stream.write(data)
+    stream.flush()
+
+def _receive(stream):
+    header = stream.read(8)
+    if len(header) < 8:
+        raise EOFError("worker pipe closed")
+    (size,) = struct.unpack('<Q', header)
+    data = stream.read(size)
+    if len(data) < size:
+        raise EOFError("worker pipe closed")
+    return pickle.loads(data)
+
+## Runs one task by name.
+#
+# @param task "module.function" relative to this package
+# @param args the positional arguments of the function
+# @return the return value of the function
+def runTask(task, args):
+    (module, _, function) = task.rpartition('.')
+    return getattr(importlib.import_module('.' + module, __package__), function)(*args)
+
+# runs a task on the calling thread and resolves its future
+def _runInline(future, task, args):
+    try:
+        future.set_result(runTask(task, args))
+    except Exception as e:
+        future.set_exception(e)
+
+## Pool of worker processes.
+#
+# The processes are started on demand, one more whenever a task is queued
+# and all running ones are busy, up to numberOfProcesses. An export with a
+# handful of small outputs starts one or two interpreters, not one per core.
+#
+# When the pipe to a worker breaks, e.g. because the process was killed, the
+# worker is replaced and its task is sent once more. If no process can be
+# started, the tasks of that worker run inline on its dispatch thread.
+class ExportWorker:
+    def __init__(self, processes=None):
+        if processes is None:
+            processes = max(1, (os.cpu_count() or 2) - 1)
+        self.numberOfProcesses = processes
+        self.tasks = queue.Queue()
+        self.processes = []
+        self.threads = []
+        self.futures = []
+        self.inline = True
+        self.interpreter = None
+        self.env = None
+        ## number of dispatch threads waiting for a task
+        self.idle = 0
+        ## number of worker processes that were replaced after their pipe broke
+        self.restarts = 0
+        self.lock = threading.Lock()
+
+    ## Prepares the worker processes, they are started with the first tasks.
+    #
+    # @return True if tasks go to worker processes, False if they run inline
+    def start(self):
+        interpreter = findInterpreter()
+        if interpreter is None or not __package__ or self.numberOfProcesses < 1:
+            return False
+        packageDir = os.path.dirname(os.path.abspath(__file__))
+        self.interpreter = interpreter
+        self.env = dict(os.environ)
+        self.env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(packageDir), self.env.get('PYTHONPATH', '')])
+        # fail early if no interpreter can be started at all
+        process = self._startProcess()
+        if process is None:
+            return False
+        self.inline = False
+        self._addThread(process)
+        return True
+
+    ## Starts a worker process, returns None if that fails.
+    def _startProcess(self):
+        packageDir = os.path.dirname(os.path.abspath(__file__))
+        try:
+            process = subprocess.Popen([self.interpreter, '-m', __package__ + '.worker'],
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       cwd=os.path.dirname(packageDir), env=self.env,
+                                       creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        except OSError:
+            return None
+        with self.lock:
+            self.processes.append(process)
+        return process
+
+    ## Stops a worker process.
+    def _stopProcess(self, process):
+        try:
+            process.stdin.close()
+            process.wait(timeout=10)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            process.kill()
+        with self.lock:
+            if process in self.processes:
+                self.processes.remove(process)
+
+    def _addThread(self, process):
+        thread = threading.Thread(target=self._dispatch, args=[process], daemon=True)
+        self.threads.append(thread)
+        thread.start()
+
+    ## Feeds tasks from the queue to one worker process.
+    def _dispatch(self, process):
+        while True:
+            with self.lock:
+                self.idle += 1
+            item = self.tasks.get()
+            with self.lock:
+                self.idle -= 1
+            if item is None:
+                break
+            (future, task, args) = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            process = self._call(process, future, task, args)
+        if process is not None:
+            self._stopProcess(process)
+
+    ## Runs one task in a worker process and resolves its future.
+    #
+    # @return the worker process for the next task, None if tasks run inline
+    def _call(self, process, future, task, args):
+        try:
+            data = pickle.dumps((task, args), pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            future.set_exception(e)
+            return process
+        for attempt in range(2):
+            if process is None:
+                _runInline(future, task, args)
+                return None
+            try:
+                _write(process.stdin, data)
+                (ok, value) = _receive(process.stdout)
+            except (OSError, EOFError, ValueError):
+                # the worker died, replace it and send the task once more
+                process.kill()
+                self._stopProcess(process)
+                process = self._startProcess()
+                with self.lock:
+                    self.restarts += 1
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(task + " failed in worker process:\n" + value))
+            return process
+        future.set_exception(RuntimeError(task + " failed, its worker process exited twice"))
+        return process
+
+    ## Queues a task.
+    #
+    # @param task "module.function" relative to this package
+    # @param args the positional arguments, they have to be picklable
+    # @return a concurrent.futures.Future of the result
+    def submit(self, task, *args):
+        future = Future()
+        self.futures.append(future)
+        if self.inline:
+            future.set_running_or_notify_cancel()
+            _runInline(future, task, args)
+            return future
+        with self.lock:
+            busy = self.idle == 0
+        if busy and len(self.threads) < self.numberOfProcesses:
+            process = self._startProcess()
+            if process is not None:
+                self._addThread(process)
+        self.tasks.put((future, task, args))
+        return future
+
+    ## Runs a task on the calling thread.
+    #
+    # For tasks whose arguments cost as much to pickle as the task itself,
+    # e.g. serializing an ElementTree. The result is waited for like the one
+    # of a queued task.
+    #
+    # @return a finished concurrent.futures.Future of the result
+    def run(self, task, *args):
+        future = Future()
+        self.futures.append(future)
+        future.set_running_or_notify_cancel()
+        _runInline(future, task, args)
+        return future
+
+    ## Waits for all queued tasks.
+    #
+    # @return list of error messages of failed tasks
+    def wait(self):
+        errors = []
+        for future in self.futures:
+            error = future.exception()
+            if error is not None:
+                errors.append(str(error))
+        self.futures = []
+        return errors
+
+    ## Stops the worker processes after the queued tasks are done.
+    def shutdown(self):
+        for _ in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+        for process in list(self.processes):
+            self._stopProcess(process)
+        self.processes = []
+        self.threads = []
+        self.inline = True
+
+## Serves tasks from stdin until the pipe is closed.
+def serve():
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    # keep stray prints of the tasks out of the result pipe
+    sys.stdout = sys.stderr
+    while True:
+        try:
+            (task, args) = _receive(stdin)
+        except EOFError:
+            break
+        try:
+            _send(stdout, (True, runTask(task, args)))
+        except Exception:
+            _send(stdout, (False, traceback.format_exc()))
+
+if __name__ == '__main__':
+    serve()
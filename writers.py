@@ -0,0 +1,310 @@
+## @package writers
+# Builds and writes the output files of an export from plain data.
+#
+# Nothing in here touches the Fusion API, so every function can run in a
+# worker process (see worker.py) while the main thread keeps talking to Fusion.
+#
+# All text outputs go through OutputFile, which leaves files with unchanged
+# content alone and replaces the others atomically, and which also packs them
+# into the model archive, see packing.
+
+import contextlib
+import hashlib
+import io
+import os
+import threading
+import uuid
+import xml.etree.ElementTree as ET
+from .helpers import *
+
+## Returns a unique name for a temporary file next to filename.
+def temporaryName(filename):
+    return filename + "." + uuid.uuid4().hex + ".tmp"
+
+# the archive the outputs of the calling thread are packed into, see packing
+_packages = threading.local()
+
+## Packs every OutputFile written by the calling thread in the with block.
+#
+# @param package a modelpackage.PackageWriter
+@contextlib.contextmanager
+def packing(package):
+    previous = getattr(_packages, 'current', None)
+    _packages.current = package
+    try:
+        yield package
+    finally:
+        _packages.current = previous
+
+# passes the encoded output on to the file and the archive entry and hashes it on the way
+class _HashingStream(io.BufferedIOBase):
+    def __init__(self, file, entry=None):
+        super().__init__()
+        self.file = file
+        self.entry = entry
+        self.digest = hashlib.sha1()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        if self.entry is not None:
+            self.entry.write(data)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            self.file.close()
+            if self.entry is not None:
+                self.entry.close()
+
+## A text output file that is only replaced if its content changed.
+#
+# The text is streamed to a temporary file next to the output and the SHA-1
+# of the written bytes is computed on the way. When the with block ends, the
+# digest is compared with the one of the existing file. An unchanged file is
+# not touched, so its modification time stays and rsync, the Gazebo model
+# cache and artifact uploads skip it. A changed file is replaced by the
+# temporary file, so readers never see a partially written file.
+#
+# Inside a packing block the bytes also go to the archive of the model and
+# the digest ends up in its manifest.
+#
+#     output = OutputFile(filename)
+#     with output as stream:
+#         stream.write(text)
+#     output.changed
+class OutputFile:
+    def __init__(self, filename):
+        self.filename = filename
+        ## whether the file was written, known once the with block ended
+        self.changed = False
+
+    def __enter__(self):
+        self.temporary = temporaryName(self.filename)
+        self.package = getattr(_packages, 'current', None)
+        file = open(self.temporary, 'wb')
+        entry = None
+        if self.package is not None:
+            try:
+                entry = self.package.open(self.filename)
+            except BaseException:
+                file.close()
+                os.remove(self.temporary)
+                raise
+        self.hashing = _HashingStream(file, entry)
+        # encodes and ends lines like a file opened with open(filename, 'w')
+        self.stream = io.TextIOWrapper(self.hashing)
+        return self.stream
+
+    def __exit__(self, excType, excValue, tb):
+        try:
+            self.stream.close()
+            if excType is None:
+                digest = self.hashing.digest.hexdigest()
+                if self.package is not None:
+                    if self.hashing.entry is None:
+                        # the archive needs the size first, the content is known now
+                        self.package.copy(self.filename, self.temporary)
+                    self.package.add(self.filename, self.hashing.size, digest)
+                self.changed = fileDigest(self.filename) != digest
+                if self.changed:
+                    os.replace(self.temporary, self.filename)
+        finally:
+            if os.path.exists(self.temporary):
+                os.remove(self.temporary)
+        return False
+
+## Returns the SHA-1 hex digest of a file, read in chunks, or None if it cannot be read.
+def fileDigest(filename):
+    try:
+        return hashFile(filename)[1]
+    except OSError:
+        return None
+
+## Writes a text file unless it has this content already, see OutputFile.
+#
+# @param filename the output file
+# @param content the text of the file
+# @return (filename, True if the file was written)
+def writeFile(filename, content):
+    output = OutputFile(filename)
+    with output as stream:
+        stream.write(content)
+    return (filename, output.changed)
+
+## Writes an XML tree to a file.
+#
+# The tree is serialized in a single pass straight into the file. The pretty
+# output is the same as the one of minidom's toprettyxml, which older
+# versions used.
+#
+# @param filename the output file
+# @param elem the root element
+# @param header text written in front of the document, e.g. a DOCTYPE
+# @param pretty indent the document, otherwise it is written on one line
+# @return (filename, True if the file changed), see writeFile
+def writeXml(filename, elem, header='', pretty=True):
+    output = OutputFile(filename)
+    with output as stream:
+        stream.write(header)
+        if pretty:
+            writeXmlStream(stream, elem)
+        else:
+            writeXmlStream(stream, elem, indent='', newl='')
+    return (filename, output.changed)
+
+## Writes the Gazebo model.config.
+#
+# @param filename the output file
+# @param modelName the name of the model
+# @return (filename, True if the file changed), see writeFile
+def writeModelConfig(filename, modelName):
+    content = '<?xml version="1.0" ?>\n<model>\n<name>'+modelName+'</name>\n<version>1.0</version>\n'
+    content += '<sdf version="1.6">model.sdf</sdf>\n<author>\n<name></name>\n<email></email>\n</author>\n'
+    content += '<description>awesome</description>\n<changes>exported from fusion 360</changes>\n</model>\n'
+    return writeFile(filename, content)
+
+## Writes the lighthouse sensors of one link to YAML.
+#
+# @param filename the output file
+# @param name the name of the link
+# @param objectID the object id of the link
+# @param sensors list of (x, y, z) sensor positions relative to the COM in cm
+# @return (filename, True if the file changed), see writeFile
+def writeLighthouseSensorsYAML(filename, name, objectID, sensors):
+    lines = ['name: ' + name + '\n',
+             'ObjectID: ' + str(objectID) + '\n',
+             'mesh: ' + "../meshes/CAD/" + name + '.stl\n',
+             'sensor_relative_locations:\n']
+    i = 0
+    for (x, y, z) in sensors:
+        line = '- [' + str(i) + ', ' + str(x*0.01) + ', ' + str(y*0.01) + ', ' + str(z*0.01) + ']\n'
+        lines.append(line)
+        i = i+1
+    return writeFile(filename, ''.join(lines))
+
+## Builds and writes the CASPR cables file.
+#
+# @param filename the output file
+# @param viaPoints the ViaPointTable of the design
+# @return (filename, True if the file changed), see writeFile
+def writeCASPRcables(filename, viaPoints):
+    header = '<?xml version="1.0" encoding="utf-8"?>\n'
+    header += '<!DOCTYPE cables SYSTEM "../../../templates/cables.dtd">\n'
+    cables = ET.Element('cables')
+    cables.set('default_cable_set', 'WORKING')
+    cable_set = ET.SubElement(cables, 'cable_set')
+    cable_set.set('id','WORKING')
+
+    # create myoMuscle nodes
+    i = 0
+    for (motor, rows) in viaPoints.tendons():
+        cable_ideal = ET.SubElement(cable_set, 'cable_ideal')
+        cable_ideal.set('name', 'cable ' + str(i))
+        i = i+1
+        cable_ideal.set('attachment_reference', 'com')
+        properties = ET.SubElement(cable_ideal, 'properties')
+        force_min = ET.SubElement(properties, 'force_min')
+        force_min.text = '10'
+        force_max = ET.SubElement(properties, 'force_max')
+        force_max.text = '80'
+
+        attachments = ET.SubElement(cable_ideal, 'attachments')
+        for row in rows:
+            attachment = ET.SubElement(attachments, 'attachment')
+            link = ET.SubElement(attachment, 'link')
+            link.text = viaPoints.linkName(row)
+            location = ET.SubElement(attachment, 'location')
+            location.text = viaPoints.coordinates(row)
+    return writeXml(filename, cables, header)
+
+## Builds and writes the CASPR bodies file.
+#
+# Each body is a dict with the keys parent, child, axis, q_min, q_max, mass,
+# com, inertia and origin. Positions are in design coordinates (cm), the
+# inertia is (xx, yy, zz, xy, yz, xz).
+#
+# @param filename the output file
+# @param bodies list of body dicts
+# @return (filename, True if the file changed), see writeFile
+def writeCASPRbodies(filename, bodies):
+    header = '<?xml version="1.0" encoding="utf-8"?>\n'
+    header += '<!DOCTYPE bodies_system SYSTEM "../../../templates/bodies.dtd">\n'
+    bodies_system = ET.Element('bodies_system')
+    links = ET.SubElement(bodies_system, 'links')
+    links.set('display_range','-0.3 0.3 0.0 1.0 -0.3 0.3')
+    links.set('view_angle','-37 32')
+    for body in bodies:
+        link_rigid = ET.SubElement(links, 'link_rigid')
+        link_rigid.set('num','1')
+        link_rigid.set('name',body['parent'])
+        joi = ET.SubElement(link_rigid, 'joint')
+        joi.set('type','R_xyx')
+        joi.set('axis',vectorToString(*body['axis']))
+        joi.set('q_min', str(body['q_min']))
+        joi.set('q_max', str(body['q_max']))
+        physical = ET.SubElement(link_rigid, 'physical')
+        mass = ET.SubElement(physical, 'mass')
+        mass.text = str(body['mass'])
+
+        joint_origin = body['origin']
+        com_origin = body['com']
+        com_location = ET.SubElement(physical, 'com_location')
+        com_location.text = str((com_origin[0]-joint_origin[0])/100.0) + ' ' + str((com_origin[1]-joint_origin[1])/100.0) + ' ' + str((com_origin[2]-joint_origin[2])/100.0)
+
+        end_location = ET.SubElement(physical, 'end_location')
+        end_location.text = '0 0 0'
+        inertia = ET.SubElement(physical, 'inertia')
+        inertia.set('ref','com')
+        Ixx = ET.SubElement(inertia, 'Ixx')
+        Ixx.text = str(body['inertia'][0])
+        Iyy = ET.SubElement(inertia, 'Iyy')
+        Iyy.text = str(body['inertia'][1])
+        Izz = ET.SubElement(inertia, 'Izz')
+        Izz.text = str(body['inertia'][2])
+        Ixy = ET.SubElement(inertia, 'Ixy')
+        Ixy.text = str(body['inertia'][3])
+        Ixz = ET.SubElement(inertia, 'Ixz')
+        Ixz.text = str(body['inertia'][5])
+        Iyz = ET.SubElement(inertia, 'Iyz')
+        Iyz.text = str(body['inertia'][4])
+
+        parent = ET.SubElement(link_rigid, 'parent')
+        num = ET.SubElement(parent, 'num')
+        num.text = body['child']
+        location = ET.SubElement(parent, 'location')
+        location.text = str(joint_origin[0]/100.0) + ' ' + str(joint_origin[1]/100.0) + ' ' + str(joint_origin[2]/100.0)
+
+    operational_spaces = ET.SubElement(bodies_system, 'operational_spaces')
+    operational_spaces.set('default_operational_set', 'test')
+    operational_set = ET.SubElement(operational_spaces, 'operational_set')
+    operational_set.set('id','test')
+    position = ET.SubElement(operational_set, 'position')
+    position.set('marker_id','1')
+    position.set('name','test1')
+    link = ET.SubElement(position, 'link')
+    link.text = '2'
+    offset = ET.SubElement(position, 'offset')
+    offset.text = '0.0 0.0 0.0'
+    axes = ET.SubElement(position, 'axes')
+    axes.set('active_axes','x')
+    return writeXml(filename, bodies_system, header)
+
+## Computes the SHA-1 digest of a file.
+#
+# @param filename the file to hash
+# @return (filename, hex digest)
+def hashFile(filename):
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return (filename, digest.hexdigest())